@@ -1,23 +1,35 @@
 import os
 import uuid
-import sqlite3
-import re
+import json
 import time
-from datetime import datetime, timedelta
+from datetime import datetime
 from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file, make_response, session
 from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash, check_password_hash
-import pytesseract
-from PIL import Image
+from itsdangerous import URLSafeTimedSerializer, BadSignature
 import pdf2image
-import csv
 import io
-import tempfile
 from functools import wraps
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment
-from logging_config import setup_logging, get_logger, log_order_submission, log_ocr_processing, log_csv_upload, log_admin_action, log_error, log_performance
-from storage_service import get_storage_service, upload_receipt, upload_csv, get_file_path, cleanup_temp_file
+from logging_config import setup_logging, log_order_submission, log_ocr_processing, log_csv_upload, log_admin_action, log_error, log_performance
+from storage_service import get_storage_service, upload_csv as upload_csv_file, get_file_path, cleanup_temp_file
+from storage_service import create_receipt_upload, save_receipt_upload, get_stored_file_size, RECEIPT_UPLOAD_URL_TTL
+from storage_service import upload_receipt_with_copy, is_temp_file, sweep_receipt_spool
+from database import get_connection_manager, get_db_connection, release_db_connection
+from migrations import run_migrations, get_schema_version
+from reconciliation import reconcile_orders, find_candidate_orders
+from order_board import count_orders, fetch_orders, DASHBOARD_PAGE_SIZE
+from order_stats import get_status_counts, get_daily_volume, get_wave_revenue, rebuild_order_stats, MAX_VOLUME_DAYS
+from job_queue import get_job_queue, JobLeaseLost
+from ocr_service import get_ocr_executor, OCR_NOT_AVAILABLE
+from ocr_cache import get_ocr_cache, hash_receipt
+from receipt_parser import parse_receipt, fields_found, PARSER_VERSION
+from csv_ingest import hash_statement, read_transactions, ingest_transactions, MAX_CSV_ERROR_LINES
+from csv_formats import get_formats as get_csv_formats
+from data_export import export_response
+from export_cache import get_export_cache
+from wave_cache import get_wave_cache
+from page_cache import get_page_cache
+from object_cache import get_object_cache
 
 # Setup logging
 logger = setup_logging()
@@ -31,39 +43,33 @@ ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'pdf'}
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
+# Let the intake page upload receipts straight to storage (R2 presigned PUT) instead of through the app
+DIRECT_RECEIPT_UPLOADS = os.environ.get('DIRECT_RECEIPT_UPLOADS') == '1'
+receipt_upload_signer = URLSafeTimedSerializer(app.secret_key, salt='receipt-upload')
+
 # Ensure upload folders exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs('csv_uploads', exist_ok=True)
 os.makedirs('static', exist_ok=True)
 
+# Hand each request's pooled connection back when the app context ends
+app.teardown_appcontext(release_db_connection)
+
+# Background workers for OCR and other slow work
+job_queue = get_job_queue()
+ocr_executor = get_ocr_executor()
+ocr_cache = get_ocr_cache()
+
+@app.before_request
+def start_background_workers():
+    """Start this process's job workers (once per gunicorn worker, after fork)"""
+    job_queue.ensure_started()
+
 logger.info("Application initialized successfully")
 
 def get_db_path():
-    """Get the database file path"""
-    # Use environment variable for database path (for persistent storage on Render)
-    db_path = os.environ.get('DATABASE_PATH', 'tickets.db')
-    
-    # Log the database path for debugging
-    logger.info(f"Database path from environment: {db_path}")
-    logger.info(f"All environment variables: {dict(os.environ)}")
-    
-    # Check if we're on Render and use persistent disk
-    if os.path.exists('/var/data'):
-        logger.info("Render persistent disk detected at /var/data")
-        db_path = '/var/data/tickets.db'
-    elif not os.path.dirname(db_path):
-        # If it's just a filename, make it relative to the app directory
-        db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), db_path)
-        logger.info(f"Database path resolved to: {db_path}")
-    
-    # Ensure the directory exists
-    db_dir = os.path.dirname(db_path)
-    if db_dir and not os.path.exists(db_dir):
-        os.makedirs(db_dir, exist_ok=True)
-        logger.info(f"Created database directory: {db_dir}")
-    
-    logger.info(f"Final database path: {db_path}")
-    return db_path
+    """Get the database file path (resolved once per process)"""
+    return get_connection_manager().db_path
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -92,7 +98,7 @@ def init_db():
         db_size = os.path.getsize(db_path)
         logger.info(f"Database size: {db_size} bytes")
     
-    conn = sqlite3.connect(db_path)
+    conn = get_db_connection()
     cursor = conn.cursor()
     
     # Create Admin Users table
@@ -122,13 +128,6 @@ def init_db():
         )
     ''')
     
-    # Add is_active column if it doesn't exist (for existing databases)
-    try:
-        cursor.execute('ALTER TABLE wave ADD COLUMN is_active BOOLEAN DEFAULT 0')
-    except sqlite3.OperationalError:
-        # Column already exists
-        pass
-    
     # Create Order table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS order_table (
@@ -251,67 +250,27 @@ def init_db():
         cursor.executemany('INSERT INTO wave (name, start_date, end_date, price_boy, price_girl, is_active) VALUES (?, ?, ?, ?, ?, ?)', waves)
     
     conn.commit()
-    conn.close()
-
-def get_current_wave():
-    """Get the current active wave"""
-    conn = sqlite3.connect(get_db_path())
-    cursor = conn.cursor()
     
-    # First check if is_active column exists
-    cursor.execute("PRAGMA table_info(wave)")
-    columns = [col[1] for col in cursor.fetchall()]
-    
-    if 'is_active' not in columns:
-        # Add is_active column if it doesn't exist
-        cursor.execute("ALTER TABLE wave ADD COLUMN is_active BOOLEAN DEFAULT 0")
-        conn.commit()
+    # Bring older databases up to the current schema (columns, indexes)
+    applied = run_migrations(conn)
+    if applied:
+        logger.info(f"Applied database migrations: {', '.join(applied)}")
     
-    # Get the active wave
-    cursor.execute('''
-        SELECT id, name, price_boy, price_girl, is_active
-        FROM wave 
-        WHERE is_active = 1
-        LIMIT 1
-    ''')
-    
-    result = cursor.fetchone()
     conn.close()
-    
-    if result:
-        return {
-            'id': result[0],
-            'name': result[1],
-            'price_boy': result[2],
-            'price_girl': result[3],
-            'is_active': result[4]
-        }
-    return None
+
+def get_current_wave():
+    """Get the current active wave (served from the wave cache)"""
+    return get_wave_cache().get_current()
 
 def get_all_waves():
-    """Get all waves for selection"""
-    conn = sqlite3.connect(get_db_path())
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT id, name, start_date, end_date, price_boy, price_girl, is_active FROM wave ORDER BY start_date')
-    waves = cursor.fetchall()
-    conn.close()
-    
-    return [{
-        'id': wave[0],
-        'name': wave[1],
-        'start_date': wave[2],
-        'end_date': wave[3],
-        'price_boy': wave[4],
-        'price_girl': wave[5],
-        'is_active': wave[6]
-    } for wave in waves]
+    """Get all waves for selection (served from the wave cache)"""
+    return get_wave_cache().get_all()
 
 def log_audit_action(action, details=None):
     """Log admin actions for audit trail"""
     try:
         admin_user_id = session.get('admin_user_id')
-        conn = sqlite3.connect(get_db_path())
+        conn = get_db_connection()
         cursor = conn.cursor()
         cursor.execute('''
             INSERT INTO audit_log (admin_user_id, action, details, ip_address, user_agent)
@@ -327,136 +286,14 @@ def log_audit_action(action, details=None):
     except Exception as e:
         log_error(logger, e, f"Audit logging failed for action: {action}")
 
-def export_orders_to_excel():
-    """Export all orders to Excel spreadsheet"""
-    try:
-        conn = sqlite3.connect(get_db_path())
-        cursor = conn.cursor()
-        
-        # Get all orders with wave information
-        cursor.execute('''
-            SELECT 
-                o.id, o.uuid, o.name, o.email, o.referral, 
-                o.boys_count, o.girls_count, o.expected_amount,
-                o.ocr_amount, o.ocr_date, o.ocr_name, o.status,
-                o.created_at, w.name as wave_name, w.price_boy, w.price_girl
-            FROM order_table o
-            LEFT JOIN wave w ON o.wave_id = w.id
-            ORDER BY o.created_at DESC
-        ''')
-        orders = cursor.fetchall()
-        conn.close()
-        
-        # Create Excel workbook
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Customer Orders"
-        
-        # Define headers
-        headers = [
-            'Order ID', 'UUID', 'Customer Name', 'Email', 'Referral Code',
-            'Boys Tickets', 'Girls Tickets', 'Expected Amount', 'OCR Amount',
-            'OCR Date', 'OCR Payer Name', 'Status', 'Created Date',
-            'Wave Name', 'Wave Price (Boys)', 'Wave Price (Girls)'
-        ]
-        
-        # Style for headers
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="1F4E79", end_color="1F4E79", fill_type="solid")
-        header_alignment = Alignment(horizontal="center", vertical="center")
-        
-        # Add headers
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-        
-        # Add data
-        for row, order in enumerate(orders, 2):
-            ws.cell(row=row, column=1, value=order[0])  # Order ID
-            ws.cell(row=row, column=2, value=order[1])  # UUID
-            ws.cell(row=row, column=3, value=order[2])  # Name
-            ws.cell(row=row, column=4, value=order[3])  # Email
-            ws.cell(row=row, column=5, value=order[4] or '')  # Referral
-            ws.cell(row=row, column=6, value=order[5])  # Boys count
-            ws.cell(row=row, column=7, value=order[6])  # Girls count
-            ws.cell(row=row, column=8, value=order[7])  # Expected amount
-            ws.cell(row=row, column=9, value=order[8] or '')  # OCR amount
-            ws.cell(row=row, column=10, value=order[9] or '')  # OCR date
-            ws.cell(row=row, column=11, value=order[10] or '')  # OCR name
-            ws.cell(row=row, column=12, value=order[11])  # Status
-            ws.cell(row=row, column=13, value=order[12])  # Created date
-            ws.cell(row=row, column=14, value=order[13] or '')  # Wave name
-            ws.cell(row=row, column=15, value=order[14] or '')  # Wave price boys
-            ws.cell(row=row, column=16, value=order[15] or '')  # Wave price girls
-        
-        # Auto-adjust column widths
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # Save to bytes
-        excel_file = io.BytesIO()
-        wb.save(excel_file)
-        excel_file.seek(0)
-        
-        return excel_file
-        
-    except Exception as e:
-        print(f"Error exporting to Excel: {e}")
-        return None
-
 def extract_text_from_image(image_path):
     """Extract text from image using OCR"""
     start_time = time.time()
     try:
-        # Try to find Tesseract in common locations
-        tesseract_paths = [
-            '/usr/bin/tesseract',
-            '/usr/local/bin/tesseract',
-            'tesseract'
-        ]
-        
-        tesseract_found = False
-        for path in tesseract_paths:
-            try:
-                pytesseract.pytesseract.tesseract_cmd = path
-                version = pytesseract.get_tesseract_version()
-                logger.info(f"Tesseract found at {path}, version: {version}")
-                tesseract_found = True
-                break
-            except Exception as e:
-                logger.debug(f"Tesseract not found at {path}: {e}")
-                continue
-        
-        if not tesseract_found:
-            logger.info("Tesseract not found, trying EasyOCR as fallback...")
-            try:
-                import easyocr
-                reader = easyocr.Reader(['en'])
-                image = Image.open(image_path)
-                results = reader.readtext(image_path)
-                text = '\n'.join([result[1] for result in results])
-                logger.info(f"EasyOCR extracted {len(text)} characters")
-                return text
-            except ImportError:
-                logger.error("EasyOCR not available. Please install with: pip install easyocr")
-                return "OCR_NOT_AVAILABLE"
-            except Exception as e:
-                logger.error(f"EasyOCR failed: {e}")
-                return "OCR_NOT_AVAILABLE"
-        
-        image = Image.open(image_path)
-        text = pytesseract.image_to_string(image)
+        # The OCR pool resolves Tesseract/EasyOCR once per worker process
+        text = ocr_executor.ocr_image(image_path)
+        if text == OCR_NOT_AVAILABLE:
+            return text
         
         duration = time.time() - start_time
         log_performance(logger, "OCR Image Processing", duration, f"File: {os.path.basename(image_path)}")
@@ -467,6 +304,40 @@ def extract_text_from_image(image_path):
         log_error(logger, e, f"OCR failed for image: {image_path}")
         return ""
 
+# Resolution for rasterizing scanned PDF pages before OCR
+PDF_RENDER_DPI = int(os.environ.get('PDF_RENDER_DPI', 200))
+
+def iter_pdf_pages(pdf_path, dpi=PDF_RENDER_DPI):
+    """Lazily rasterize a PDF one page at a time, yielding grayscale PNG bytes"""
+    try:
+        import fitz  # PyMuPDF
+    except ImportError:
+        fitz = None
+        logger.info("PyMuPDF not available, using pdf2image...")
+    
+    if fitz:
+        with fitz.open(pdf_path) as doc:
+            for page in doc:
+                yield page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY).tobytes("png")
+        return
+    
+    page_count = pdf2image.pdfinfo_from_path(pdf_path)['Pages']
+    for page_num in range(1, page_count + 1):
+        image = pdf2image.convert_from_path(pdf_path, dpi=dpi, first_page=page_num,
+                                            last_page=page_num, grayscale=True)[0]
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+        image.close()
+        yield buffer.getvalue()
+
+def receipt_fields_found(page_texts):
+    """Stop OCRing further pages once the amount and date are known (or OCR is unavailable)"""
+    # Long PDFs can outlast the job lease; renew it after every page
+    job_queue.heartbeat()
+    if page_texts[-1] == OCR_NOT_AVAILABLE:
+        return True
+    return fields_found(parse_receipt('\n'.join(page_texts)))
+
 def extract_text_from_pdf(pdf_path):
     """Extract text from PDF using OCR"""
     start_time = time.time()
@@ -495,80 +366,24 @@ def extract_text_from_pdf(pdf_path):
         except Exception as e:
             logger.info(f"PyMuPDF failed: {e}, trying OCR...")
         
-        # Try to find Tesseract in common locations
-        tesseract_paths = [
-            '/usr/bin/tesseract',
-            '/usr/local/bin/tesseract',
-            'tesseract'
-        ]
-        
-        tesseract_found = False
-        for path in tesseract_paths:
-            try:
-                pytesseract.pytesseract.tesseract_cmd = path
-                version = pytesseract.get_tesseract_version()
-                logger.info(f"Tesseract found at {path}, version: {version}")
-                tesseract_found = True
-                break
-            except Exception as e:
-                logger.debug(f"Tesseract not found at {path}: {e}")
-                continue
-        
-        if not tesseract_found:
-            logger.info("Tesseract not found, trying EasyOCR as fallback...")
-            try:
-                import easyocr
-                reader = easyocr.Reader(['en'])
-                
-                # Convert PDF to images using PyMuPDF
-                try:
-                    import fitz
-                    doc = fitz.open(pdf_path)
-                    text = ""
-                    for page_num in range(len(doc)):
-                        page = doc.load_page(page_num)
-                        pix = page.get_pixmap()
-                        img_data = pix.tobytes("png")
-                        
-                        # Save temporary image
-                        temp_img_path = f"/tmp/pdf_page_{page_num}.png"
-                        with open(temp_img_path, "wb") as f:
-                            f.write(img_data)
-                        
-                        # OCR the image
-                        results = reader.readtext(temp_img_path)
-                        page_text = '\n'.join([result[1] for result in results])
-                        text += page_text + "\n"
-                        
-                        # Clean up temp file
-                        os.remove(temp_img_path)
-                    
-                    doc.close()
-                    duration = time.time() - start_time
-                    log_performance(logger, "PDF OCR with EasyOCR", duration, f"File: {os.path.basename(pdf_path)}")
-                    return text
-                except Exception as e:
-                    logger.error(f"EasyOCR PDF processing failed: {e}")
-                    return "OCR_NOT_AVAILABLE"
-            except ImportError:
-                logger.error("EasyOCR not available. Please install with: pip install easyocr")
-                return "OCR_NOT_AVAILABLE"
-        
-        # Use pdf2image + Tesseract
+        # Rasterize pages lazily and OCR them concurrently, stopping early
+        # once the receipt's amount and date have been found
         try:
-            images = pdf2image.convert_from_path(pdf_path)
+            page_texts = ocr_executor.ocr_pages(iter_pdf_pages(pdf_path), stop_when=receipt_fields_found)
         except Exception as e:
             logger.error(f"PDF conversion failed. Please install poppler-utils. Error: {e}")
             return "PDF_CONVERSION_FAILED"
         
+        if page_texts and page_texts[-1] == OCR_NOT_AVAILABLE:
+            return OCR_NOT_AVAILABLE
+        
         text = ""
-        for i, image in enumerate(images):
-            page_text = pytesseract.image_to_string(image)
+        for i, page_text in enumerate(page_texts):
             text += page_text + "\n"
             logger.debug(f"PDF OCR - Page {i+1}: {len(page_text)} characters")
         
         duration = time.time() - start_time
-        log_performance(logger, "OCR PDF Processing", duration, f"File: {os.path.basename(pdf_path)}, Pages: {len(images)}")
+        log_performance(logger, "OCR PDF Processing", duration, f"File: {os.path.basename(pdf_path)}, Pages OCRed: {len(page_texts)}")
         
         return text
     except Exception as e:
@@ -577,368 +392,178 @@ def extract_text_from_pdf(pdf_path):
         return ""
 
 def parse_ocr_data(text):
-    """Parse OCR text to extract amount, date, and payer name"""
-    lines = text.split('\n')
-    amount = None
-    date = None
-    name = None
-    
-    # Debug: Log the raw OCR text
-    print(f"OCR Debug - Raw text length: {len(text)}")
-    print(f"OCR Debug - First 200 chars: {text[:200]}")
-    
-    # Common patterns for Venmo/Zelle receipts
-    for line in lines:
-        line = line.strip()
-        
-        # Look for amount patterns - enhanced for Venmo
-        if '$' in line:
-            try:
-                # Handle Venmo's "- $14" format and other variations
-                amount_match = re.search(r'[\-\+]?\s*\$?\s*(\d+\.?\d*)', line)
-                if amount_match:
-                    amount = float(amount_match.group(1))
-                    print(f"OCR Debug - Found amount: {amount} in line: {line}")
-            except:
-                pass
-        
-        # Look for date patterns - enhanced for Venmo format
-        date_patterns = [
-            r'(\w+ \d{1,2}, \d{4})',  # January 28, 2025
-            r'(\d{1,2}/\d{1,2}/\d{4})',  # 01/28/2025
-            r'(\d{4}-\d{2}-\d{2})',  # 2025-01-28
-            r'(\w+ \d{1,2}, \d{4}, \d{1,2}:\d{2} [AP]M)',  # January 28, 2025, 7:16 PM
-        ]
-        
-        for pattern in date_patterns:
-            date_match = re.search(pattern, line)
-            if date_match:
-                try:
-                    date_str = date_match.group(1)
-                    for fmt in ['%B %d, %Y', '%m/%d/%Y', '%Y-%m-%d', '%B %d, %Y, %I:%M %p']:
-                        try:
-                            if fmt == '%B %d, %Y, %I:%M %p':
-                                # For datetime format, extract just the date part
-                                date = datetime.strptime(date_str, fmt).date()
-                            else:
-                                date = datetime.strptime(date_str, fmt).date()
-                            print(f"OCR Debug - Found date: {date} in line: {line}")
-                            break
-                        except:
-                            continue
-                    if date:
-                        break
-                except:
-                    pass
-        
-        # Look for payer name patterns - enhanced for Venmo
-        if not name and len(line) > 2 and len(line) < 100:
-            # Check for email format
-            if '@' in line and '.' in line:
-                email_name = line.split('@')[0]
-                if '.' in email_name:
-                    name_parts = email_name.split('.')
-                    name = ' '.join(part.capitalize() for part in name_parts)
-                else:
-                    name = email_name.capitalize()
-                print(f"OCR Debug - Found name from email: {name} in line: {line}")
-            # Check for full name format
-            elif ' ' in line and not any(char.isdigit() for char in line):
-                # Skip common non-name words
-                skip_words = ['complete', 'status', 'payment', 'transaction', 'details', 'depsi', 'utd', 'beta', 'chapter']
-                if not any(word in line.lower() for word in skip_words):
-                    name = line
-                    print(f"OCR Debug - Found name: {name} in line: {line}")
-    
-    # Fallback name search
-    if not name:
-        for line in lines:
-            line = line.strip()
-            if (len(line) > 3 and len(line) < 50 and
-                ' ' in line and
-                not any(char.isdigit() for char in line) and
-                not line.lower() in ['complete', 'status', 'payment', 'transaction', 'details', 'depsi', 'utd']):
-                name = line
-                print(f"OCR Debug - Found name (fallback): {name} in line: {line}")
-                break
-    
-    result = {
-        'amount': amount,
-        'date': date,
-        'name': name
-    }
-    print(f"OCR Debug - Final parsed data: {result}")
+    """Parse OCR text to extract amount, date, and payer name (with confidence scores)"""
+    result = parse_receipt(text)
+    logger.debug(f"Parsed OCR data: {result}")
     return result
 
 def match_transaction(order_id):
     """Match order with imported transactions from both Venmo and Zelle tables"""
     start_time = time.time()
-    conn = sqlite3.connect(get_db_path())
-    cursor = conn.cursor()
-    
-    # Get order details
-    cursor.execute('''
-        SELECT expected_amount, ocr_amount, ocr_date, ocr_name
-        FROM order_table WHERE id = ?
-    ''', (order_id,))
-    
-    order = cursor.fetchone()
-    if not order:
-        conn.close()
-        return False
-    
-    expected_amount, ocr_amount, ocr_date, ocr_name = order
+    result = reconcile_orders(get_db_connection(), order_ids=[order_id])
     
-    if not ocr_amount or not ocr_date:
-        conn.close()
+    if not result['orders_considered']:
         return False
     
-    # Convert ocr_date to string for comparison
-    if isinstance(ocr_date, str):
-        ocr_date_str = ocr_date
-    else:
-        ocr_date_str = ocr_date.strftime('%Y-%m-%d')
-    
-    # Look for matching transaction in Venmo table
-    cursor.execute('''
-        SELECT id FROM venmo_transactions 
-        WHERE amount = ? 
-        AND datetime LIKE ?
-    ''', (ocr_amount, f"{ocr_date_str}%"))
-    
-    venmo_match = cursor.fetchone()
-    
-    # Look for matching transaction in Zelle table
-    cursor.execute('''
-        SELECT id FROM zelle_transactions 
-        WHERE amount = ? 
-        AND date = ?
-    ''', (ocr_amount, ocr_date_str))
-    
-    zelle_match = cursor.fetchone()
-    
-    # Update order status based on matches
-    if venmo_match or zelle_match:
-        cursor.execute('UPDATE order_table SET status = ? WHERE id = ?', ('Verified', order_id))
-        match_found = True
-    else:
-        cursor.execute('UPDATE order_table SET status = ? WHERE id = ?', ('Flagged', order_id))
-        match_found = False
-    
-    conn.commit()
-    conn.close()
+    match_found = result['matched'] > 0
     
     duration = time.time() - start_time
     log_performance(logger, "Transaction Matching", duration, f"Order ID: {order_id}, Result: {'Matched' if match_found else 'No match'}")
     
     return match_found
 
+def process_receipt(order_id, receipt_path, filename, local_path=None, receipt_hash=None):
+    """
+    Run OCR on an order's receipt and match it against imported transactions
 
-
-def detect_csv_format(csv_content):
-    """Detect whether CSV is Chase or Venmo format"""
-    lines = csv_content.split('\n')
-    if not lines:
-        return 'unknown'
-    
-    # Check first few lines for format indicators
-    header_line = lines[0].lower()
-    
-    # Chase format indicators
-    if any(indicator in header_line for indicator in ['details', 'posting date', 'description', 'amount', 'type', 'balance']):
-        return 'chase'
-    
-    # Venmo format indicators (common Venmo CSV headers)
-    if any(indicator in header_line for indicator in ['datetime', 'type', 'note', 'from', 'to', 'amount', 'fee', 'net', 'status']):
-        return 'venmo'
+    Args:
+        order_id: Order to process
+        receipt_path: Storage path of the receipt
+        filename: Stored filename
+        local_path: Local copy kept by submit_order (used instead of downloading from R2 if it still exists)
+        receipt_hash: SHA-256 computed while the receipt was uploaded
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
     
-    # If we can't detect from header, try to infer from data structure
-    if len(lines) > 1:
-        first_data_line = lines[1]
-        parts = first_data_line.split(',')
+    # Perform OCR (or reuse the result for an identical receipt)
+    cached = None
+    if local_path and os.path.exists(local_path):
+        local_filepath = local_path
+    else:
+        # The copy is gone (e.g. a retry on another worker): fetch the stored file
+        local_filepath = get_file_path(receipt_path)
+    if local_filepath:
+        if not receipt_hash:
+            with open(local_filepath, 'rb') as f:
+                receipt_hash = hash_receipt(f.read())
+        # Record the hash straight away so concurrent duplicates can see it
+        cursor.execute('UPDATE order_table SET receipt_hash = ? WHERE id = ?', (receipt_hash, order_id))
+        conn.commit()
         
-        # Chase typically has more columns and specific date format
-        if len(parts) >= 6 and any('/' in part for part in parts):
-            return 'chase'
+        engine_key = f"{ocr_executor.engine_signature()}|parser-{PARSER_VERSION}"
+        cached = ocr_cache.get(receipt_hash, engine_key)
+        if cached:
+            logger.info(f"OCR cache hit for {filename} ({receipt_hash[:12]})")
+            ocr_text = cached['text']
+        elif filename.lower().endswith('.pdf'):
+            ocr_text = extract_text_from_pdf(local_filepath)
+        else:
+            ocr_text = extract_text_from_image(local_filepath)
         
-        # Venmo typically has fewer columns and different date format
-        if len(parts) <= 8:
-            return 'venmo'
-    
-    return 'unknown'
-
-def parse_chase_csv(csv_content):
-    """Parse Chase CSV format and return full structured data"""
-    transactions = []
-    
-    # Skip header row
-    lines = csv_content.split('\n')[1:]
+        # Clean up the temporary file if it was downloaded from R2 or spooled for the upload
+        if is_temp_file(local_filepath):
+            cleanup_temp_file(local_filepath)
+    else:
+        ocr_text = "FILE_NOT_ACCESSIBLE"
+        logger.error(f"Could not access uploaded file: {receipt_path}")
+    
+    # Handle OCR dependency issues
+    ocr_available = ocr_text not in ["OCR_NOT_AVAILABLE", "PDF_CONVERSION_FAILED", "FILE_NOT_ACCESSIBLE"]
+    if cached:
+        ocr_data = cached['parsed']
+    elif not ocr_available:
+        logger.warning(f"OCR processing failed for {filename}: {ocr_text}")
+        ocr_data = {'amount': None, 'date': None, 'name': None}
+    else:
+        # Log OCR results for troubleshooting
+        logger.debug(f"OCR Raw text (first 200 chars): {ocr_text[:200]}...")
+        ocr_data = parse_ocr_data(ocr_text)
+        if ocr_text:
+            ocr_cache.put(receipt_hash, engine_key, ocr_text, ocr_data)
+    
+    # Log parsed OCR data
+    log_ocr_processing(logger, filename, ocr_text, ocr_data)
+    
+    # The same receipt bytes on an earlier order is a potential reused screenshot
+    duplicate_of = None
+    if receipt_hash:
+        cursor.execute('''
+            SELECT id FROM order_table WHERE receipt_hash = ? AND id < ?
+            ORDER BY id LIMIT 1
+        ''', (receipt_hash, order_id))
+        duplicate = cursor.fetchone()
+        if duplicate:
+            duplicate_of = duplicate[0]
+            logger.warning(f"Order {order_id} reuses the receipt of order {duplicate_of}; flagging as potential duplicate")
     
-    for line in lines:
-        if not line.strip():
-            continue
-            
-        # Parse Chase CSV format: Details,Posting Date,Description,Amount,Type,Balance,Check or Slip #
-        parts = line.split(',')
-        if len(parts) >= 4:
-            try:
-                # Extract date (format: 3/6/25)
-                date_str = parts[1].strip()
-                if date_str:
-                    # Convert to YYYY-MM-DD format
-                    date_parts = date_str.split('/')
-                    if len(date_parts) == 3:
-                        month, day, year = date_parts
-                        year = '20' + year if len(year) == 2 else year
-                        date = f"{year}-{month.zfill(2)}-{day.zfill(2)}"
-                    else:
-                        continue
-                else:
-                    continue
-                
-                # Extract amount (remove any currency symbols and convert to float)
-                amount_str = parts[3].strip()
-                amount = float(amount_str.replace('$', '').replace(',', ''))
-                
-                # Extract description
-                description = parts[2].strip()
-                
-                # Extract transaction type
-                transaction_type = parts[4].strip() if len(parts) > 4 else ""
-                
-                # Extract balance
-                balance = 0.0
-                if len(parts) > 5:
-                    balance_str = parts[5].strip()
-                    if balance_str:
-                        balance = float(balance_str.replace('$', '').replace(',', ''))
-                
-                # Parse Zelle payment descriptions
-                # Format: "ZELLE PAYMENT FROM JOHN DOE" or "Zelle payment from JOHN DOE"
-                payer_match = re.search(r'(?:ZELLE PAYMENT FROM|Zelle payment from)\s+(.+)', description, re.IGNORECASE)
-                if payer_match:
-                    payer_identifier = payer_match.group(1).strip()
-                else:
-                    # Fallback: use description as payer identifier
-                    payer_identifier = description
-                
-                transactions.append({
-                    'date': date,
-                    'description': description,
-                    'amount': amount,
-                    'type': transaction_type,
-                    'balance': balance,
-                    'payer_identifier': payer_identifier
-                })
-                
-            except (ValueError, IndexError) as e:
-                print(f"Error parsing Chase line: {line}, Error: {e}")
-                continue
+    cursor.execute('''
+        UPDATE order_table 
+        SET ocr_amount = ?, ocr_date = ?, ocr_name = ?, duplicate_of = ?, status = ?
+        WHERE id = ? AND status = 'Processing'
+    ''', (ocr_data['amount'], ocr_data['date'], ocr_data['name'], duplicate_of,
+          'Flagged' if duplicate_of else 'Pending', order_id))
+    conn.commit()
+    conn.close()
     
-    return transactions
+    # Try to match with transactions
+    match_result = False
+    if ocr_data['amount'] and ocr_data['date'] and not duplicate_of:
+        match_result = match_transaction(order_id)
+        logger.info(f"Transaction matching result for order {order_id}: {'Matched' if match_result else 'No match'}")
+    
+    return {
+        'ocr_available': ocr_available,
+        'cached': bool(cached),
+        'duplicate_of': duplicate_of,
+        'amount': ocr_data['amount'],
+        'date': str(ocr_data['date']) if ocr_data['date'] else None,
+        'confidence': ocr_data.get('confidence'),
+        'matched': match_result
+    }
 
-def parse_venmo_csv(csv_content):
-    """Parse Venmo CSV format and return full structured data"""
-    transactions = []
+def receipt_job_failed(payload, error):
+    """Flag the order of a receipt whose OCR job failed for good and remove its spool copy"""
+    cleanup_temp_file(payload.get('local_path'))
     
-    # Skip first 3 lines (header rows)
-    lines = csv_content.split('\n')[3:]
-    
-    print(f"Venmo CSV Debug - Processing {len(lines)} data lines")
-    
-    for line in lines:
-        if not line.strip():
-            continue
-            
-        # Parse Venmo CSV format
-        # Actual format: ,ID,Datetime,Type,Status,Note,From,To,Amount (total),...
-        parts = line.split(',')
-        if len(parts) >= 9:
-            try:
-                # Extract datetime (format: "2025-03-24T15:50:20")
-                datetime_str = parts[2].strip()  # Datetime is in column 2
-                if not datetime_str or 'T' not in datetime_str:
-                    continue
-                
-                # Extract transaction type
-                transaction_type = parts[3].strip() if len(parts) > 3 else ""
-                
-                # Extract note
-                note = parts[5].strip() if len(parts) > 5 else ""
-                
-                # Extract from user
-                from_user = parts[6].strip() if len(parts) > 6 else ""
-                
-                # Extract to user
-                to_user = parts[7].strip() if len(parts) > 7 else ""
-                
-                # Extract amount (remove any currency symbols and convert to float)
-                amount_str = parts[8].strip()  # Amount (total) is in column 8
-                if amount_str.startswith('$'):
-                    amount = float(amount_str.replace('$', '').strip())
-                else:
-                    continue
-                
-                # Extract fee (if available)
-                fee = 0.0
-                if len(parts) > 9:
-                    fee_str = parts[9].strip()
-                    if fee_str.startswith('$'):
-                        fee = float(fee_str.replace('$', '').strip())
-                
-                # Calculate net amount
-                net_amount = amount - fee
-                
-                # Only include incoming payments (positive amounts) and "Payment" type
-                if amount > 0 and transaction_type == "Payment":
-                    transactions.append({
-                        'datetime': datetime_str,
-                        'type': transaction_type,
-                        'note': note,
-                        'from_user': from_user,
-                        'to_user': to_user,
-                        'amount': amount,
-                        'fee': fee,
-                        'net_amount': net_amount
-                    })
-                    print(f"Venmo CSV Debug - Added transaction: {from_user} -> {to_user}, Amount: ${amount}")
-                
-            except (ValueError, IndexError) as e:
-                print(f"Error parsing Venmo line: {line}, Error: {e}")
-                continue
-    
-    return transactions
+    # Without this the order stays Processing, out of reach of matching and the admin queue
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        UPDATE order_table SET status = 'Flagged' WHERE id = ? AND status = 'Processing'
+    ''', (payload['order_id'],))
+    conn.commit()
+    conn.close()
+    logger.warning(f"Receipt processing failed for order {payload['order_id']}; flagged for review: {error}")
 
-def parse_csv_transactions(csv_content):
-    """Universal CSV parser that detects format and parses accordingly"""
-    format_type = detect_csv_format(csv_content)
-    
-    print(f"Detected CSV format: {format_type}")
-    
-    if format_type == 'chase':
-        return parse_chase_csv(csv_content)
-    elif format_type == 'venmo':
-        return parse_venmo_csv(csv_content)
-    else:
-        # Try both parsers and return whichever works
-        chase_transactions = parse_chase_csv(csv_content)
-        venmo_transactions = parse_venmo_csv(csv_content)
-        
-        if chase_transactions and not venmo_transactions:
-            return chase_transactions
-        elif venmo_transactions and not chase_transactions:
-            return venmo_transactions
-        elif chase_transactions and venmo_transactions:
-            # Return the one with more transactions (likely the correct format)
-            return chase_transactions if len(chase_transactions) > len(venmo_transactions) else venmo_transactions
-        else:
-            return []
+@job_queue.handler('process_receipt', on_failure=receipt_job_failed)
+def process_receipt_job(payload):
+    """Job handler for receipts queued by submit_order"""
+    return process_receipt(payload['order_id'], payload['receipt_path'], payload['filename'],
+                           payload.get('local_path'), payload.get('receipt_hash'))
 
 @app.route('/')
 def index():
-    """Customer intake form"""
-    current_wave = get_current_wave()
-    return render_template('index.html', wave=current_wave)
+    """
+    Customer intake form
+
+    The page is rendered once per wave version and served from the page cache
+    with an ETag and Last-Modified, so browsers and proxies can revalidate it
+    with a 304. Pages carrying per-visitor content (an order being polled,
+    flashed messages) are rendered fresh and never cached.
+    """
+    # Set after a submission so the page can poll the order's processing status
+    order_uuid = request.args.get('order')
+    if order_uuid or session.get('_flashes'):
+        response = make_response(render_template('index.html', wave=get_current_wave(), order_uuid=order_uuid,
+                                                 direct_upload=DIRECT_RECEIPT_UPLOADS))
+        response.headers['Cache-Control'] = 'private, no-store'
+        return response
+    
+    # The navigation differs for logged-in admins, so they get their own copy
+    variant = 'admin' if session.get('admin_logged_in') else 'public'
+    page = get_page_cache().get_or_render(
+        f'index-{variant}', get_wave_cache().get_version(),
+        lambda: render_template('index.html', wave=get_current_wave(), order_uuid=None,
+                                direct_upload=DIRECT_RECEIPT_UPLOADS)
+    )
+    
+    response = make_response(page['body'])
+    response.set_etag(page['etag'])
+    response.last_modified = page['rendered_at']
+    response.headers['Cache-Control'] = 'public, no-cache' if variant == 'public' else 'private, no-cache'
+    response.vary.add('Cookie')
+    return response.make_conditional(request)
 
 @app.route('/submit', methods=['POST'])
 def submit_order():
@@ -951,8 +576,14 @@ def submit_order():
         boys_count = int(request.form['boys_count'])
         girls_count = int(request.form['girls_count'])
         
-        # Generate UUID
-        order_uuid = str(uuid.uuid4())
+        # Generate UUID (direct uploads were given theirs with the upload URL)
+        direct_upload = None
+        if request.form.get('receipt_upload'):
+            direct_upload = receipt_upload_signer.loads(request.form['receipt_upload'],
+                                                        max_age=RECEIPT_UPLOAD_URL_TTL * 2)
+            order_uuid = direct_upload['uuid']
+        else:
+            order_uuid = str(uuid.uuid4())
         
         # Get current wave information
         current_wave = get_current_wave()
@@ -969,73 +600,63 @@ def submit_order():
         
         # Handle file upload
         receipt_path = None
-        if 'receipt' in request.files:
+        filename = None
+        local_path = None
+        receipt_hash = None
+        if direct_upload:
+            # The browser already stored the file; check it arrived and respects the size limit
+            size = get_stored_file_size(direct_upload['path'])
+            if size is None:
+                flash('Receipt upload not found. Please upload it again.', 'error')
+                return redirect(url_for('index'))
+            if size > app.config['MAX_CONTENT_LENGTH']:
+                get_storage_service().delete_file(direct_upload['path'])
+                flash('Receipt file is too large', 'error')
+                return redirect(url_for('index'))
+            receipt_path = direct_upload['path']
+            filename = os.path.basename(receipt_path)
+        elif 'receipt' in request.files:
             file = request.files['receipt']
             if file and allowed_file(file.filename):
                 filename = secure_filename(f"{order_uuid}_{file.filename}")
                 
-                # Upload to R2 or local storage
-                success, storage_path = upload_receipt(file, filename)
+                # Upload to R2 or local storage, keeping the local copy and hash for the OCR job
+                success, storage_path, local_path, receipt_hash = upload_receipt_with_copy(file, filename)
                 if success:
                     receipt_path = storage_path
                 else:
                     flash('Failed to upload receipt file', 'error')
                     return redirect(url_for('index'))
-                
-                # Perform OCR
-                local_filepath = get_file_path(receipt_path)
-                if local_filepath:
-                    if filename.lower().endswith('.pdf'):
-                        ocr_text = extract_text_from_pdf(local_filepath)
-                    else:
-                        ocr_text = extract_text_from_image(local_filepath)
-                    
-                    # Clean up temporary file if it was downloaded from R2
-                    if local_filepath.startswith('/tmp/'):
-                        cleanup_temp_file(local_filepath)
-                else:
-                    ocr_text = "FILE_NOT_ACCESSIBLE"
-                    logger.error(f"Could not access uploaded file: {receipt_path}")
-                
-                # Handle OCR dependency issues
-                if ocr_text in ["OCR_NOT_AVAILABLE", "PDF_CONVERSION_FAILED"]:
-                    logger.warning(f"OCR processing failed for {filename}: {ocr_text}")
-                    ocr_data = {'amount': None, 'date': None, 'name': None}
-                    flash('Receipt uploaded but OCR processing is unavailable. Please contact administrator.', 'warning')
-                else:
-                    # Log OCR results for troubleshooting
-                    logger.debug(f"OCR Raw text (first 200 chars): {ocr_text[:200]}...")
-                    ocr_data = parse_ocr_data(ocr_text)
-                
-                # Log parsed OCR data
-                log_ocr_processing(logger, filename, ocr_text, ocr_data)
             else:
                 flash('Invalid file type', 'error')
                 return redirect(url_for('index'))
-        else:
-            ocr_data = {'amount': None, 'date': None, 'name': None}
         
-        # Save to database
-        conn = sqlite3.connect(get_db_path())
+        # Save to database; receipts stay "Processing" until the OCR job has run
+        status = 'Processing' if receipt_path else 'Pending'
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         cursor.execute('''
             INSERT INTO order_table 
             (uuid, name, email, referral, boys_count, girls_count, wave_id, 
-             expected_amount, ocr_amount, ocr_date, ocr_name, receipt_path)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+             expected_amount, status, receipt_path)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (order_uuid, name, email, referral, boys_count, girls_count, 
-              wave_id, expected_amount, ocr_data['amount'], 
-              ocr_data['date'], ocr_data['name'], receipt_path))
+              wave_id, expected_amount, status, receipt_path))
         
         order_id = cursor.lastrowid
         conn.commit()
         conn.close()
         
-        # Try to match with transactions
-        if ocr_data['amount'] and ocr_data['date']:
-            match_result = match_transaction(order_id)
-            logger.info(f"Transaction matching result for order {order_uuid}: {'Matched' if match_result else 'No match'}")
+        # OCR and matching run in the background so the worker is free immediately
+        if receipt_path:
+            job_queue.enqueue('process_receipt', {
+                'order_id': order_id,
+                'receipt_path': receipt_path,
+                'filename': filename,
+                'local_path': local_path,
+                'receipt_hash': receipt_hash
+            })
         
         # Log successful order submission
         order_data = {
@@ -1049,19 +670,100 @@ def submit_order():
         log_order_submission(logger, order_data)
         
         flash(f'Order submitted successfully! Your order ID is: {order_uuid}', 'success')
-        return redirect(url_for('index'))
+        return redirect(url_for('index', order=order_uuid))
         
+    except BadSignature:
+        flash('Receipt upload expired. Please upload it again.', 'error')
+        return redirect(url_for('index'))
     except Exception as e:
         log_error(logger, e, f"Order submission failed for {request.form.get('name', 'Unknown')}")
         flash(f'Error submitting order: {str(e)}', 'error')
         return redirect(url_for('index'))
 
+@app.route('/receipt-upload-url', methods=['POST'])
+def receipt_upload_url():
+    """
+    Hand the intake page a URL to upload a receipt to directly
+
+    With R2 this is a presigned PUT URL, so the file never passes through the
+    app; without it, the local stand-in endpoint below accepts the same PUT.
+    The returned token ties the stored file to the order UUID and is posted
+    with the form in place of the file.
+    """
+    if not DIRECT_RECEIPT_UPLOADS:
+        return jsonify({'success': False, 'error': 'Direct uploads are disabled'}), 404
+    
+    original_name = request.form.get('filename', '')
+    content_type = request.form.get('content_type') or 'application/octet-stream'
+    if not allowed_file(original_name):
+        return jsonify({'success': False, 'error': 'Invalid file type'}), 400
+    
+    order_uuid = str(uuid.uuid4())
+    storage_path, upload_url = create_receipt_upload(secure_filename(f"{order_uuid}_{original_name}"), content_type)
+    token = receipt_upload_signer.dumps({'uuid': order_uuid, 'path': storage_path})
+    if not upload_url:
+        if get_storage_service().is_enabled():
+            return jsonify({'success': False, 'error': 'Could not create upload URL'}), 503
+        upload_url = url_for('receipt_upload', token=token)
+    
+    response = jsonify({
+        'success': True,
+        'url': upload_url,
+        'method': 'PUT',
+        'headers': {'Content-Type': content_type},
+        'token': token
+    })
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.route('/receipt-upload/<token>', methods=['PUT'])
+def receipt_upload(token):
+    """Local stand-in for an R2 presigned PUT, used when R2 is not configured"""
+    if not DIRECT_RECEIPT_UPLOADS or get_storage_service().is_enabled():
+        return jsonify({'success': False, 'error': 'Not available'}), 404
+    
+    try:
+        upload = receipt_upload_signer.loads(token, max_age=RECEIPT_UPLOAD_URL_TTL)
+    except BadSignature:
+        return jsonify({'success': False, 'error': 'Upload URL expired or invalid'}), 403
+    
+    if not save_receipt_upload(request.stream, upload['path']):
+        return jsonify({'success': False, 'error': 'Failed to save receipt'}), 500
+    return jsonify({'success': True})
+
+@app.route('/order-status/<order_uuid>')
+def order_status(order_uuid):
+    """Processing status of a submitted order, polled by the intake page"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT status, expected_amount, ocr_amount, ocr_date
+        FROM order_table WHERE uuid = ?
+    ''', (order_uuid,))
+    order = cursor.fetchone()
+    conn.close()
+    
+    if not order:
+        return jsonify({'success': False, 'error': 'Order not found'}), 404
+    
+    response = jsonify({
+        'success': True,
+        'uuid': order_uuid,
+        'status': order[0],
+        'processing': order[0] == 'Processing',
+        'expected_amount': order[1],
+        'ocr_amount': order[2],
+        'ocr_date': order[3]
+    })
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
 
 @app.route('/admin/debug')
 def admin_debug():
     """Debug endpoint to check admin users (remove in production)"""
     try:
-        conn = sqlite3.connect(get_db_path())
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         # Check if admin_users table exists
@@ -1110,7 +812,7 @@ def admin_login():
                 flash('Username and password are required', 'error')
                 return render_template('admin_login.html')
             
-            conn = sqlite3.connect(get_db_path())
+            conn = get_db_connection()
             cursor = conn.cursor()
             
             # Check if any admin users exist
@@ -1185,7 +887,7 @@ def admin_change_password():
             flash('Password must be at least 8 characters long', 'error')
             return render_template('admin_change_password.html')
         
-        conn = sqlite3.connect(get_db_path())
+        conn = get_db_connection()
         cursor = conn.cursor()
         cursor.execute('SELECT password_hash FROM admin_users WHERE id = ?', (session['admin_user_id'],))
         user = cursor.fetchone()
@@ -1208,57 +910,176 @@ def admin_change_password():
 @app.route('/admin')
 @login_required
 def admin_dashboard():
-    """Admin dashboard with Kanban view"""
-    conn = sqlite3.connect(get_db_path())
-    cursor = conn.cursor()
-    
-    # Get orders grouped by status
-    cursor.execute('''
-        SELECT o.*, w.name as wave_name 
-        FROM order_table o 
-        LEFT JOIN wave w ON o.wave_id = w.id 
-        ORDER BY o.created_at DESC
-    ''')
-    
-    orders = cursor.fetchall()
-    conn.close()
-    
-    # Group by status
-    pending = [order for order in orders if order[12] == 'Pending']
-    verified = [order for order in orders if order[12] == 'Verified']
-    flagged = [order for order in orders if order[12] == 'Flagged']
-    completed = [order for order in orders if order[12] == 'Completed']
-    
-    # Get verified customers list (including both Verified and Completed statuses)
-    conn = sqlite3.connect(get_db_path())
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT name, email, boys_count, girls_count, expected_amount, created_at, status
-        FROM order_table 
-        WHERE status IN ('Verified', 'Completed')
-        ORDER BY created_at DESC
-    ''')
-    verified_customers = cursor.fetchall()
+    """Admin dashboard with Kanban view (first page of each status column)"""
+    conn = get_db_connection()
+    counts = count_orders(conn)
+    board = {column: fetch_orders(conn, column) for column in ('pending', 'verified', 'flagged', 'completed')}
     conn.close()
     
     # Log dashboard statistics
-    logger.info(f"Admin Dashboard - Total orders: {len(orders)}, Pending: {len(pending)}, Verified: {len(verified)}, Flagged: {len(flagged)}, Completed: {len(completed)}, Verified customers: {len(verified_customers)}")
+    logger.info(f"Admin Dashboard - Total orders: {counts['total']}, Pending: {counts['pending']}, Verified: {counts['verified']}, Flagged: {counts['flagged']}, Completed: {counts['completed']}, Verified customers: {counts['customers']}")
     
     # Create response with cache control headers
-    response = make_response(render_template('admin.html', 
-                         pending=pending, verified=verified, 
-                         flagged=flagged, completed=completed,
-                         verified_customers=verified_customers))
+    response = make_response(render_template('admin.html', counts=counts, board=board))
     response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
     response.headers['Pragma'] = 'no-cache'
     response.headers['Expires'] = '0'
     
     return response
 
+@app.route('/admin/orders')
+@login_required
+def list_orders():
+    """
+    One page of a dashboard column as JSON, for lazy loading and search
+
+    Query arguments: column (pending, verified, flagged, completed or customers),
+    after (next_cursor of the previous page), limit, q (name, email or UUID) and wave
+    """
+    try:
+        column = request.args.get('column', 'pending')
+        search = request.args.get('q', '').strip() or None
+        wave_id = request.args.get('wave', type=int)
+        after = request.args.get('after')
+        limit = request.args.get('limit', DASHBOARD_PAGE_SIZE, type=int)
+        
+        conn = get_db_connection()
+        page = fetch_orders(conn, column, after=after, limit=limit, search=search, wave_id=wave_id)
+        # Counts only change the column badges, so they come with the first page
+        if not after:
+            page['counts'] = count_orders(conn, search=search, wave_id=wave_id)
+        conn.close()
+        
+        return jsonify({'success': True, 'column': column, **page})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        log_error(logger, e, "Failed to list orders")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def import_csv(upload_id):
+    """Import a stored CSV statement, reporting progress on its csv_uploads row"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT filename, original_filename FROM csv_uploads WHERE id = ?', (upload_id,))
+    upload = cursor.fetchone()
+    if not upload:
+        raise LookupError(f"CSV upload {upload_id} not found")
+    storage_path, original_filename = upload
+    
+    cursor.execute('''
+        UPDATE csv_uploads
+        SET status = 'running', records_processed = 0, new_records = 0, updated_records = 0,
+            unchanged_records = 0, skipped_records = 0, error = NULL
+        WHERE id = ?
+    ''', (upload_id,))
+    conn.commit()
+    
+    def report_progress(counts):
+        # Committing here also makes each imported batch durable
+        elapsed = time.perf_counter() - started
+        cursor.execute('''
+            UPDATE csv_uploads
+            SET records_processed = ?, new_records = ?, updated_records = ?, unchanged_records = ?,
+                skipped_records = ?, rows_per_second = ?
+            WHERE id = ?
+        ''', (counts['records_processed'], counts['new_records'], counts['updated_records'],
+              counts['unchanged_records'] + counts['skipped_records'], counts['skipped_records'],
+              counts['records_processed'] / elapsed if elapsed else None, upload_id))
+        conn.commit()
+        # Keep the job's lease so a long import is not picked up by a second worker
+        if not job_queue.heartbeat():
+            raise JobLeaseLost(f"CSV upload {upload_id} import was taken over by another worker")
+    
+    local_file_path = get_file_path(storage_path)
+    try:
+        if not local_file_path:
+            raise FileNotFoundError(f"Could not access stored CSV file: {storage_path}")
+        
+        errors = []
+        started = time.perf_counter()
+        with open(local_file_path, 'rb') as f:
+            csv_format, transactions = read_transactions(f, errors=errors)
+            if csv_format is None:
+                supported = ', '.join(fmt.label for fmt in get_csv_formats())
+                cursor.execute('''
+                    UPDATE csv_uploads SET status = 'error', error = ?, finished_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', (f'Unrecognized CSV format. Supported exports: {supported}.', upload_id))
+                conn.commit()
+                logger.warning(f"Unrecognized CSV format in {original_filename}")
+                return {'upload_id': upload_id, 'status': 'error'}
+            
+            cursor.execute('UPDATE csv_uploads SET upload_type = ? WHERE id = ?', (csv_format.upload_type, upload_id))
+            counts = ingest_transactions(conn, csv_format.upload_type, transactions, os.path.basename(storage_path),
+                                         source=csv_format.name, progress=report_progress)
+        
+        status = 'partial' if errors else 'success'
+        cursor.execute('''
+            UPDATE csv_uploads
+            SET status = ?, records_processed = ?, new_records = ?, updated_records = ?, unchanged_records = ?,
+                skipped_records = ?, rows_per_second = ?, error_lines = ?,
+                error = ?, finished_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (status, counts['records_processed'], counts['new_records'], counts['updated_records'],
+              counts['unchanged_records'], counts['skipped_records'], counts['rows_per_second'],
+              json.dumps(errors[:MAX_CSV_ERROR_LINES]) if errors else None,
+              f'{len(errors)} row(s) could not be parsed' if errors else None, upload_id))
+        conn.commit()
+    except JobLeaseLost:
+        # The worker now holding the job reports on the upload row
+        conn.rollback()
+        raise
+    except Exception as e:
+        conn.rollback()
+        cursor.execute('''
+            UPDATE csv_uploads SET status = 'error', error = ?, finished_at = CURRENT_TIMESTAMP WHERE id = ?
+        ''', (str(e), upload_id))
+        conn.commit()
+        raise
+    finally:
+        # Clean up temporary file if it was downloaded from R2 (stored local files are left alone)
+        cleanup_temp_file(local_file_path)
+    
+    # Bulk imports grow the WAL; fold it back into the database file
+    get_connection_manager().maybe_checkpoint()
+    
+    # Rematch only the waiting orders whose amount/date could match a new or changed row
+    candidate_orders = find_candidate_orders(get_db_connection(), counts['touched'])
+    matched_count = 0
+    if candidate_orders:
+        match_result = reconcile_orders(get_db_connection(), order_ids=candidate_orders)
+        matched_count = match_result['matched']
+        log_performance(logger, "Batch Reconciliation", match_result['total_seconds'],
+                        f"Orders: {match_result['orders_considered']}, Matched: {matched_count}")
+    
+    log_performance(logger, "CSV Import", counts['seconds'],
+                    f"Rows: {counts['records_processed']}, Rate: {counts['rows_per_second']:.0f} rows/s")
+    log_csv_upload(logger, original_filename, csv_format.upload_type, counts['records_processed'],
+                   counts['new_records'], counts['updated_records'])
+    
+    return {
+        'upload_id': upload_id,
+        'status': status,
+        'format': csv_format.name,
+        'records_processed': counts['records_processed'],
+        'new_records': counts['new_records'],
+        'updated_records': counts['updated_records'],
+        'unchanged_records': counts['unchanged_records'],
+        'skipped_records': counts['skipped_records'],
+        'error_lines': len(errors),
+        'matched': matched_count
+    }
+
+@job_queue.handler('import_csv')
+def import_csv_job(payload):
+    """Job handler for statements queued by upload_csv"""
+    return import_csv(payload['upload_id'])
+
 @app.route('/admin/upload-csv', methods=['POST'])
 @login_required
 def upload_csv():
-    """Handle CSV upload for transactions with storage and duplicate detection"""
+    """Store an uploaded CSV statement and queue it for import"""
     if 'csv_file' not in request.files:
         flash('No file uploaded', 'error')
         return redirect(url_for('admin_dashboard'))
@@ -1269,188 +1090,100 @@ def upload_csv():
         return redirect(url_for('admin_dashboard'))
     
     try:
-        # Ensure csv_uploads directory exists
-        csv_uploads_dir = 'csv_uploads'
-        os.makedirs(csv_uploads_dir, exist_ok=True)
-        
         # Generate unique filename for storage
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         original_filename = secure_filename(file.filename)
         stored_filename = f"{timestamp}_{original_filename}"
-        file_path = os.path.join(csv_uploads_dir, stored_filename)
         
-        # Upload CSV to R2 or local storage
-        file.seek(0)  # Reset file pointer
-        success, storage_path = upload_csv(file, stored_filename)
+        # An identical statement that was already imported would only produce unchanged rows
+        file_hash = hash_statement(file.stream)
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT original_filename, upload_date FROM csv_uploads
+            WHERE file_hash = ? AND status IN ('success', 'partial')
+            ORDER BY id LIMIT 1
+        ''', (file_hash,))
+        identical = cursor.fetchone()
+        conn.close()
+        if identical:
+            logger.info(f"{original_filename} is identical to the earlier upload {identical[0]}; not imported")
+            flash(f'{original_filename} is identical to {identical[0]} (uploaded {identical[1]}), which was already imported. Nothing to import.', 'info')
+            return redirect(url_for('csv_management'))
+        
+        # Upload CSV to R2 or local storage; parsing happens in the background job
+        success, storage_path = upload_csv_file(file, stored_filename)
         if not success:
             flash('Failed to upload CSV file', 'error')
             return redirect(url_for('admin_dashboard'))
+        file_size = file.stream.seek(0, os.SEEK_END)
         
-        # Get local file path for processing
-        local_file_path = get_file_path(storage_path)
-        if not local_file_path:
-            flash('Failed to access uploaded CSV file', 'error')
-            return redirect(url_for('admin_dashboard'))
-        
-        file_size = os.path.getsize(local_file_path) if os.path.exists(local_file_path) else 0
-        
-        # Read CSV content for parsing
-        with open(local_file_path, 'r', encoding='utf-8') as f:
-            csv_content = f.read()
-        
-        # Detect CSV format
-        format_type = detect_csv_format(csv_content)
-        logger.info(f"CSV format detected: {format_type} for file: {original_filename}")
-        
-        # Parse CSV based on format
-        if format_type == 'venmo':
-            transactions = parse_venmo_csv(csv_content)
-            upload_type = 'venmo'
-        elif format_type == 'chase':
-            transactions = parse_chase_csv(csv_content)
-            upload_type = 'zelle'
-        else:
-            # Try both parsers
-            venmo_transactions = parse_venmo_csv(csv_content)
-            chase_transactions = parse_chase_csv(csv_content)
-            
-            if len(venmo_transactions) > len(chase_transactions):
-                transactions = venmo_transactions
-                upload_type = 'venmo'
-            else:
-                transactions = chase_transactions
-                upload_type = 'zelle'
-        
-        if not transactions:
-            logger.warning(f"No valid transactions found in CSV file: {original_filename}")
-            flash('No valid transactions found in CSV. Please check the file format.', 'error')
-            return redirect(url_for('admin_dashboard'))
-        
-        # Connect to database
-        conn = sqlite3.connect(get_db_path())
+        conn = get_db_connection()
         cursor = conn.cursor()
-        
-        new_records = 0
-        updated_records = 0
-        
-        # Process transactions based on type
-        if upload_type == 'venmo':
-            for transaction in transactions:
-                try:
-                    cursor.execute('''
-                        INSERT OR REPLACE INTO venmo_transactions 
-                        (datetime, type, note, from_user, to_user, amount, fee, net_amount, csv_filename, csv_upload_date, updated_at)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        transaction['datetime'],
-                        transaction['type'],
-                        transaction['note'],
-                        transaction['from_user'],
-                        transaction['to_user'],
-                        transaction['amount'],
-                        transaction['fee'],
-                        transaction['net_amount'],
-                        stored_filename,
-                        datetime.now(),
-                        datetime.now()
-                    ))
-                    
-                    if cursor.rowcount > 0:
-                        new_records += 1
-                    else:
-                        updated_records += 1
-                        
-                except Exception as e:
-                    print(f"Error inserting Venmo transaction: {e}")
-                    continue
-                    
-        else:  # zelle
-            for transaction in transactions:
-                try:
-                    cursor.execute('''
-                        INSERT OR REPLACE INTO zelle_transactions 
-                        (date, description, amount, type, balance, payer_identifier, csv_filename, csv_upload_date, updated_at)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        transaction['date'],
-                        transaction['description'],
-                        transaction['amount'],
-                        transaction['type'],
-                        transaction['balance'],
-                        transaction['payer_identifier'],
-                        stored_filename,
-                        datetime.now(),
-                        datetime.now()
-                    ))
-                    
-                    if cursor.rowcount > 0:
-                        new_records += 1
-                    else:
-                        updated_records += 1
-                        
-                except Exception as e:
-                    print(f"Error inserting Zelle transaction: {e}")
-                    continue
-        
-        # Record upload in csv_uploads table
         cursor.execute('''
-            INSERT INTO csv_uploads 
-            (filename, original_filename, file_size, upload_type, records_processed, new_records, updated_records, admin_user)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            storage_path,  # Store the R2 key or local filename
-            original_filename,
-            file_size,
-            upload_type,
-            len(transactions),
-            new_records,
-            updated_records,
-            session.get('admin_username', 'Unknown')
-        ))
-        
-        # Clean up temporary file if it was downloaded from R2
-        if local_file_path.startswith('/tmp/'):
-            cleanup_temp_file(local_file_path)
-        
+            INSERT INTO csv_uploads (filename, original_filename, file_size, upload_type, admin_user, status, file_hash)
+            VALUES (?, ?, ?, ?, ?, 'queued', ?)
+        ''', (storage_path, original_filename, file_size, 'pending', session.get('admin_username', 'Unknown'), file_hash))
+        upload_id = cursor.lastrowid
         conn.commit()
-        conn.close()
         
-        # Re-run matching for all pending orders
-        conn = sqlite3.connect(get_db_path())
-        cursor = conn.cursor()
-        cursor.execute('SELECT id FROM order_table WHERE status = "Pending" AND ocr_amount IS NOT NULL AND ocr_date IS NOT NULL')
-        pending_orders = cursor.fetchall()
+        job_id = job_queue.enqueue('import_csv', {'upload_id': upload_id})
+        cursor.execute('UPDATE csv_uploads SET job_id = ? WHERE id = ?', (job_id, upload_id))
+        conn.commit()
         conn.close()
         
-        matched_count = 0
-        for order in pending_orders:
-            if match_transaction(order[0]):
-                matched_count += 1
-        
-        # Log the upload action with structured logging
-        log_csv_upload(logger, original_filename, upload_type, len(transactions), new_records, updated_records)
-        log_audit_action('csv_upload', 
-                        f'Uploaded {upload_type} CSV: {original_filename}, '
-                        f'Processed {len(transactions)} transactions, '
-                        f'New: {new_records}, Updated: {updated_records}, '
-                        f'Matched {matched_count} pending orders')
-        
-        flash(f'Successfully uploaded {upload_type} CSV: {original_filename}. '
-              f'Processed {len(transactions)} transactions (New: {new_records}, Updated: {updated_records}). '
-              f'Matched {matched_count} pending orders.', 'success')
+        log_audit_action('csv_upload', f'Queued CSV import: {original_filename} ({file_size} bytes), upload {upload_id}')
+        flash(f'{original_filename} uploaded. The import is running in the background; progress is shown below.', 'info')
+        return redirect(url_for('csv_management'))
         
     except Exception as e:
-        log_error(logger, e, f"CSV upload failed for file: {original_filename}")
+        log_error(logger, e, f"CSV upload failed for file: {file.filename}")
         flash(f'Error uploading CSV: {str(e)}', 'error')
     
     return redirect(url_for('admin_dashboard'))
 
+@app.route('/admin/csv-uploads/<int:upload_id>/status')
+@login_required
+def csv_upload_status(upload_id):
+    """Progress of a CSV import, polled by the CSV management page"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT status, upload_type, records_processed, new_records, updated_records, unchanged_records,
+               skipped_records, rows_per_second, error, error_lines, finished_at
+        FROM csv_uploads WHERE id = ?
+    ''', (upload_id,))
+    upload = cursor.fetchone()
+    conn.close()
+    
+    if not upload:
+        return jsonify({'success': False, 'error': 'Upload not found'}), 404
+    
+    response = jsonify({
+        'success': True,
+        'id': upload_id,
+        'status': upload[0],
+        'running': upload[0] in ('queued', 'running'),
+        'upload_type': upload[1],
+        'records_processed': upload[2],
+        'new_records': upload[3],
+        'updated_records': upload[4],
+        'unchanged_records': upload[5],
+        'skipped_records': upload[6],
+        'rows_per_second': upload[7],
+        'error': upload[8],
+        'error_lines': json.loads(upload[9]) if upload[9] else [],
+        'finished_at': upload[10]
+    })
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
 @app.route('/admin/approve/<int:order_id>')
 @login_required
 def approve_order(order_id):
     """Approve order"""
     try:
-        conn = sqlite3.connect(get_db_path())
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         # Check if order exists
@@ -1462,9 +1195,6 @@ def approve_order(order_id):
         
         # Update status to Completed
         cursor.execute('UPDATE order_table SET status = ? WHERE id = ?', ('Completed', order_id))
-        
-
-        
         conn.commit()
         conn.close()
         
@@ -1482,8 +1212,10 @@ def approve_order(order_id):
 def reject_order(order_id):
     """Reject order"""
     try:
-        conn = sqlite3.connect(get_db_path())
+        conn = get_db_connection()
         cursor = conn.cursor()
+        # Free any transaction the order was matched to so another order can claim it
+        cursor.execute('DELETE FROM transaction_matches WHERE order_id = ?', (order_id,))
         cursor.execute('UPDATE order_table SET status = ? WHERE id = ?', ('Rejected', order_id))
         conn.commit()
         conn.close()
@@ -1500,7 +1232,7 @@ def reject_order(order_id):
 def delete_order(order_id):
     """Delete an order completely"""
     try:
-        conn = sqlite3.connect(get_db_path())
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         # Get order details for audit log
@@ -1508,7 +1240,8 @@ def delete_order(order_id):
         order = cursor.fetchone()
         
         if order:
-            # Delete the order
+            # Delete the order, freeing any transaction it was matched to
+            cursor.execute('DELETE FROM transaction_matches WHERE order_id = ?', (order_id,))
             cursor.execute('DELETE FROM order_table WHERE id = ?', (order_id,))
             conn.commit()
             
@@ -1546,19 +1279,16 @@ def delete_order(order_id):
 def rerun_matching():
     """Re-run matching for all pending orders"""
     try:
-        conn = sqlite3.connect(get_db_path())
-        cursor = conn.cursor()
-        cursor.execute('SELECT id FROM order_table WHERE status = "Pending" AND ocr_amount IS NOT NULL AND ocr_date IS NOT NULL')
-        pending_orders = cursor.fetchall()
-        conn.close()
-        
-        matched_count = 0
-        for order in pending_orders:
-            if match_transaction(order[0]):
-                matched_count += 1
+        match_result = reconcile_orders(get_db_connection())
+        pending_count = match_result['orders_considered']
+        matched_count = match_result['matched']
+        log_performance(logger, "Batch Reconciliation", match_result['total_seconds'],
+                        f"Orders: {pending_count}, Matched: {matched_count}, "
+                        f"Load: {match_result['load_seconds']:.3f}s, Match: {match_result['match_seconds']:.3f}s, "
+                        f"Write: {match_result['write_seconds']:.3f}s")
         
-        log_audit_action('rerun_matching', f'Re-ran matching for {len(pending_orders)} pending orders, matched {matched_count}')
-        flash(f'Re-ran matching for {len(pending_orders)} pending orders. {matched_count} orders were automatically verified.', 'success')
+        log_audit_action('rerun_matching', f'Re-ran matching for {pending_count} pending orders, matched {matched_count}')
+        flash(f'Re-ran matching for {pending_count} pending orders. {matched_count} orders were automatically verified.', 'success')
         
     except Exception as e:
         flash(f'Error re-running matching: {str(e)}', 'error')
@@ -1590,7 +1320,7 @@ def get_waves():
 def get_wave(wave_id):
     """Get a specific wave by ID"""
     try:
-        conn = sqlite3.connect(get_db_path())
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         cursor.execute('SELECT id, name, start_date, end_date, price_boy, price_girl, is_active FROM wave WHERE id = ?', (wave_id,))
@@ -1625,7 +1355,7 @@ def create_wave():
         price_girl = float(request.form['price_girl'])
         is_active = request.form.get('is_active') == 'on'  # Checkbox returns 'on' when checked
         
-        conn = sqlite3.connect(get_db_path())
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         # If this wave is being set as active, deactivate all other waves first
@@ -1639,6 +1369,7 @@ def create_wave():
         
         conn.commit()
         conn.close()
+        get_wave_cache().invalidate()
         
         return jsonify({'success': True})
     except Exception as e:
@@ -1656,7 +1387,7 @@ def update_wave(wave_id):
         price_girl = float(request.form['price_girl'])
         is_active = request.form.get('is_active') == 'on'  # Checkbox returns 'on' when checked
         
-        conn = sqlite3.connect(get_db_path())
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         # If this wave is being set as active, deactivate all other waves first
@@ -1671,6 +1402,7 @@ def update_wave(wave_id):
         
         conn.commit()
         conn.close()
+        get_wave_cache().invalidate()
         
         return jsonify({'success': True})
     except Exception as e:
@@ -1681,7 +1413,7 @@ def update_wave(wave_id):
 def delete_wave(wave_id):
     """Delete a wave"""
     try:
-        conn = sqlite3.connect(get_db_path())
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         # Check if wave is being used by any orders
@@ -1694,6 +1426,7 @@ def delete_wave(wave_id):
         cursor.execute('DELETE FROM wave WHERE id = ?', (wave_id,))
         conn.commit()
         conn.close()
+        get_wave_cache().invalidate()
         
         return jsonify({'success': True})
     except Exception as e:
@@ -1709,7 +1442,7 @@ def update_order():
         girls_count = int(request.form['girls_count'])
         wave_id = int(request.form['wave_id'])
         
-        conn = sqlite3.connect(get_db_path())
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         # Get wave prices
@@ -1742,22 +1475,17 @@ def serve_receipt(filename):
         # Clean the filename (remove any path components for security)
         clean_filename = os.path.basename(filename)
         
-        # Get file path (downloads from R2 if needed)
-        local_filepath = get_file_path(filename)
+        # R2 receipts come from the local object cache; only a miss downloads them
+        storage = get_storage_service()
+        if storage.is_enabled() and not os.path.exists(filename):
+            local_filepath = get_object_cache().get_file(filename)
+        else:
+            local_filepath = get_file_path(filename)
         if not local_filepath:
             return "Receipt not found", 404
         
-        # Serve the file
-        response = send_file(local_filepath)
-        
-        # Clean up temporary file if it was downloaded from R2
-        if local_filepath.startswith('/tmp/'):
-            # Schedule cleanup after response is sent
-            @response.call_on_close
-            def cleanup():
-                cleanup_temp_file(local_filepath)
-        
-        return response
+        # Serve the file (cached copies stay in the cache)
+        return send_file(local_filepath)
     except FileNotFoundError:
         return "Receipt not found", 404
     except Exception as e:
@@ -1767,21 +1495,21 @@ def serve_receipt(filename):
 @app.route('/analytics')
 @login_required
 def analytics():
-    """Analytics page"""
-    conn = sqlite3.connect(get_db_path())
-    cursor = conn.cursor()
+    """
+    Analytics page
+
+    Query arguments: days (daily volume range, default 7)
+
+    Every figure is read from the order_stats rollup, so the page costs the
+    same however many orders there are.
+    """
+    days = max(1, min(request.args.get('days', 7, type=int) or 7, MAX_VOLUME_DAYS))
     
-    # Total orders
-    cursor.execute('SELECT COUNT(*) FROM order_table')
-    total_orders = cursor.fetchone()[0]
+    conn = get_db_connection()
     
     # Status breakdown
-    cursor.execute('''
-        SELECT status, COUNT(*) 
-        FROM order_table 
-        GROUP BY status
-    ''')
-    status_breakdown = dict(cursor.fetchall())
+    status_breakdown = get_status_counts(conn)
+    total_orders = sum(status_breakdown.values())
     
     # Auto-verified percentage
     auto_verified = status_breakdown.get('Verified', 0)
@@ -1791,15 +1519,9 @@ def analytics():
     flagged = status_breakdown.get('Flagged', 0)
     flagged_pct = (flagged / total_orders * 100) if total_orders > 0 else 0
     
-    # Daily volume (last 7 days)
-    cursor.execute('''
-        SELECT DATE(created_at), COUNT(*) 
-        FROM order_table 
-        WHERE created_at >= DATE('now', '-7 days')
-        GROUP BY DATE(created_at)
-        ORDER BY DATE(created_at)
-    ''')
-    daily_volume = dict(cursor.fetchall())
+    # Daily volume and revenue per wave
+    daily_volume = get_daily_volume(conn, days)
+    wave_revenue = get_wave_revenue(conn)
     
     conn.close()
     
@@ -1808,30 +1530,29 @@ def analytics():
                          status_breakdown=status_breakdown,
                          auto_verified_pct=auto_verified_pct,
                          flagged_pct=flagged_pct,
-                         daily_volume=daily_volume)
+                         daily_volume=daily_volume,
+                         days=days,
+                         wave_revenue=wave_revenue)
 
 @app.route('/admin/export-excel')
 @login_required
 def export_excel():
-    """Export all orders to Excel file"""
+    """
+    Export orders to an Excel, CSV or columnar file
+
+    Query arguments: format (xlsx, csv or columnar), start and end (YYYY-MM-DD),
+    wave (wave id) and status
+    """
     try:
-        excel_file = export_orders_to_excel()
+        # The export logs itself once it has finished reading (see export_response)
+        return export_response('orders', request.args,
+                               lambda description: log_audit_action('export_excel', f'Exported {description}'))
         
-        if excel_file:
-            # Log the export action
-            log_audit_action('export_excel', f'Exported {excel_file.getbuffer().nbytes} bytes of order data')
-            
-            # Create response with Excel file
-            response = make_response(excel_file.getvalue())
-            response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            response.headers['Content-Disposition'] = f'attachment; filename=delta_epsilon_psi_orders_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-            
-            return response
-        else:
-            flash('Error generating Excel file', 'error')
-            return redirect(url_for('admin_dashboard'))
-            
+    except ValueError as e:
+        flash(f'Invalid export options: {e}', 'error')
+        return redirect(url_for('admin_dashboard'))
     except Exception as e:
+        log_error(logger, e, "Orders export failed")
         flash(f'Error exporting to Excel: {e}', 'error')
         return redirect(url_for('admin_dashboard'))
 
@@ -1840,15 +1561,16 @@ def export_excel():
 def csv_management():
     """CSV upload management page"""
     try:
-        conn = sqlite3.connect(get_db_path())
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         # Get CSV upload history
         cursor.execute('''
             SELECT filename, original_filename, file_size, upload_date, upload_type, 
-                   records_processed, new_records, updated_records, admin_user, status
+                   records_processed, new_records, updated_records, admin_user, status, unchanged_records,
+                   skipped_records, id, rows_per_second, error
             FROM csv_uploads 
-            ORDER BY upload_date DESC
+            ORDER BY upload_date DESC, id DESC
         ''')
         uploads = cursor.fetchall()
         
@@ -1893,78 +1615,22 @@ def csv_management():
 @app.route('/admin/export-venmo-excel')
 @login_required
 def export_venmo_excel():
-    """Export Venmo transactions to Excel file"""
+    """
+    Export Venmo transactions to an Excel, CSV or columnar file
+
+    Query arguments: format (xlsx, csv or columnar), start and end (YYYY-MM-DD),
+    wave (wave id) and status
+    """
     try:
-        conn = sqlite3.connect(get_db_path())
-        cursor = conn.cursor()
-        
-        # Get all Venmo transactions
-        cursor.execute('''
-            SELECT datetime, type, note, from_user, to_user, amount, fee, net_amount, 
-                   csv_filename, csv_upload_date, created_at
-            FROM venmo_transactions 
-            ORDER BY datetime DESC
-        ''')
-        transactions = cursor.fetchall()
-        conn.close()
-        
-        # Create Excel workbook
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Venmo Transactions"
-        
-        # Define headers
-        headers = [
-            'Date/Time', 'Type', 'Note', 'From User', 'To User', 'Amount', 
-            'Fee', 'Net Amount', 'CSV File', 'Upload Date', 'Created At'
-        ]
-        
-        # Style for headers
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="1F4E79", end_color="1F4E79", fill_type="solid")
-        header_alignment = Alignment(horizontal="center", vertical="center")
-        
-        # Add headers
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-        
-        # Add data
-        for row, transaction in enumerate(transactions, 2):
-            for col, value in enumerate(transaction, 1):
-                ws.cell(row=row, column=col, value=value)
-        
-        # Auto-adjust column widths
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # Save to bytes
-        excel_file = io.BytesIO()
-        wb.save(excel_file)
-        excel_file.seek(0)
-        
-        # Log the export action
-        log_audit_action('export_venmo_excel', f'Exported {len(transactions)} Venmo transactions')
-        
-        # Create response
-        response = make_response(excel_file.getvalue())
-        response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        response.headers['Content-Disposition'] = f'attachment; filename=venmo_transactions_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-        
-        return response
+        # The export logs itself once it has finished reading (see export_response)
+        return export_response('venmo', request.args,
+                               lambda description: log_audit_action('export_venmo_excel', f'Exported {description}'))
         
+    except ValueError as e:
+        flash(f'Invalid export options: {e}', 'error')
+        return redirect(url_for('csv_management'))
     except Exception as e:
+        log_error(logger, e, "Venmo export failed")
         flash(f'Error exporting Venmo data: {e}', 'error')
         return redirect(url_for('csv_management'))
 
@@ -2012,7 +1678,7 @@ def db_status():
         
         # Get database contents
         if os.path.exists(db_path):
-            conn = sqlite3.connect(db_path)
+            conn = get_db_connection()
             cursor = conn.cursor()
             
             # Get table counts
@@ -2038,6 +1704,17 @@ def db_status():
                 'venmo_transactions': 0, 'zelle_transactions': 0
             })
         
+        db_info['schema_version'] = get_schema_version(get_db_connection())
+        
+        # Connection pool counters and WAL state for this worker process
+        db_info['connections'] = get_connection_manager().get_stats()
+        db_info['jobs'] = job_queue.get_stats()
+        db_info['wal'] = get_connection_manager().get_wal_info()
+        db_info['export_cache'] = get_export_cache().get_stats()
+        db_info['wave_cache'] = get_wave_cache().get_stats()
+        db_info['page_cache'] = get_page_cache().get_stats()
+        db_info['object_cache'] = get_object_cache().get_stats()
+        
         return render_template('db_status.html', db_info=db_info)
         
     except Exception as e:
@@ -2045,6 +1722,42 @@ def db_status():
         flash(f'Error checking database status: {e}', 'error')
         return redirect(url_for('admin_dashboard'))
 
+@app.route('/admin/db-checkpoint', methods=['POST'])
+@login_required
+def db_checkpoint():
+    """Checkpoint and truncate the WAL file"""
+    try:
+        result = get_connection_manager().checkpoint('TRUNCATE')
+        if result is None:
+            flash('Database is not in WAL mode; nothing to checkpoint.', 'info')
+        elif result['busy']:
+            flash('Checkpoint could not complete because readers are active. Try again shortly.', 'warning')
+        else:
+            log_audit_action('db_checkpoint', f"Checkpointed {result['checkpointed_frames']} WAL frames")
+            flash(f"Checkpointed {result['checkpointed_frames']} WAL frames.", 'success')
+    except Exception as e:
+        log_error(logger, e, "WAL checkpoint failed")
+        flash(f'Error running checkpoint: {e}', 'error')
+    
+    return redirect(url_for('db_status'))
+
+@app.route('/admin/rebuild-order-stats', methods=['POST'])
+@login_required
+def rebuild_stats():
+    """Recompute the order_stats rollup (after order changes that bypassed its triggers)"""
+    try:
+        conn = get_db_connection()
+        rows = rebuild_order_stats(conn)
+        conn.commit()
+        conn.close()
+        log_audit_action('rebuild_order_stats', f'Rebuilt order stats rollup ({rows} rows)')
+        flash(f'Rebuilt the order stats rollup ({rows} rows).', 'success')
+    except Exception as e:
+        log_error(logger, e, "Order stats rebuild failed")
+        flash(f'Error rebuilding order stats: {e}', 'error')
+    
+    return redirect(url_for('db_status'))
+
 @app.route('/admin/check-tesseract')
 @login_required
 def check_tesseract():
@@ -2076,7 +1789,9 @@ def check_tesseract():
             'available': tesseract_available,
             'version': version_info,
             'cmd_path': tesseract_cmd,
-            'system_path': tesseract_path
+            'system_path': tesseract_path,
+            'executor': ocr_executor.get_metrics(),
+            'cache': ocr_cache.get_stats()
         }
         
         return render_template('tesseract_status.html', tesseract_info=tesseract_info)
@@ -2089,78 +1804,22 @@ def check_tesseract():
 @app.route('/admin/export-zelle-excel')
 @login_required
 def export_zelle_excel():
-    """Export Zelle transactions to Excel file"""
+    """
+    Export Zelle transactions to an Excel, CSV or columnar file
+
+    Query arguments: format (xlsx, csv or columnar), start and end (YYYY-MM-DD),
+    wave (wave id) and status
+    """
     try:
-        conn = sqlite3.connect(get_db_path())
-        cursor = conn.cursor()
-        
-        # Get all Zelle transactions
-        cursor.execute('''
-            SELECT date, description, amount, type, balance, payer_identifier, 
-                   csv_filename, csv_upload_date, created_at
-            FROM zelle_transactions 
-            ORDER BY date DESC
-        ''')
-        transactions = cursor.fetchall()
-        conn.close()
-        
-        # Create Excel workbook
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Zelle Transactions"
-        
-        # Define headers
-        headers = [
-            'Date', 'Description', 'Amount', 'Type', 'Balance', 'Payer Identifier',
-            'CSV File', 'Upload Date', 'Created At'
-        ]
-        
-        # Style for headers
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="1F4E79", end_color="1F4E79", fill_type="solid")
-        header_alignment = Alignment(horizontal="center", vertical="center")
-        
-        # Add headers
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-        
-        # Add data
-        for row, transaction in enumerate(transactions, 2):
-            for col, value in enumerate(transaction, 1):
-                ws.cell(row=row, column=col, value=value)
-        
-        # Auto-adjust column widths
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # Save to bytes
-        excel_file = io.BytesIO()
-        wb.save(excel_file)
-        excel_file.seek(0)
-        
-        # Log the export action
-        log_audit_action('export_zelle_excel', f'Exported {len(transactions)} Zelle transactions')
-        
-        # Create response
-        response = make_response(excel_file.getvalue())
-        response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        response.headers['Content-Disposition'] = f'attachment; filename=zelle_transactions_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-        
-        return response
+        # The export logs itself once it has finished reading (see export_response)
+        return export_response('zelle', request.args,
+                               lambda description: log_audit_action('export_zelle_excel', f'Exported {description}'))
         
+    except ValueError as e:
+        flash(f'Invalid export options: {e}', 'error')
+        return redirect(url_for('csv_management'))
     except Exception as e:
+        log_error(logger, e, "Zelle export failed")
         flash(f'Error exporting Zelle data: {e}', 'error')
         return redirect(url_for('csv_management'))
 
@@ -2185,6 +1844,9 @@ except Exception as e:
 # Initialize database on startup (for production environments like Render)
 init_db()
 
+# Spool copies older than a job lease belong to jobs that never ran or were abandoned
+sweep_receipt_spool(job_queue.lease_seconds)
+
 # Log database status after initialization
 try:
     db_path = get_db_path()
@@ -2193,7 +1855,7 @@ try:
         logger.info(f"Database initialized successfully. Size: {db_size} bytes")
         
         # Check if we have any orders
-        conn = sqlite3.connect(db_path)
+        conn = get_db_connection()
         cursor = conn.cursor()
         cursor.execute('SELECT COUNT(*) FROM order_table')
         order_count = cursor.fetchone()[0]
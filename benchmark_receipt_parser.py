@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Receipt parser benchmark
+Compares receipt_parser.parse_receipt with the previous line-by-line parser
+on a corpus of sample OCR texts, for both throughput and accuracy.
+
+Usage:
+    python benchmark_receipt_parser.py [--iterations N] [--corpus DIR]
+
+A corpus directory holds NAME.txt OCR dumps, each with a NAME.json file of
+expected fields: {"amount": 45.0, "date": "2025-03-24", "name": "John Doe"}.
+"""
+
+import re
+import sys
+import json
+import time
+import argparse
+from datetime import datetime, date
+from pathlib import Path
+
+from receipt_parser import parse_receipt
+
+# (OCR text, expected fields) - shaped after real Venmo, Zelle and bank receipts
+SAMPLE_CORPUS = [
+    ("Complete\nJohn Doe\n- $45.00\nMarch 24, 2025, 7:16 PM\nTransaction details\nDEPSI UTD Beta",
+     {'amount': 45.0, 'date': '2025-03-24', 'name': 'John Doe'}),
+    ("Payment complete\nJane Smith\n- $20\nJanuary 28, 2025\nPaid with Venmo balance",
+     {'amount': 20.0, 'date': '2025-01-28', 'name': 'Jane Smith'}),
+    ("Zelle\nYou sent $55.00\nto DEPSI UTD\nSent on 02/14/2025\nFrom Maria Garcia\nConfirmation 8XK2P9",
+     {'amount': 55.0, 'date': '2025-02-14', 'name': 'Maria Garcia'}),
+    ("Transaction details\nAmount: $1,250.00\nDate 2025-04-02\nmaria.garcia@gmail.com",
+     {'amount': 1250.0, 'date': '2025-04-02', 'name': 'Maria Garcia'}),
+    ("Venmo\nAlex Nguyen\npaid\nDEPSI Beta Chapter\nMar 3, 2025\n- $35.50\nPrivate",
+     {'amount': 35.5, 'date': '2025-03-03', 'name': 'Alex Nguyen'}),
+    ("Payment Status\nCompleted\nSarah Lee\nAmount $ 30\nMarch 5, 2025\nFee $0.00",
+     {'amount': 30.0, 'date': '2025-03-05', 'name': 'Sarah Lee'}),
+    ("Chase\nZelle payment to DEPSI\nDelivered 3/10/2025\nTotal $60.00\nMichael Brown",
+     {'amount': 60.0, 'date': '2025-03-10', 'name': 'Michael Brown'}),
+    ("Transaction\nstatus complete\n- $25\nFebruary 2, 2025",
+     {'amount': 25.0, 'date': '2025-02-02', 'name': None}),
+    ("Bank of America\nPriya Patel\nYou sent\n$40.00\nOct 31, 2025\nMemo tickets wave 2",
+     {'amount': 40.0, 'date': '2025-10-31', 'name': 'Priya Patel'}),
+    ("Chris Johnson\n$ 45.00\nStatement period 03/01/2025 - 03/31/2025\nPosted 3/24/2025",
+     {'amount': 45.0, 'date': '2025-03-24', 'name': 'Chris Johnson'}),
+    ("Emily Davis\nsent you\n- $50.00\nApril 1, 2025, 10:02 AM\nLike Comment",
+     {'amount': 50.0, 'date': '2025-04-01', 'name': 'Emily Davis'}),
+    ("\n\nOCR_NOISE ### ||\n\n",
+     {'amount': None, 'date': None, 'name': None}),
+]
+
+
+def legacy_parse(text):
+    """The parser used before receipt_parser (debug prints removed)"""
+    lines = text.split('\n')
+    amount = None
+    found_date = None
+    name = None
+
+    for line in lines:
+        line = line.strip()
+        if '$' in line:
+            try:
+                amount_match = re.search(r'[\-\+]?\s*\$?\s*(\d+\.?\d*)', line)
+                if amount_match:
+                    amount = float(amount_match.group(1))
+            except:
+                pass
+
+        date_patterns = [
+            r'(\w+ \d{1,2}, \d{4})',
+            r'(\d{1,2}/\d{1,2}/\d{4})',
+            r'(\d{4}-\d{2}-\d{2})',
+            r'(\w+ \d{1,2}, \d{4}, \d{1,2}:\d{2} [AP]M)',
+        ]
+        for pattern in date_patterns:
+            date_match = re.search(pattern, line)
+            if date_match:
+                try:
+                    date_str = date_match.group(1)
+                    for fmt in ['%B %d, %Y', '%m/%d/%Y', '%Y-%m-%d', '%B %d, %Y, %I:%M %p']:
+                        try:
+                            found_date = datetime.strptime(date_str, fmt).date()
+                            break
+                        except:
+                            continue
+                    if found_date:
+                        break
+                except:
+                    pass
+
+        if not name and len(line) > 2 and len(line) < 100:
+            if '@' in line and '.' in line:
+                email_name = line.split('@')[0]
+                if '.' in email_name:
+                    name = ' '.join(part.capitalize() for part in email_name.split('.'))
+                else:
+                    name = email_name.capitalize()
+            elif ' ' in line and not any(char.isdigit() for char in line):
+                skip_words = ['complete', 'status', 'payment', 'transaction', 'details', 'depsi', 'utd', 'beta', 'chapter']
+                if not any(word in line.lower() for word in skip_words):
+                    name = line
+
+    if not name:
+        for line in lines:
+            line = line.strip()
+            if (len(line) > 3 and len(line) < 50 and
+                ' ' in line and
+                not any(char.isdigit() for char in line) and
+                not line.lower() in ['complete', 'status', 'payment', 'transaction', 'details', 'depsi', 'utd']):
+                name = line
+                break
+
+    return {'amount': amount, 'date': found_date, 'name': name}
+
+
+def load_corpus(directory):
+    """Load NAME.txt / NAME.json pairs from a directory"""
+    corpus = []
+    for text_path in sorted(Path(directory).glob('*.txt')):
+        expected_path = text_path.with_suffix('.json')
+        if expected_path.exists():
+            corpus.append((text_path.read_text(), json.loads(expected_path.read_text())))
+    return corpus
+
+
+def score(parser, corpus):
+    """Count correctly parsed fields per field name"""
+    correct = {'amount': 0, 'date': 0, 'name': 0}
+    for text, expected in corpus:
+        parsed = parser(text)
+        if parsed['amount'] == expected['amount']:
+            correct['amount'] += 1
+        parsed_date = parsed['date'].isoformat() if isinstance(parsed['date'], date) else parsed['date']
+        if parsed_date == expected['date']:
+            correct['date'] += 1
+        if parsed['name'] == expected['name']:
+            correct['name'] += 1
+    return correct
+
+
+def throughput(parser, corpus, iterations):
+    """Receipts parsed per second"""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for text, _ in corpus:
+            parser(text)
+    return iterations * len(corpus) / (time.perf_counter() - started)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Benchmark the receipt parser')
+    arg_parser.add_argument('--iterations', type=int, default=2000)
+    arg_parser.add_argument('--corpus', help='Directory of NAME.txt/NAME.json samples')
+    args = arg_parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else SAMPLE_CORPUS
+    if not corpus:
+        print(f"❌ No samples found in {args.corpus}")
+        return 1
+
+    print(f"📊 Receipt parser benchmark - {len(corpus)} samples x {args.iterations} iterations")
+    print("-" * 60)
+
+    results = {}
+    for label, parser in (('legacy', legacy_parse), ('receipt_parser', parse_receipt)):
+        results[label] = score(parser, corpus)
+        rate = throughput(parser, corpus, args.iterations)
+        fields = ', '.join(f"{field} {count}/{len(corpus)}" for field, count in results[label].items())
+        print(f"{label:>15}: {rate:10,.0f} receipts/s | {fields}")
+
+    regressions = [field for field in results['legacy']
+                   if results['receipt_parser'][field] < results['legacy'][field]]
+    if regressions:
+        print(f"❌ Accuracy regressed for: {', '.join(regressions)}")
+        return 1
+
+    print("✅ No accuracy regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
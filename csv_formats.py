@@ -0,0 +1,235 @@
+"""
+CSV Statement Formats
+Registry of bank/payment app export layouts, recognized by their header row
+"""
+
+import re
+import hashlib
+import logging
+from datetime import datetime
+from typing import Callable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+_ZELLE_PAYER_RE = re.compile(r'(?:ZELLE PAYMENT FROM|Zelle payment from)\s+(.+)', re.IGNORECASE)
+
+
+def normalize_column(name: str) -> str:
+    """Normalize a header cell for signature matching ('  Posting Date ' -> 'posting date')"""
+    return ' '.join(name.strip().lower().split())
+
+
+def parse_money(value: str) -> float:
+    """
+    Parse an amount such as '$1,250.00', '+ $45.00' or '- $10'
+
+    Raises:
+        ValueError: If the value is not a number
+    """
+    value = value.strip().replace('$', '').replace(',', '').replace(' ', '')
+    return float(value)
+
+
+class CSVFormat:
+    """A statement export layout: the header that identifies it and its row parser"""
+
+    def __init__(self, name: str, label: str, upload_type: str, signature: Iterable[str],
+                 parse_row: Callable[[dict], Optional[dict]]):
+        """
+        Initialize a format
+
+        Args:
+            name: Registry key, e.g. 'chase'
+            label: Display name, e.g. 'Chase'
+            upload_type: Table the rows go to: 'venmo' (peer payments) or 'zelle' (bank credits)
+            signature: Header columns that must all be present to recognize the format
+            parse_row: Called with {normalized column: value}; returns a transaction
+                dict, None to skip the row, or raises ValueError for a bad row
+        """
+        self.name = name
+        self.label = label
+        self.upload_type = upload_type
+        self.signature = frozenset(normalize_column(column) for column in signature)
+        self.parse_row = parse_row
+
+    def iter_records(self, header: list, rows: Iterable[list], errors: Optional[list] = None):
+        """
+        Yield transactions from the data rows that follow the header
+
+        Args:
+            header: Header row as read from the file
+            rows: Remaining csv.reader rows
+            errors: If given, receives {'line': n, 'error': message} for each bad row
+
+        Returns:
+            Iterator of transaction dicts, each with the row's fingerprint as row_hash
+        """
+        columns = [normalize_column(column) for column in header]
+        for row_number, values in enumerate(rows, start=1):
+            if not any(value.strip() for value in values):
+                continue
+            try:
+                record = self.parse_row(dict(zip(columns, values)))
+            except (ValueError, KeyError) as e:
+                # csv.reader knows the physical line (quoted fields may span lines)
+                line = getattr(rows, 'line_num', row_number)
+                logger.warning(f"Skipping {self.label} line {line}: {e}")
+                if errors is not None:
+                    errors.append({'line': line, 'error': str(e)})
+                continue
+            if record is not None:
+                # Fingerprint of the raw row, so re-exported rows can be skipped
+                record['row_hash'] = hashlib.sha1('\x1f'.join(values).encode('utf-8')).hexdigest()
+                yield record
+
+
+# name -> CSVFormat
+_formats = {}
+
+# Header column -> formats whose signature includes it, for single-pass detection
+_signature_index = {}
+
+
+def register_format(csv_format: CSVFormat):
+    """
+    Add a format to the registry
+
+    Args:
+        csv_format: Format to register (replaces any format with the same name)
+    """
+    if csv_format.name in _formats:
+        unregister_format(csv_format.name)
+    _formats[csv_format.name] = csv_format
+    for column in csv_format.signature:
+        _signature_index.setdefault(column, []).append(csv_format)
+
+
+def unregister_format(name: str):
+    """Remove a format from the registry"""
+    csv_format = _formats.pop(name)
+    for column in csv_format.signature:
+        _signature_index[column].remove(csv_format)
+
+
+def csv_format(name: str, label: str, upload_type: str, signature: Iterable[str]):
+    """Decorator form of register_format() for a row parser"""
+    def decorator(parse_row):
+        register_format(CSVFormat(name, label, upload_type, signature, parse_row))
+        return parse_row
+    return decorator
+
+
+def get_formats() -> list:
+    """Get the registered formats"""
+    return list(_formats.values())
+
+
+def match_header(row: list) -> Optional[CSVFormat]:
+    """
+    Find the format whose signature a header row satisfies
+
+    Each header cell is looked up once in the signature index; a format matches
+    when all of its signature columns were seen. If several match, the one with
+    the most specific (largest) signature wins.
+
+    Args:
+        row: Candidate header row
+
+    Returns:
+        CSVFormat: Matching format, or None
+    """
+    hits = {}
+    for column in set(normalize_column(cell) for cell in row):
+        for candidate in _signature_index.get(column, ()):
+            hits[candidate.name] = hits.get(candidate.name, 0) + 1
+
+    matches = [_formats[name] for name, count in hits.items() if count == len(_formats[name].signature)]
+    return max(matches, key=lambda match: len(match.signature), default=None)
+
+
+@csv_format('chase', 'Chase', 'zelle',
+            signature=('Details', 'Posting Date', 'Description', 'Amount'))
+def _parse_chase_row(row: dict) -> Optional[dict]:
+    """Chase checking: Details,Posting Date,Description,Amount,Type,Balance,Check or Slip #"""
+    # Posting date is M/D/YY or M/D/YYYY
+    date_parts = row['posting date'].strip().split('/')
+    if len(date_parts) != 3:
+        return None
+    month, day, year = date_parts
+    year = '20' + year if len(year) == 2 else year
+
+    description = row['description'].strip()
+    balance = row.get('balance', '').strip()
+    payer_match = _ZELLE_PAYER_RE.search(description)
+    return {
+        'date': f"{year}-{month.zfill(2)}-{day.zfill(2)}",
+        'description': description,
+        'amount': parse_money(row['amount']),
+        'type': row.get('type', '').strip(),
+        'balance': parse_money(balance) if balance else 0.0,
+        # Fall back to the whole description when it is not a Zelle credit
+        'payer_identifier': payer_match.group(1).strip() if payer_match else description
+    }
+
+
+def _peer_payment(timestamp: str, transaction_type: str, note: str, from_user: str, to_user: str,
+                  amount: float, fee: float) -> dict:
+    """Build a record for the peer-payment (venmo_transactions) table"""
+    return {
+        'datetime': timestamp,
+        'txn_date': timestamp[:10],
+        'type': transaction_type,
+        'note': note,
+        'from_user': from_user,
+        'to_user': to_user,
+        'amount': amount,
+        'fee': fee,
+        'net_amount': amount - fee
+    }
+
+
+@csv_format('venmo', 'Venmo', 'venmo',
+            signature=('ID', 'Datetime', 'Type', 'Status', 'Note', 'From', 'To', 'Amount (total)'))
+def _parse_venmo_row(row: dict) -> Optional[dict]:
+    """Venmo statement: ,ID,Datetime,Type,Status,Note,From,To,Amount (total),..."""
+    timestamp = row['datetime'].strip()
+    transaction_type = row['type'].strip()
+    # Only incoming payments; also skips the statement's summary rows
+    if 'T' not in timestamp or transaction_type != 'Payment':
+        return None
+    amount = parse_money(row['amount (total)'])
+    if amount <= 0:
+        return None
+    fee = row.get('amount (fee)', '').strip()
+    return _peer_payment(timestamp, transaction_type, row['note'].strip(), row['from'].strip(),
+                         row['to'].strip(), amount, abs(parse_money(fee)) if fee else 0.0)
+
+
+@csv_format('cashapp', 'Cash App', 'venmo',
+            signature=('Transaction ID', 'Date', 'Transaction Type', 'Amount', 'Name of sender/receiver'))
+def _parse_cashapp_row(row: dict) -> Optional[dict]:
+    """Cash App activity: Transaction ID,Date,Transaction Type,Currency,Amount,Fee,Net Amount,...,Notes,Name of sender/receiver"""
+    amount = parse_money(row['amount'])
+    if amount <= 0 or row.get('status', 'COMPLETE').strip().upper() not in ('COMPLETE', 'COMPLETED'):
+        return None
+    # '2025-03-24 15:50:20 EDT' -> '2025-03-24T15:50:20'
+    timestamp = 'T'.join(row['date'].strip().split(' ')[:2])
+    fee = row.get('fee', '').strip()
+    return _peer_payment(timestamp, row['transaction type'].strip(), row.get('notes', '').strip(),
+                         row['name of sender/receiver'].strip(), '', amount,
+                         abs(parse_money(fee)) if fee else 0.0)
+
+
+@csv_format('paypal', 'PayPal', 'venmo',
+            signature=('Date', 'Time', 'Name', 'Type', 'Status', 'Gross', 'Fee', 'Net'))
+def _parse_paypal_row(row: dict) -> Optional[dict]:
+    """PayPal activity download: Date,Time,TimeZone,Name,Type,Status,Currency,Gross,Fee,Net,..."""
+    amount = parse_money(row['gross'])
+    if amount <= 0 or row['status'].strip() != 'Completed':
+        return None
+    timestamp = datetime.strptime(f"{row['date'].strip()} {row['time'].strip()}",
+                                  '%m/%d/%Y %H:%M:%S').isoformat()
+    fee = row['fee'].strip()
+    return _peer_payment(timestamp, row['type'].strip(), row.get('subject', row.get('note', '')).strip(),
+                         row['name'].strip(), row.get('to email address', '').strip(), amount,
+                         abs(parse_money(fee)) if fee else 0.0)
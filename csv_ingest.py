@@ -0,0 +1,292 @@
+"""
+CSV Ingestion
+Streams bank and payment app statement exports into the transaction tables in batches
+"""
+
+import os
+import io
+import csv
+import time
+import hashlib
+import logging
+import itertools
+import sqlite3
+from datetime import datetime
+from typing import BinaryIO, Callable, Iterable, Iterator, Optional
+
+from csv_formats import match_header
+
+logger = logging.getLogger(__name__)
+
+# Rows written per executemany call
+CSV_BATCH_SIZE = int(os.environ.get('CSV_BATCH_SIZE', 500))
+
+# Unparseable rows kept (with their line numbers) for display after an import
+MAX_CSV_ERROR_LINES = 50
+
+# Rows searched for a recognizable header (Venmo statements have 2 title rows first)
+HEADER_SEARCH_ROWS = 5
+
+# Upsert target per upload type: conflict key (the table's UNIQUE constraint),
+# the data columns that are compared to detect changed rows and the date column
+TABLES = {
+    'venmo': {
+        'table': 'venmo_transactions',
+        'key': ('datetime', 'from_user', 'to_user', 'amount'),
+        'data': ('txn_date', 'type', 'note', 'fee', 'net_amount'),
+        'date': 'txn_date',
+    },
+    'zelle': {
+        'table': 'zelle_transactions',
+        'key': ('date', 'description', 'amount', 'payer_identifier'),
+        'data': ('type', 'balance'),
+        'date': 'date',
+    },
+}
+
+# Bookkeeping columns written with every new or changed row
+_AUDIT_COLUMNS = ('csv_filename', 'csv_upload_date', 'updated_at')
+
+
+def hash_statement(stream: BinaryIO) -> str:
+    """
+    Hash an uploaded statement so re-uploads of the same file can be recognized
+
+    Args:
+        stream: Seekable binary stream; it is rewound afterwards
+
+    Returns:
+        str: SHA-256 hex digest of the stream's contents
+    """
+    sha256 = hashlib.sha256()
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(1024 * 1024), b''):
+        sha256.update(chunk)
+    stream.seek(0)
+    return sha256.hexdigest()
+
+
+def read_transactions(stream: BinaryIO, errors: Optional[list] = None) -> tuple:
+    """
+    Detect a statement's format and stream its transactions
+
+    Rows are read until one matches a registered format's header signature
+    (some exports put a title above the header); the rest of the stream is
+    consumed lazily as the returned iterator is advanced.
+
+    Args:
+        stream: Binary stream of the uploaded CSV
+        errors: If given, receives {'line': n, 'error': message} for each row that
+            could not be parsed
+
+    Returns:
+        tuple: (CSVFormat, iterator of transaction dicts), or (None, empty
+            iterator) if no registered format matches
+    """
+    text = io.TextIOWrapper(io.BufferedReader(stream) if isinstance(stream, io.RawIOBase) else stream,
+                            encoding='utf-8-sig', errors='replace', newline='')
+    rows = csv.reader(text)
+    for header in itertools.islice(rows, HEADER_SEARCH_ROWS):
+        csv_format = match_header(header)
+        if csv_format:
+            logger.info(f"CSV format detected: {csv_format.label}")
+            return csv_format, csv_format.iter_records(header, rows, errors)
+
+    logger.warning("CSV header does not match any registered format")
+    return None, iter(())
+
+
+def _batches(records: Iterable, size: int) -> Iterator[list]:
+    """Group an iterable into lists of at most size items"""
+    records = iter(records)
+    while True:
+        batch = list(itertools.islice(records, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _staging_table(upload_type: str) -> str:
+    return f"csv_staging_{upload_type}"
+
+
+def _create_staging(cursor: sqlite3.Cursor, upload_type: str):
+    """Create an empty per-connection staging table shaped like the target's upsert columns"""
+    spec = TABLES[upload_type]
+    staging = _staging_table(upload_type)
+    columns = spec['key'] + spec['data'] + _AUDIT_COLUMNS
+    cursor.execute(f'DROP TABLE IF EXISTS temp.{staging}')
+    cursor.execute(f'''
+        CREATE TEMP TABLE {staging} (
+            {', '.join(columns)},
+            UNIQUE({', '.join(spec['key'])}) ON CONFLICT REPLACE
+        )
+    ''')
+
+
+def _known_fingerprints(cursor: sqlite3.Cursor, source: str, row_hashes: list) -> set:
+    """Return which of the row hashes were already imported from this source"""
+    known = set()
+    # Stay well under SQLite's bound-parameter limit
+    for start in range(0, len(row_hashes), 500):
+        chunk = row_hashes[start:start + 500]
+        cursor.execute(f'''
+            SELECT row_hash FROM csv_row_fingerprints
+            WHERE source = ? AND row_hash IN ({','.join('?' * len(chunk))})
+        ''', (source, *chunk))
+        known.update(row[0] for row in cursor.fetchall())
+    return known
+
+
+def _unassigned(cursor: sqlite3.Cursor, upload_type: str, pairs: set) -> set:
+    """Keep the (amount, date) pairs that belong to a stored transaction not yet matched to an order"""
+    if not pairs:
+        return set()
+    spec = TABLES[upload_type]
+    date_column = spec['date']
+    dates = [txn_date for _, txn_date in pairs]
+    cursor.execute(f'''
+        SELECT DISTINCT t.amount, t.{date_column} FROM {spec['table']} t
+        LEFT JOIN transaction_matches m ON m.source = ? AND m.transaction_id = t.id
+        WHERE m.id IS NULL AND t.{date_column} BETWEEN ? AND ?
+    ''', (upload_type, min(dates), max(dates)))
+    return pairs & set(cursor.fetchall())
+
+
+def ingest_transactions(conn: sqlite3.Connection, upload_type: str, records: Iterable[dict],
+                        csv_filename: str, source: Optional[str] = None,
+                        progress: Optional[Callable[[dict], None]] = None,
+                        batch_size: int = CSV_BATCH_SIZE) -> dict:
+    """
+    Bulk upsert streamed transactions into the database
+
+    When a source is given, rows whose fingerprint (row_hash) was already
+    imported from that source are dropped before touching the transaction
+    tables. Only rows dated on or before the source's high-water mark can have
+    been seen, so newer rows skip the fingerprint lookup entirely.
+
+    The remaining rows of each batch are staged into a temp table with
+    executemany, classified against the target table in one join, then merged
+    with INSERT ... ON CONFLICT DO UPDATE. Existing rows keep their id (so
+    transaction matches stay valid) and are only rewritten when a non-key
+    column actually changed. Only one batch is held in memory at a time. The
+    caller commits; a progress callback may commit after each batch.
+
+    Args:
+        conn: Database connection
+        upload_type: 'venmo' or 'zelle'
+        records: Transactions from read_transactions()
+        csv_filename: Stored filename recorded on new and changed rows
+        source: Statement source for fingerprinting (e.g. the CSV format name)
+        progress: Called with the running counts after each batch
+        batch_size: Rows per staged batch
+
+    Returns:
+        dict: records_processed, new_records, updated_records, unchanged_records
+            (including skipped_records, those dropped by fingerprint), seconds,
+            rows_per_second and touched, the set of distinct (amount, date) of
+            the rows that were not skipped plus those of skipped rows still
+            without a match (so a retried import rematches what it committed
+            before failing)
+    """
+    started = time.perf_counter()
+    spec = TABLES[upload_type]
+    table = spec['table']
+    staging = _staging_table(upload_type)
+    key, data, date_column = spec['key'], spec['data'], spec['date']
+    columns = ', '.join(key + data + _AUDIT_COLUMNS)
+
+    join = ' AND '.join(f't.{column} = s.{column}' for column in key)
+    staged_data = ', '.join(f's.{column}' for column in data)
+    target_data = ', '.join(f't.{column}' for column in data)
+    excluded_data = ', '.join(f'excluded.{column}' for column in data)
+    assignments = ', '.join(f'{column} = excluded.{column}' for column in data + _AUDIT_COLUMNS)
+
+    cursor = conn.cursor()
+    high_water = None
+    if source:
+        cursor.execute('SELECT high_water_date FROM csv_sources WHERE source = ?', (source,))
+        row = cursor.fetchone()
+        high_water = row[0] if row else None
+    newest = high_water
+
+    _create_staging(cursor, upload_type)
+    counts = {'records_processed': 0, 'new_records': 0, 'updated_records': 0, 'unchanged_records': 0,
+              'skipped_records': 0}
+    # Kept out of counts so progress callbacks only see the running totals
+    touched = set()
+    skipped = set()
+    now = datetime.now()
+    try:
+        for batch in _batches(records, batch_size):
+            counts['records_processed'] += len(batch)
+            if source:
+                maybe_seen = [record['row_hash'] for record in batch
+                              if high_water and record[date_column] <= high_water]
+                known = _known_fingerprints(cursor, source, maybe_seen) if maybe_seen else set()
+                fresh = [record for record in batch if record['row_hash'] not in known]
+                counts['skipped_records'] += len(batch) - len(fresh)
+                skipped.update((record['amount'], record[date_column]) for record in batch
+                               if record['row_hash'] in known)
+                batch = fresh
+                if not batch:
+                    if progress:
+                        progress(counts)
+                    continue
+
+            cursor.execute(f'DELETE FROM temp.{staging}')
+            cursor.executemany(
+                f"INSERT INTO temp.{staging} ({columns}) VALUES ({', '.join('?' * (len(key) + len(data) + len(_AUDIT_COLUMNS)))})",
+                [tuple(record[column] for column in key + data) + (csv_filename, now, now) for record in batch]
+            )
+
+            cursor.execute(f'''
+                SELECT COALESCE(SUM(t.id IS NULL), 0),
+                       COALESCE(SUM(t.id IS NOT NULL AND ({staged_data}) IS NOT ({target_data})), 0)
+                FROM temp.{staging} s
+                LEFT JOIN main.{table} t ON {join}
+            ''')
+            inserted, updated = cursor.fetchone()
+
+            cursor.execute(f'''
+                INSERT INTO main.{table} ({columns})
+                SELECT {columns} FROM temp.{staging} WHERE true
+                ON CONFLICT({', '.join(key)}) DO UPDATE SET {assignments}
+                WHERE ({', '.join(data)}) IS NOT ({excluded_data})
+            ''')
+
+            if source:
+                cursor.executemany('''
+                    INSERT OR IGNORE INTO csv_row_fingerprints (source, row_hash, row_date)
+                    VALUES (?, ?, ?)
+                ''', [(source, record['row_hash'], record[date_column]) for record in batch])
+                newest = max([newest or ''] + [record[date_column] for record in batch])
+
+            counts['new_records'] += inserted
+            counts['updated_records'] += updated
+            # Rows repeated within a batch collapse in staging and count as unchanged
+            counts['unchanged_records'] += len(batch) - inserted - updated
+            touched.update((record['amount'], record[date_column]) for record in batch)
+            if progress:
+                progress(counts)
+    finally:
+        cursor.execute(f'DROP TABLE IF EXISTS temp.{staging}')
+
+    if source and newest != high_water:
+        cursor.execute('''
+            INSERT INTO csv_sources (source, high_water_date, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(source) DO UPDATE SET
+                high_water_date = excluded.high_water_date, updated_at = excluded.updated_at
+        ''', (source, newest))
+
+    counts['unchanged_records'] += counts['skipped_records']
+    counts['touched'] = touched | _unassigned(cursor, upload_type, skipped)
+    counts['seconds'] = time.perf_counter() - started
+    counts['rows_per_second'] = counts['records_processed'] / counts['seconds'] if counts['seconds'] else 0.0
+    logger.info(
+        f"Upserted {counts['records_processed']} {upload_type} rows into {table}: "
+        f"{counts['new_records']} new, {counts['updated_records']} updated, "
+        f"{counts['unchanged_records']} unchanged ({counts['skipped_records']} skipped by fingerprint) "
+        f"({counts['rows_per_second']:.0f} rows/s)"
+    )
+    return counts
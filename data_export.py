@@ -0,0 +1,485 @@
+"""
+Data Export
+Streams orders and transactions out as Excel, CSV or columnar (Parquet) downloads,
+cached on disk until the exported data changes
+"""
+
+import io
+import os
+import csv
+import json
+import zlib
+import hashlib
+import logging
+import itertools
+from datetime import date, datetime, timedelta
+from typing import BinaryIO, Callable, Iterable, Iterator
+
+from flask import Response, request, send_file, stream_with_context
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.utils import get_column_letter
+
+from database import get_db_connection
+from data_versions import get_data_versions, version_token
+from export_cache import get_export_cache
+
+try:
+    import pyarrow
+    import pyarrow.parquet as parquet
+except ImportError:
+    pyarrow = None
+    parquet = None
+
+logger = logging.getLogger(__name__)
+
+EXCEL_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Values accepted for ?format=
+EXPORT_FORMATS = ('xlsx', 'csv', 'columnar')
+
+# Rows fetched from the cursor at a time (and rows per columnar row group)
+EXPORT_BATCH_ROWS = int(os.environ.get('EXPORT_BATCH_ROWS', 5000))
+
+# Rows read before the sheet is started; their values size the columns
+EXPORT_WIDTH_SAMPLE_ROWS = int(os.environ.get('EXPORT_WIDTH_SAMPLE_ROWS', 1000))
+
+# Widest auto-sized column, in characters
+MAX_COLUMN_WIDTH = 50
+
+_HEADER_FONT = Font(bold=True, color="FFFFFF")
+_HEADER_FILL = PatternFill(start_color="1F4E79", end_color="1F4E79", fill_type="solid")
+_HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="center")
+
+# Exportable datasets. Each column is (SQL expression, columnar name, header, type).
+# 'date' is the column the start/end filter applies to; 'wave' is the order's
+# wave column, or None to filter by the wave's date range instead; 'matches' is
+# the transaction_matches source used by status=matched/unmatched; 'versions'
+# are the data_versions counters whose change invalidates cached exports.
+EXPORTS = {
+    'orders': {
+        'label': 'orders',
+        'title': 'Customer Orders',
+        'filename': 'delta_epsilon_psi_orders',
+        'from': 'order_table o LEFT JOIN wave w ON o.wave_id = w.id',
+        'columns': [
+            ('o.id', 'order_id', 'Order ID', 'int'),
+            ('o.uuid', 'uuid', 'UUID', 'str'),
+            ('o.name', 'name', 'Customer Name', 'str'),
+            ('o.email', 'email', 'Email', 'str'),
+            ('o.referral', 'referral', 'Referral Code', 'str'),
+            ('o.boys_count', 'boys_count', 'Boys Tickets', 'int'),
+            ('o.girls_count', 'girls_count', 'Girls Tickets', 'int'),
+            ('o.expected_amount', 'expected_amount', 'Expected Amount', 'float'),
+            ('o.ocr_amount', 'ocr_amount', 'OCR Amount', 'float'),
+            ('o.ocr_date', 'ocr_date', 'OCR Date', 'str'),
+            ('o.ocr_name', 'ocr_name', 'OCR Payer Name', 'str'),
+            ('o.status', 'status', 'Status', 'str'),
+            ('o.created_at', 'created_at', 'Created Date', 'str'),
+            ('w.name', 'wave_name', 'Wave Name', 'str'),
+            ('w.price_boy', 'wave_price_boy', 'Wave Price (Boys)', 'float'),
+            ('w.price_girl', 'wave_price_girl', 'Wave Price (Girls)', 'float'),
+        ],
+        'date': 'o.created_at',
+        'wave': 'o.wave_id',
+        'status': 'o.status',
+        'order_by': 'o.created_at DESC',
+        'versions': ('orders', 'waves'),
+    },
+    'venmo': {
+        'label': 'Venmo transactions',
+        'title': 'Venmo Transactions',
+        'filename': 'venmo_transactions',
+        'from': 'venmo_transactions t',
+        'columns': [
+            ('t.datetime', 'datetime', 'Date/Time', 'str'),
+            ('t.type', 'type', 'Type', 'str'),
+            ('t.note', 'note', 'Note', 'str'),
+            ('t.from_user', 'from_user', 'From User', 'str'),
+            ('t.to_user', 'to_user', 'To User', 'str'),
+            ('t.amount', 'amount', 'Amount', 'float'),
+            ('t.fee', 'fee', 'Fee', 'float'),
+            ('t.net_amount', 'net_amount', 'Net Amount', 'float'),
+            ('t.csv_filename', 'csv_filename', 'CSV File', 'str'),
+            ('t.csv_upload_date', 'csv_upload_date', 'Upload Date', 'str'),
+            ('t.created_at', 'created_at', 'Created At', 'str'),
+        ],
+        # datetime leads the UNIQUE index, so date ranges on it are index seeks
+        'date': 't.datetime',
+        'wave': None,
+        'matches': 'venmo',
+        'order_by': 't.datetime DESC',
+        'versions': ('venmo', 'waves', 'matches'),
+    },
+    'zelle': {
+        'label': 'Zelle transactions',
+        'title': 'Zelle Transactions',
+        'filename': 'zelle_transactions',
+        'from': 'zelle_transactions t',
+        'columns': [
+            ('t.date', 'date', 'Date', 'str'),
+            ('t.description', 'description', 'Description', 'str'),
+            ('t.amount', 'amount', 'Amount', 'float'),
+            ('t.type', 'type', 'Type', 'str'),
+            ('t.balance', 'balance', 'Balance', 'float'),
+            ('t.payer_identifier', 'payer_identifier', 'Payer Identifier', 'str'),
+            ('t.csv_filename', 'csv_filename', 'CSV File', 'str'),
+            ('t.csv_upload_date', 'csv_upload_date', 'Upload Date', 'str'),
+            ('t.created_at', 'created_at', 'Created At', 'str'),
+        ],
+        'date': 't.date',
+        'wave': None,
+        'matches': 'zelle',
+        'order_by': 't.date DESC',
+        'versions': ('zelle', 'waves', 'matches'),
+    },
+}
+
+
+def _parse_filter_date(value: str, name: str) -> date:
+    """Parse a YYYY-MM-DD filter value"""
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a YYYY-MM-DD date, got '{value}'")
+
+
+def build_filters(export: str, args) -> tuple:
+    """
+    Turn request arguments into a WHERE clause for an export
+
+    Supported arguments: start and end (inclusive YYYY-MM-DD dates), wave (wave
+    id; transactions are limited to the wave's date range) and status (order
+    statuses, comma separated, or 'matched'/'unmatched' for transactions).
+    Every filter is a range or equality test on an indexed column, so only
+    the requested rows are read.
+
+    Args:
+        export: Key of EXPORTS
+        args: Request arguments (any mapping with get())
+
+    Returns:
+        tuple: (WHERE clause or '', parameters, dict of the filters applied)
+
+    Raises:
+        ValueError: If a filter value is invalid
+    """
+    spec = EXPORTS[export]
+    clauses, params, applied = [], [], {}
+
+    start, end = args.get('start'), args.get('end')
+    if start:
+        clauses.append(f"{spec['date']} >= ?")
+        params.append(_parse_filter_date(start, 'start').isoformat())
+        applied['start'] = start
+    if end:
+        # Compare below the next day so timestamps on the end date are included
+        clauses.append(f"{spec['date']} < ?")
+        params.append((_parse_filter_date(end, 'end') + timedelta(days=1)).isoformat())
+        applied['end'] = end
+
+    wave = args.get('wave')
+    if wave:
+        if not wave.isdigit():
+            raise ValueError(f"wave must be a wave id, got '{wave}'")
+        if spec['wave']:
+            clauses.append(f"{spec['wave']} = ?")
+            params.append(int(wave))
+        else:
+            clauses.append(f"{spec['date']} >= (SELECT start_date FROM wave WHERE id = ?) "
+                           f"AND {spec['date']} < (SELECT date(end_date, '+1 day') FROM wave WHERE id = ?)")
+            params.extend([int(wave), int(wave)])
+        applied['wave'] = wave
+
+    status = args.get('status')
+    if status:
+        if 'matches' in spec:
+            if status not in ('matched', 'unmatched'):
+                raise ValueError(f"status must be 'matched' or 'unmatched', got '{status}'")
+            negate = 'NOT ' if status == 'unmatched' else ''
+            clauses.append(f"{negate}EXISTS (SELECT 1 FROM transaction_matches m "
+                           f"WHERE m.source = ? AND m.transaction_id = t.id)")
+            params.append(spec['matches'])
+        else:
+            statuses = [value.strip() for value in status.split(',') if value.strip()]
+            clauses.append(f"{spec['status']} IN ({','.join('?' * len(statuses))})")
+            params.extend(statuses)
+        applied['status'] = status
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+    return where, params, applied
+
+
+def _update_widths(widths: list, row: Iterable):
+    """Widen each column to fit a row's values"""
+    for index, value in enumerate(row):
+        if value is not None:
+            widths[index] = max(widths[index], len(str(value)))
+
+
+def write_excel(title: str, headers: list, rows: Iterable[tuple], output: BinaryIO) -> int:
+    """
+    Write rows to a single-sheet workbook
+
+    The sheet is write-only, so each row goes straight to disk and only the
+    first EXPORT_WIDTH_SAMPLE_ROWS rows are held in memory. Column widths must
+    be set before the first row is written; they are sized from the header and
+    that leading sample, which is consumed from the same single pass over rows.
+
+    Args:
+        title: Worksheet title
+        headers: Column headings
+        rows: Row tuples, e.g. a cursor that has executed the export query
+        output: Seekable binary file the workbook is saved to
+
+    Returns:
+        int: Number of data rows
+    """
+    rows = iter(rows)
+    sample = list(itertools.islice(rows, EXPORT_WIDTH_SAMPLE_ROWS))
+
+    widths = [len(header) for header in headers]
+    for row in sample:
+        _update_widths(widths, row)
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title)
+    for index, width in enumerate(widths, 1):
+        ws.column_dimensions[get_column_letter(index)].width = min(width + 2, MAX_COLUMN_WIDTH)
+
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = _HEADER_FONT
+        cell.fill = _HEADER_FILL
+        cell.alignment = _HEADER_ALIGNMENT
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    row_count = 0
+    for row in itertools.chain(sample, rows):
+        ws.append(row)
+        row_count += 1
+
+    wb.save(output)
+    return row_count
+
+
+def _fetch_batches(cursor) -> Iterator[list]:
+    """Read an executed cursor EXPORT_BATCH_ROWS rows at a time"""
+    while True:
+        rows = cursor.fetchmany(EXPORT_BATCH_ROWS)
+        if not rows:
+            return
+        yield rows
+
+
+def _csv_chunks(headers: list, cursor, conn) -> Iterator[bytes]:
+    """Encode the cursor's rows as CSV, one chunk per fetched batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # The BOM makes Excel open the file as UTF-8
+    buffer.write('\ufeff')
+    writer.writerow(headers)
+    try:
+        for rows in _fetch_batches(cursor):
+            writer.writerows(rows)
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+    finally:
+        conn.close()
+
+
+def _json_value(value):
+    """JSON encoder fallback for dates read back as objects"""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def _columnar_json_chunks(columns: list, cursor, conn) -> Iterator[bytes]:
+    """
+    Encode the cursor's rows as gzip-compressed columnar JSON lines
+
+    The first line describes the columns ({"columns": [{"name", "type"}]});
+    every following line is one row group ({"rows": n, "data": {name: [values]}}).
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    names = [name for _, name, _, _ in columns]
+    schema = {'columns': [{'name': name, 'type': kind} for _, name, _, kind in columns]}
+    try:
+        yield compressor.compress(json.dumps(schema).encode('utf-8') + b'\n')
+        for rows in _fetch_batches(cursor):
+            group = {'rows': len(rows), 'data': dict(zip(names, map(list, zip(*rows))))}
+            line = json.dumps(group, separators=(',', ':'), default=_json_value) + '\n'
+            chunk = compressor.compress(line.encode('utf-8'))
+            if chunk:
+                yield chunk
+        yield compressor.flush()
+    finally:
+        conn.close()
+
+
+def _write_parquet(columns: list, cursor, output: BinaryIO) -> int:
+    """Write the cursor's rows to a Parquet file, one row group per batch"""
+    arrow_types = {'int': pyarrow.int64(), 'float': pyarrow.float64(), 'str': pyarrow.string()}
+    schema = pyarrow.schema([(name, arrow_types[kind]) for _, name, _, kind in columns])
+    text_columns = [index for index, (_, _, _, kind) in enumerate(columns) if kind == 'str']
+
+    row_count = 0
+    with parquet.ParquetWriter(output, schema, compression='zstd') as writer:
+        for rows in _fetch_batches(cursor):
+            values = [list(column) for column in zip(*rows)]
+            # SQLite is dynamically typed; keep text columns text
+            for index in text_columns:
+                values[index] = [None if value is None else str(value) for value in values[index]]
+            arrays = [pyarrow.array(column, type=field.type) for column, field in zip(values, schema)]
+            writer.write_table(pyarrow.Table.from_arrays(arrays, schema=schema))
+            row_count += len(rows)
+    return row_count
+
+
+def _format_file(export_format: str) -> tuple:
+    """(file extension, mimetype) of an export format"""
+    if export_format == 'csv':
+        return 'csv', 'text/csv'
+    if export_format == 'columnar' and parquet is None:
+        return 'columnar.jsonl.gz', 'application/gzip'
+    if export_format == 'columnar':
+        return 'parquet', 'application/vnd.apache.parquet'
+    return 'xlsx', EXCEL_MIMETYPE
+
+
+def _revalidate(response: Response, etag: str) -> Response:
+    """Tag a download so browsers and scripts revalidate it with If-None-Match"""
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def _cached_file_response(path: str, filename: str, mimetype: str, etag: str) -> Response:
+    """Send a cached export file (streamed in chunks by the server's file wrapper)"""
+    response = send_file(path, mimetype=mimetype, as_attachment=True, download_name=filename,
+                         etag=False, conditional=True)
+    logger.info(f"Sending cached export {os.path.basename(path)} as {filename}")
+    return _revalidate(response, etag)
+
+
+def _stream_response(chunks: Iterator[bytes], filename: str, mimetype: str, etag: str) -> Response:
+    """Stream generated chunks as a download of unknown length"""
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    logger.info(f"Streaming {filename}")
+    return _revalidate(response, etag)
+
+
+def _audited(chunks: Iterator[bytes], audit: Callable[[str], None], description: str) -> Iterator[bytes]:
+    """Pass streamed chunks through, then record the export once the stream (and its snapshot) has ended"""
+    completed = False
+    try:
+        yield from chunks
+        completed = True
+    finally:
+        chunks.close()
+        audit(description if completed else f"{description} (download interrupted)")
+
+
+def export_response(export: str, args, audit: Callable[[str], None]) -> Response:
+    """
+    Serve an export in the requested format, from the cache when the data is unchanged
+
+    ?format= picks xlsx (default), csv or columnar. Finished exports are
+    cached on disk, named after the export, its format and filters and the
+    data_versions counters it depends on. Any write to those tables bumps a
+    counter, so a changed dataset gets a new name and ETag; until then the
+    cached file is sent as is, or 304 Not Modified if the client already
+    has it.
+
+    On a miss, CSV and the columnar fallback are encoded batch by batch while
+    the response is sent (and written to the cache alongside); xlsx and
+    Parquet are written to the cache first because their layout needs a
+    seekable file.
+
+    The audit callback writes through the request's pooled connection, which
+    a streamed export is still reading from, so it is only called once the
+    export's own reads are over: straight away for cache hits, after writing
+    for xlsx and Parquet, and at the end of the stream for CSV and JSON lines.
+
+    Args:
+        export: Key of EXPORTS ('orders', 'venmo' or 'zelle')
+        args: Request arguments with format and the build_filters() filters
+        audit: Called with a description of what was exported, for the audit log
+
+    Returns:
+        Response: The download (or 304 Not Modified)
+
+    Raises:
+        ValueError: If the format or a filter is invalid
+    """
+    spec = EXPORTS[export]
+    export_format = args.get('format', 'xlsx').lower()
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(EXPORT_FORMATS)}, got '{export_format}'")
+
+    where, params, applied = build_filters(export, args)
+    columns = spec['columns']
+    select = ', '.join(expression for expression, _, _, _ in columns)
+    query = f"SELECT {select} FROM {spec['from']} {where} ORDER BY {spec['order_by']}"
+
+    filters = ', '.join(f"{name}={value}" for name, value in applied.items())
+    description = f"{spec['label']} as {export_format}" + (f" ({filters})" if filters else '')
+    extension, mimetype = _format_file(export_format)
+    filename = f"{spec['filename']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    headers = [header for _, _, header, _ in columns]
+    cache = get_export_cache()
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        # Read the version and the rows from one snapshot so the cache name matches the content
+        if not conn.in_transaction:
+            cursor.execute('BEGIN')
+        versions = get_data_versions(conn, spec['versions'])
+        group = f"{export}-{export_format}-{hashlib.sha1(f'{where}|{params}'.encode()).hexdigest()[:12]}"
+        etag = f"{group}-{version_token(versions)}"
+        cache_name = f"{etag}.{extension}"
+
+        if etag in request.if_none_match:
+            conn.close()
+            audit(f"{description} (not modified)")
+            return _revalidate(Response(status=304), etag)
+
+        cached_path = cache.get(cache_name)
+        if cached_path:
+            conn.close()
+            audit(f"{description} (cached)")
+            return _cached_file_response(cached_path, filename, mimetype, etag)
+
+        cursor.execute(query, params)
+
+        if export_format == 'csv':
+            chunks = cache.tee(_csv_chunks(headers, cursor, conn), cache_name, group)
+            return _stream_response(_audited(chunks, audit, description), filename, mimetype, etag)
+
+        if extension == 'columnar.jsonl.gz':
+            chunks = cache.tee(_columnar_json_chunks(columns, cursor, conn), cache_name, group)
+            return _stream_response(_audited(chunks, audit, description), filename, mimetype, etag)
+
+        with cache.writer(cache_name, group) as output:
+            if export_format == 'columnar':
+                row_count = _write_parquet(columns, cursor, output)
+            else:
+                row_count = write_excel(spec['title'], headers, cursor, output)
+        conn.close()
+    except Exception:
+        conn.close()
+        raise
+
+    audit(f"{row_count} {description}")
+    path = os.path.join(cache.directory, cache_name)
+    return _cached_file_response(path, filename, mimetype, etag)
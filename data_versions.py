@@ -0,0 +1,34 @@
+"""
+Data Versions
+Change counters for cache invalidation, bumped by triggers on every write
+"""
+
+import sqlite3
+from typing import Iterable
+
+# Counter names and the tables whose writes bump them (see migration 11)
+DATA_VERSION_NAMES = ('orders', 'waves', 'venmo', 'zelle', 'matches')
+
+
+def get_data_versions(conn: sqlite3.Connection, names: Iterable[str] = DATA_VERSION_NAMES) -> dict:
+    """
+    Read the current change counters
+
+    Args:
+        conn: Database connection
+        names: Counters to read
+
+    Returns:
+        dict: name -> version (0 for a counter that has no row yet)
+    """
+    names = list(names)
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT name, version FROM data_versions WHERE name IN ({','.join('?' * len(names))})", names)
+    versions = dict.fromkeys(names, 0)
+    versions.update(cursor.fetchall())
+    return versions
+
+
+def version_token(versions: dict) -> str:
+    """Join counters into a short string that changes whenever any of them does ('12.3.40')"""
+    return '.'.join(str(versions[name]) for name in sorted(versions))
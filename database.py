@@ -0,0 +1,267 @@
+"""
+SQLite Connection Management
+Hands out reused per-thread connections to the tickets database
+"""
+
+import os
+import sqlite3
+import threading
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Number of compiled statements each connection keeps in its LRU cache
+STATEMENT_CACHE_SIZE = int(os.environ.get('SQLITE_STATEMENT_CACHE_SIZE', 256))
+
+
+def resolve_db_path() -> str:
+    """
+    Resolve the database file path from the environment
+
+    Returns:
+        str: Absolute path to the SQLite database file
+    """
+    # Use environment variable for database path (for persistent storage on Render)
+    db_path = os.environ.get('DATABASE_PATH', 'tickets.db')
+
+    # Check if we're on Render and use persistent disk
+    if os.path.exists('/var/data'):
+        logger.info("Render persistent disk detected at /var/data")
+        db_path = '/var/data/tickets.db'
+    elif not os.path.dirname(db_path):
+        # If it's just a filename, make it relative to the app directory
+        db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), db_path)
+
+    # Ensure the directory exists
+    db_dir = os.path.dirname(db_path)
+    if db_dir and not os.path.exists(db_dir):
+        os.makedirs(db_dir, exist_ok=True)
+        logger.info(f"Created database directory: {db_dir}")
+
+    logger.info(f"Database path resolved to: {db_path}")
+    return db_path
+
+
+class StorageProfile:
+    """PRAGMA profile applied to every connection, configured once at startup"""
+
+    def __init__(self):
+        """Load the profile from environment variables"""
+        self.journal_mode = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL').upper()
+        self.synchronous = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL').upper()
+        self.busy_timeout_ms = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+        self.mmap_size = int(os.environ.get('SQLITE_MMAP_SIZE', 64 * 1024 * 1024))
+        # Negative values are KiB rather than pages
+        self.cache_size = int(os.environ.get('SQLITE_CACHE_SIZE', -8000))
+        # Checkpoint policy: SQLite checkpoints passively every N pages; writers that
+        # push the WAL past the truncate threshold reset it to zero bytes
+        self.wal_autocheckpoint = int(os.environ.get('SQLITE_WAL_AUTOCHECKPOINT', 1000))
+        self.wal_truncate_bytes = int(os.environ.get('SQLITE_WAL_TRUNCATE_BYTES', 32 * 1024 * 1024))
+
+    def pragmas(self) -> list:
+        """
+        Get the PRAGMA statements for a new connection
+
+        Returns:
+            list: (name, value) pairs in the order they should be applied
+        """
+        return [
+            ('journal_mode', self.journal_mode),
+            ('synchronous', self.synchronous),
+            ('busy_timeout', self.busy_timeout_ms),
+            ('mmap_size', self.mmap_size),
+            ('cache_size', self.cache_size),
+            ('wal_autocheckpoint', self.wal_autocheckpoint),
+            ('temp_store', 'MEMORY'),
+        ]
+
+    def to_dict(self) -> dict:
+        """Get the configured profile for display"""
+        return {
+            'journal_mode': self.journal_mode,
+            'synchronous': self.synchronous,
+            'busy_timeout_ms': self.busy_timeout_ms,
+            'mmap_size': self.mmap_size,
+            'cache_size': self.cache_size,
+            'wal_autocheckpoint': self.wal_autocheckpoint,
+            'wal_truncate_bytes': self.wal_truncate_bytes
+        }
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() hands it back to the pool instead of closing it"""
+
+    def close(self):
+        """Release the connection, rolling back anything left uncommitted"""
+        if self.in_transaction:
+            self.rollback()
+
+class ConnectionManager:
+    """Keeps one open connection per thread for the lifetime of the process"""
+
+    def __init__(self, db_path: str = None, statement_cache_size: int = STATEMENT_CACHE_SIZE,
+                 profile: StorageProfile = None):
+        """
+        Initialize the connection manager
+
+        Args:
+            db_path: Database file path (resolved from the environment if not provided)
+            statement_cache_size: Prepared statements cached per connection
+            profile: PRAGMA profile (loaded from the environment if not provided)
+        """
+        self._db_path = db_path
+        self.profile = profile or StorageProfile()
+        self.statement_cache_size = statement_cache_size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+        self.connections_reused = 0
+        self.checkpoints_run = 0
+        self.last_checkpoint = None
+
+    @property
+    def db_path(self) -> str:
+        """Database path, resolved once on first use"""
+        if self._db_path is None:
+            with self._lock:
+                if self._db_path is None:
+                    self._db_path = resolve_db_path()
+        return self._db_path
+
+    def _open(self) -> PooledConnection:
+        """Open and configure a new connection"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.profile.busy_timeout_ms / 1000,
+            factory=PooledConnection,
+            cached_statements=self.statement_cache_size
+        )
+        for name, value in self.profile.pragmas():
+            conn.execute(f'PRAGMA {name} = {value}')
+
+        with self._lock:
+            self.connections_opened += 1
+        logger.debug(f"Opened SQLite connection #{self.connections_opened} (pid {os.getpid()})")
+        return conn
+
+    def get_connection(self) -> PooledConnection:
+        """
+        Get the calling thread's connection, opening it on first use
+
+        Returns:
+            PooledConnection: Connection whose close() only releases it
+        """
+        conn = getattr(self._local, 'conn', None)
+        # Connections must not cross a fork (gunicorn preload), so key them by pid
+        if conn is not None and self._local.pid == os.getpid():
+            with self._lock:
+                self.connections_reused += 1
+            return conn
+
+        conn = self._open()
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def release(self):
+        """Roll back any transaction the calling thread left open"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+
+    def checkpoint(self, mode: str = 'PASSIVE') -> Optional[dict]:
+        """
+        Run a WAL checkpoint on the calling thread's connection
+
+        Args:
+            mode: PASSIVE, FULL, RESTART or TRUNCATE
+
+        Returns:
+            dict: Checkpoint result, None if the database is not in WAL mode
+        """
+        conn = self.get_connection()
+        if conn.execute('PRAGMA journal_mode').fetchone()[0].lower() != 'wal':
+            return None
+
+        busy, log_frames, checkpointed = conn.execute(f'PRAGMA wal_checkpoint({mode})').fetchone()
+        result = {
+            'mode': mode,
+            'busy': bool(busy),
+            'log_frames': log_frames,
+            'checkpointed_frames': checkpointed
+        }
+        with self._lock:
+            self.checkpoints_run += 1
+            self.last_checkpoint = result
+        logger.info(f"WAL checkpoint ({mode}): {checkpointed}/{log_frames} frames, busy={bool(busy)}")
+        return result
+
+    def maybe_checkpoint(self) -> Optional[dict]:
+        """
+        Apply the checkpoint policy after a large write
+
+        Runs a passive checkpoint, escalating to TRUNCATE once the WAL file has
+        grown past the profile's threshold so it does not keep the disk space.
+
+        Returns:
+            dict: Checkpoint result, None if nothing was run
+        """
+        wal_size = self.get_wal_info()['wal_size']
+        if wal_size >= self.profile.wal_truncate_bytes:
+            return self.checkpoint('TRUNCATE')
+        if wal_size:
+            return self.checkpoint('PASSIVE')
+        return None
+
+    def get_wal_info(self) -> dict:
+        """
+        Get the size of the WAL and shared-memory files
+
+        Returns:
+            dict: Journal mode and file sizes in bytes
+        """
+        wal_path = f"{self.db_path}-wal"
+        shm_path = f"{self.db_path}-shm"
+        conn = self.get_connection()
+        return {
+            'journal_mode': conn.execute('PRAGMA journal_mode').fetchone()[0],
+            'wal_size': os.path.getsize(wal_path) if os.path.exists(wal_path) else 0,
+            'shm_size': os.path.getsize(shm_path) if os.path.exists(shm_path) else 0,
+            'checkpoints_run': self.checkpoints_run,
+            'last_checkpoint': self.last_checkpoint
+        }
+
+    def get_stats(self) -> dict:
+        """
+        Get connection pool counters
+
+        Returns:
+            dict: Connections opened and reused, plus the resolved path
+        """
+        return {
+            'db_path': self.db_path,
+            'connections_opened': self.connections_opened,
+            'connections_reused': self.connections_reused,
+            'statement_cache_size': self.statement_cache_size,
+            'profile': self.profile.to_dict()
+        }
+
+
+# Global connection manager instance
+connection_manager = ConnectionManager()
+
+
+def get_connection_manager() -> ConnectionManager:
+    """Get the global connection manager instance"""
+    return connection_manager
+
+
+def get_db_connection() -> PooledConnection:
+    """Get the calling thread's pooled database connection"""
+    return connection_manager.get_connection()
+
+
+def release_db_connection(exception: Optional[BaseException] = None):
+    """Release the calling thread's connection (usable as a Flask teardown handler)"""
+    connection_manager.release()
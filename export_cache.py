@@ -0,0 +1,181 @@
+"""
+Export Cache
+Finished export files kept on disk, named after their options and data version
+"""
+
+import os
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Optional
+
+from database import get_connection_manager
+
+logger = logging.getLogger(__name__)
+
+# Where exports are cached (default: export_cache/ next to the database)
+EXPORT_CACHE_DIR = os.environ.get('EXPORT_CACHE_DIR')
+
+# Total size of cached exports kept before LRU eviction
+EXPORT_CACHE_MAX_BYTES = int(os.environ.get('EXPORT_CACHE_MAX_BYTES', 100 * 1024 * 1024))
+
+
+class ExportCache:
+    """
+    Directory of export files with size-bounded LRU eviction
+
+    Entries are named '<group>-<version>.<ext>', where the group identifies the
+    export and its options and the version changes whenever the exported data
+    does. Entries are never modified: a new version is written alongside and
+    replaces the group's older entries.
+    """
+
+    def __init__(self, directory: Optional[str] = EXPORT_CACHE_DIR, max_bytes: int = EXPORT_CACHE_MAX_BYTES):
+        """
+        Initialize the cache
+
+        Args:
+            directory: Cache directory (resolved next to the database if not provided)
+            max_bytes: Total file size to keep before evicting least recently used entries
+        """
+        self._directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def directory(self) -> str:
+        """Cache directory, created on first use"""
+        if self._directory is None:
+            db_dir = os.path.dirname(get_connection_manager().db_path)
+            self._directory = os.path.join(db_dir, 'export_cache')
+        os.makedirs(self._directory, exist_ok=True)
+        return self._directory
+
+    def get(self, name: str) -> Optional[str]:
+        """
+        Look up a cached export
+
+        Args:
+            name: Entry filename
+
+        Returns:
+            str: Path of the cached file, or None on a miss
+        """
+        path = os.path.join(self.directory, name)
+        try:
+            # The modification time doubles as the LRU timestamp
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return path
+
+    @contextmanager
+    def writer(self, name: str, group: str) -> Iterator[BinaryIO]:
+        """
+        Write a new entry
+
+        The file is written under a temporary name and renamed into place only
+        if the block completes, so readers never see a partial export.
+
+        Args:
+            name: Entry filename
+            group: Prefix shared by every version of this export; older
+                versions are removed once the new entry is in place
+
+        Yields:
+            BinaryIO: File to write the export to
+        """
+        output = tempfile.NamedTemporaryFile(dir=self.directory, prefix='.', suffix='.tmp', delete=False)
+        try:
+            yield output
+            output.close()
+            os.replace(output.name, os.path.join(self.directory, name))
+        except BaseException:
+            # Includes GeneratorExit when a streamed download is abandoned
+            output.close()
+            os.unlink(output.name)
+            raise
+
+        logger.info(f"Export cached: {name}")
+        self._evict(name, group)
+
+    def tee(self, chunks: Iterator[bytes], name: str, group: str) -> Iterator[bytes]:
+        """
+        Pass streamed chunks through while writing them to a new entry
+
+        Args:
+            chunks: Export being streamed
+            name: Entry filename
+            group: See writer()
+
+        Returns:
+            Iterator of the same chunks
+        """
+        try:
+            with self.writer(name, group) as output:
+                for chunk in chunks:
+                    output.write(chunk)
+                    yield chunk
+        finally:
+            chunks.close()
+
+    def _evict(self, keep: str, group: str):
+        """Remove the group's stale versions, then least recently used entries over the size limit"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith('.') or not entry.is_file():
+                continue
+            if entry.name != keep and entry.name.startswith(f"{group}-"):
+                self._remove(entry.path)
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if os.path.basename(path) == keep:
+                continue
+            self._remove(path)
+            total -= size
+
+    def _remove(self, path: str):
+        """Delete an entry (another worker may have removed it already)"""
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            return
+        with self._lock:
+            self.evictions += 1
+
+    def get_stats(self) -> dict:
+        """Get cache statistics"""
+        files = [entry for entry in os.scandir(self.directory) if entry.is_file() and not entry.name.startswith('.')]
+        with self._lock:
+            return {
+                'entries': len(files),
+                'size_bytes': sum(entry.stat().st_size for entry in files),
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+# Global cache instance
+export_cache = ExportCache()
+
+
+def get_export_cache() -> ExportCache:
+    """Get the global export cache instance"""
+    return export_cache
@@ -0,0 +1,318 @@
+"""
+Background Job Queue
+Persistent SQLite-backed job queue with an in-process worker pool (no external broker)
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from typing import Callable, Optional
+
+from database import get_db_connection, release_db_connection
+
+logger = logging.getLogger(__name__)
+
+# Worker threads started in each app process
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+
+# Seconds between polls for jobs enqueued by other processes
+JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 2.0))
+
+# A running job whose worker has been silent this long is handed to another worker
+JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', 300))
+
+# Error recorded on a job whose worker stopped during its last attempt
+_ABANDONED_ERROR = 'Worker stopped during the last attempt (lease expired)'
+
+
+class JobLeaseLost(Exception):
+    """Raised by a handler that finds its job was handed to another worker"""
+
+
+class JobQueue:
+    """Queue of jobs stored in the jobs table and processed by daemon worker threads"""
+
+    def __init__(self, workers: int = JOB_WORKERS, poll_interval: float = JOB_POLL_INTERVAL,
+                 lease_seconds: int = JOB_LEASE_SECONDS):
+        """
+        Initialize the job queue
+
+        Args:
+            workers: Number of worker threads to start per process
+            poll_interval: Seconds between polls when idle
+            lease_seconds: Seconds before an abandoned running job is retried
+        """
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self._handlers = {}
+        self._failure_handlers = {}
+        self._current = threading.local()
+        self._threads = []
+        self._pid = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def register(self, job_type: str, handler: Callable[[dict], Optional[dict]],
+                 on_failure: Optional[Callable[[dict, str], None]] = None):
+        """
+        Register the function that processes a job type
+
+        Args:
+            job_type: Job type name
+            handler: Called with the job payload; may return a result dict
+            on_failure: Called with the payload and error once the job has
+                failed its last attempt (e.g. to clean up files it would have used)
+        """
+        self._handlers[job_type] = handler
+        if on_failure:
+            self._failure_handlers[job_type] = on_failure
+
+    def handler(self, job_type: str, on_failure: Optional[Callable[[dict, str], None]] = None):
+        """Decorator form of register()"""
+        def decorator(func):
+            self.register(job_type, func, on_failure)
+            return func
+        return decorator
+
+    def heartbeat(self) -> bool:
+        """
+        Renew the lease of the job running on the calling thread
+
+        Long-running handlers call this regularly (e.g. after each batch) so the
+        job is not reclaimed by another worker after JOB_LEASE_SECONDS. Commits
+        the calling thread's connection. Does nothing outside a job.
+
+        Returns:
+            bool: False if the job has been reclaimed by another worker, in which
+                case the handler should stop (raise JobLeaseLost)
+        """
+        job = getattr(self._current, 'job', None)
+        if job is None:
+            return True
+
+        job_id, worker_id = job
+        conn = get_db_connection()
+        cursor = conn.execute('''
+            UPDATE jobs SET locked_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND status = 'running' AND locked_by = ?
+        ''', (job_id, worker_id))
+        conn.commit()
+        if cursor.rowcount == 0:
+            logger.warning(f"Job {job_id} lease lost by worker {worker_id}")
+            return False
+        return True
+
+    def enqueue(self, job_type: str, payload: dict, max_attempts: int = 3) -> int:
+        """
+        Add a job to the queue
+
+        Args:
+            job_type: Job type name (must have a registered handler)
+            payload: JSON-serializable job arguments
+            max_attempts: Attempts before the job is marked failed
+
+        Returns:
+            int: Job id
+        """
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO jobs (job_type, payload, max_attempts)
+            VALUES (?, ?, ?)
+        ''', (job_type, json.dumps(payload), max_attempts))
+        job_id = cursor.lastrowid
+        conn.commit()
+
+        logger.info(f"Enqueued {job_type} job {job_id}")
+        self.ensure_started()
+        self._wakeup.set()
+        return job_id
+
+    def get_stats(self) -> dict:
+        """
+        Get job counts by status
+
+        Returns:
+            dict: Status -> count, plus this process's worker count
+        """
+        cursor = get_db_connection().cursor()
+        cursor.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status')
+        stats = dict(cursor.fetchall())
+        stats['workers'] = len([t for t in self._threads if t.is_alive()])
+        return stats
+
+    def _claim(self, worker_id: str) -> Optional[tuple]:
+        """
+        Atomically take the oldest runnable job, reclaiming expired leases
+
+        An expired job that has used all its attempts (its worker was most
+        likely killed, e.g. by the OOM killer) is marked failed instead, and
+        its failure handler is run once the claim has committed.
+        """
+        lease_expired = f'-{self.lease_seconds} seconds'
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            cursor.execute('''
+                SELECT id, job_type, payload FROM jobs
+                WHERE status = 'running' AND locked_at <= datetime('now', ?) AND attempts >= max_attempts
+            ''', (lease_expired,))
+            abandoned = cursor.fetchall()
+            cursor.executemany('''
+                UPDATE jobs
+                SET status = 'failed', error = ?, locked_by = NULL, finished_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', [(_ABANDONED_ERROR, job_id) for job_id, _, _ in abandoned])
+
+            cursor.execute('''
+                SELECT id, job_type, payload FROM jobs
+                WHERE (status = 'queued' AND run_after <= CURRENT_TIMESTAMP)
+                   OR (status = 'running' AND locked_at <= datetime('now', ?) AND attempts < max_attempts)
+                ORDER BY id
+                LIMIT 1
+            ''', (lease_expired,))
+            job = cursor.fetchone()
+            if job:
+                cursor.execute('''
+                    UPDATE jobs
+                    SET status = 'running', attempts = attempts + 1, locked_by = ?,
+                        locked_at = CURRENT_TIMESTAMP, started_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', (worker_id, job[0]))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        for job_id, job_type, payload in abandoned:
+            logger.error(f"Job {job_id} ({job_type}) failed: {_ABANDONED_ERROR}")
+            self._run_failure_handler(job_id, job_type, json.loads(payload), _ABANDONED_ERROR)
+        return job
+
+    def _finish(self, job_id: int, worker_id: str, result: Optional[dict]):
+        """Mark a job done (unless its lease was taken over by another worker)"""
+        conn = get_db_connection()
+        cursor = conn.execute('''
+            UPDATE jobs
+            SET status = 'done', result = ?, error = NULL, locked_by = NULL, finished_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND locked_by = ?
+        ''', (json.dumps(result) if result is not None else None, job_id, worker_id))
+        conn.commit()
+        if cursor.rowcount == 0:
+            logger.warning(f"Job {job_id} was reclaimed by another worker; result of {worker_id} discarded")
+
+    def _fail(self, job_id: int, worker_id: str, error: str) -> bool:
+        """
+        Retry a job with backoff, or mark it failed once attempts are exhausted
+
+        Returns:
+            bool: True if the job failed for good
+        """
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE jobs
+            SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END,
+                error = ?, locked_by = NULL,
+                run_after = datetime('now', '+' || (attempts * 10) || ' seconds'),
+                finished_at = CASE WHEN attempts >= max_attempts THEN CURRENT_TIMESTAMP END
+            WHERE id = ? AND locked_by = ?
+        ''', (error, job_id, worker_id))
+        if cursor.rowcount == 0:
+            conn.commit()
+            logger.warning(f"Job {job_id} was reclaimed by another worker; failure of {worker_id} discarded")
+            return False
+        cursor.execute('SELECT status FROM jobs WHERE id = ?', (job_id,))
+        failed = cursor.fetchone()[0] == 'failed'
+        conn.commit()
+        return failed
+
+    def run_next(self, worker_id: str = 'inline') -> bool:
+        """
+        Claim and process a single job on the calling thread
+
+        Args:
+            worker_id: Identifier recorded on the job while it runs
+
+        Returns:
+            bool: True if a job was processed
+        """
+        job = self._claim(worker_id)
+        if not job:
+            return False
+
+        job_id, job_type, payload = job
+        payload = json.loads(payload)
+        handler = self._handlers.get(job_type)
+        started = time.time()
+        self._current.job = (job_id, worker_id)
+        try:
+            if handler is None:
+                raise LookupError(f"No handler registered for job type '{job_type}'")
+            result = handler(payload)
+            self._finish(job_id, worker_id, result)
+            logger.info(f"Job {job_id} ({job_type}) finished in {time.time() - started:.3f}s")
+        except Exception as e:
+            logger.error(f"Job {job_id} ({job_type}) failed: {e}", exc_info=True)
+            if self._fail(job_id, worker_id, str(e)):
+                self._run_failure_handler(job_id, job_type, payload, str(e))
+        finally:
+            self._current.job = None
+        return True
+
+    def _run_failure_handler(self, job_id: int, job_type: str, payload: dict, error: str):
+        """Call the on_failure handler of a job that has failed for good"""
+        on_failure = self._failure_handlers.get(job_type)
+        if on_failure is None:
+            return
+        try:
+            on_failure(payload, error)
+        except Exception as cleanup_error:
+            logger.warning(f"Failure handler for job {job_id} ({job_type}) raised: {cleanup_error}")
+
+    def _worker_loop(self, worker_id: str):
+        """Process jobs for the life of the process (the threads are daemons)"""
+        while True:
+            try:
+                if self.run_next(worker_id):
+                    continue
+            except sqlite3.Error as e:
+                logger.warning(f"Job worker {worker_id} database error: {e}")
+            finally:
+                release_db_connection()
+
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def ensure_started(self):
+        """Start the worker threads once per process (safe to call on every request)"""
+        if self._pid == os.getpid() or self.workers <= 0:
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # Threads do not survive a fork, so a forked gunicorn worker starts its own
+            self._pid = os.getpid()
+            self._threads = []
+            for n in range(self.workers):
+                worker_id = f"{os.getpid()}-{n}-{uuid.uuid4().hex[:6]}"
+                thread = threading.Thread(target=self._worker_loop, args=(worker_id,),
+                                          name=f"job-worker-{n}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            logger.info(f"Started {self.workers} job worker threads in process {self._pid}")
+
+
+# Global job queue instance
+job_queue = JobQueue()
+
+
+def get_job_queue() -> JobQueue:
+    """Get the global job queue instance"""
+    return job_queue
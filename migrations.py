@@ -0,0 +1,292 @@
+"""
+Database Migrations
+Versioned schema changes applied on startup after the base tables exist
+"""
+
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+
+def _column_exists(cursor: sqlite3.Cursor, table: str, column: str) -> bool:
+    """Check whether a table already has a column"""
+    cursor.execute(f'PRAGMA table_info({table})')
+    return any(col[1] == column for col in cursor.fetchall())
+
+
+def _add_wave_is_active(cursor: sqlite3.Cursor):
+    """Databases created before waves could be activated lack is_active"""
+    if not _column_exists(cursor, 'wave', 'is_active'):
+        cursor.execute('ALTER TABLE wave ADD COLUMN is_active BOOLEAN DEFAULT 0')
+
+
+def _add_order_indexes(cursor: sqlite3.Cursor):
+    """Index the dashboard/matching filters on order_table"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_order_status_created ON order_table (status, created_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_order_created ON order_table (created_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_order_wave ON order_table (wave_id)')
+
+
+def _add_venmo_txn_date(cursor: sqlite3.Cursor):
+    """Store Venmo's date separately so matching can seek instead of LIKE-scanning datetime"""
+    if not _column_exists(cursor, 'venmo_transactions', 'txn_date'):
+        cursor.execute('ALTER TABLE venmo_transactions ADD COLUMN txn_date TEXT')
+    cursor.execute('UPDATE venmo_transactions SET txn_date = substr(datetime, 1, 10) WHERE txn_date IS NULL')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_venmo_amount_date ON venmo_transactions (amount, txn_date)')
+
+
+def _add_zelle_indexes(cursor: sqlite3.Cursor):
+    """Index Zelle transactions on the columns matching probes"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_zelle_amount_date ON zelle_transactions (amount, date)')
+
+
+def _add_transaction_matches(cursor: sqlite3.Cursor):
+    """Record which transaction verified which order"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS transaction_matches (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id INTEGER NOT NULL UNIQUE,
+            source TEXT NOT NULL, -- 'venmo' or 'zelle'
+            transaction_id INTEGER NOT NULL,
+            score REAL,
+            matched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(source, transaction_id),
+            FOREIGN KEY (order_id) REFERENCES order_table (id)
+        )
+    ''')
+
+
+def _add_jobs(cursor: sqlite3.Cursor):
+    """Persistent queue for background work (OCR, imports)"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_type TEXT NOT NULL,
+            payload TEXT NOT NULL, -- JSON
+            status TEXT NOT NULL DEFAULT 'queued', -- 'queued', 'running', 'done', 'failed'
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 3,
+            result TEXT, -- JSON
+            error TEXT,
+            locked_by TEXT,
+            locked_at TIMESTAMP,
+            run_after TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, id)')
+
+
+def _add_ocr_cache(cursor: sqlite3.Cursor):
+    """Cache OCR results by receipt hash and remember each order's receipt hash"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ocr_cache (
+            receipt_hash TEXT NOT NULL,
+            engine_key TEXT NOT NULL,
+            text TEXT NOT NULL,
+            parsed TEXT NOT NULL, -- JSON
+            size_bytes INTEGER NOT NULL,
+            hits INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (receipt_hash, engine_key)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_ocr_cache_last_used ON ocr_cache (last_used_at)')
+    if not _column_exists(cursor, 'order_table', 'receipt_hash'):
+        cursor.execute('ALTER TABLE order_table ADD COLUMN receipt_hash TEXT')
+    if not _column_exists(cursor, 'order_table', 'duplicate_of'):
+        cursor.execute('ALTER TABLE order_table ADD COLUMN duplicate_of INTEGER REFERENCES order_table (id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_order_receipt_hash ON order_table (receipt_hash)')
+
+
+def _add_csv_upload_unchanged(cursor: sqlite3.Cursor):
+    """Imports now distinguish updated rows from rows that were already up to date"""
+    if not _column_exists(cursor, 'csv_uploads', 'unchanged_records'):
+        cursor.execute('ALTER TABLE csv_uploads ADD COLUMN unchanged_records INTEGER DEFAULT 0')
+
+
+def _add_csv_fingerprints(cursor: sqlite3.Cursor):
+    """Remember imported statement rows so overlapping exports can skip them"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS csv_row_fingerprints (
+            source TEXT NOT NULL, -- CSV format name, e.g. 'chase'
+            row_hash TEXT NOT NULL,
+            row_date TEXT,
+            PRIMARY KEY (source, row_hash)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS csv_sources (
+            source TEXT PRIMARY KEY,
+            high_water_date TEXT, -- newest transaction date imported
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    if not _column_exists(cursor, 'csv_uploads', 'file_hash'):
+        cursor.execute('ALTER TABLE csv_uploads ADD COLUMN file_hash TEXT')
+    if not _column_exists(cursor, 'csv_uploads', 'skipped_records'):
+        cursor.execute('ALTER TABLE csv_uploads ADD COLUMN skipped_records INTEGER DEFAULT 0')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_csv_uploads_file_hash ON csv_uploads (file_hash)')
+
+
+def _add_csv_upload_progress(cursor: sqlite3.Cursor):
+    """CSV imports run as background jobs that report progress on their upload row"""
+    columns = [
+        ('job_id', 'INTEGER'),
+        ('rows_per_second', 'REAL'),
+        ('error_lines', 'TEXT'),  # JSON list of {'line', 'error'}
+        ('error', 'TEXT'),
+        ('finished_at', 'TIMESTAMP'),
+    ]
+    for column, column_type in columns:
+        if not _column_exists(cursor, 'csv_uploads', column):
+            cursor.execute(f'ALTER TABLE csv_uploads ADD COLUMN {column} {column_type}')
+
+
+def _add_data_versions(cursor: sqlite3.Cursor):
+    """Change counters bumped by triggers on every write, so caches know when to rebuild"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS data_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    versioned_tables = {
+        'order_table': 'orders',
+        'wave': 'waves',
+        'venmo_transactions': 'venmo',
+        'zelle_transactions': 'zelle',
+        'transaction_matches': 'matches',
+    }
+    for table, name in versioned_tables.items():
+        cursor.execute('INSERT OR IGNORE INTO data_versions (name) VALUES (?)', (name,))
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_version
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE data_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP
+                    WHERE name = '{name}';
+                END
+            ''')
+
+
+def _add_order_stats(cursor: sqlite3.Cursor):
+    """Order counts and amounts per (day, wave, status), kept current by triggers on order_table"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS order_stats (
+            day TEXT NOT NULL,
+            wave_id INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL,
+            orders INTEGER NOT NULL DEFAULT 0,
+            amount REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, wave_id, status)
+        )
+    ''')
+    cursor.execute('''
+        INSERT OR IGNORE INTO order_stats (day, wave_id, status, orders, amount)
+        SELECT DATE(created_at), COALESCE(wave_id, 0), COALESCE(status, 'Pending'), COUNT(*), SUM(expected_amount)
+        FROM order_table
+        GROUP BY 1, 2, 3
+    ''')
+
+    # Orders without a wave are bucketed under wave_id 0 so the primary key stays usable
+    add = '''
+        INSERT INTO order_stats (day, wave_id, status, orders, amount)
+        VALUES (DATE(NEW.created_at), COALESCE(NEW.wave_id, 0), COALESCE(NEW.status, 'Pending'), 1, NEW.expected_amount)
+        ON CONFLICT (day, wave_id, status) DO UPDATE SET
+            orders = orders + 1, amount = amount + excluded.amount;
+    '''
+    remove = '''
+        UPDATE order_stats SET orders = orders - 1, amount = amount - OLD.expected_amount
+        WHERE day = DATE(OLD.created_at) AND wave_id = COALESCE(OLD.wave_id, 0)
+          AND status = COALESCE(OLD.status, 'Pending');
+        DELETE FROM order_stats
+        WHERE day = DATE(OLD.created_at) AND wave_id = COALESCE(OLD.wave_id, 0)
+          AND status = COALESCE(OLD.status, 'Pending') AND orders <= 0;
+    '''
+    cursor.execute(f'CREATE TRIGGER IF NOT EXISTS trg_order_table_insert_stats AFTER INSERT ON order_table BEGIN {add} END')
+    cursor.execute(f'CREATE TRIGGER IF NOT EXISTS trg_order_table_delete_stats AFTER DELETE ON order_table BEGIN {remove} END')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_order_table_update_stats
+        AFTER UPDATE OF status, wave_id, expected_amount, created_at ON order_table
+        BEGIN {remove} {add} END
+    ''')
+
+
+# Ordered list of (version, name, function). Append only - never renumber.
+MIGRATIONS = [
+    (1, 'add_wave_is_active', _add_wave_is_active),
+    (2, 'add_order_indexes', _add_order_indexes),
+    (3, 'add_venmo_txn_date', _add_venmo_txn_date),
+    (4, 'add_zelle_indexes', _add_zelle_indexes),
+    (5, 'add_transaction_matches', _add_transaction_matches),
+    (6, 'add_jobs', _add_jobs),
+    (7, 'add_ocr_cache', _add_ocr_cache),
+    (8, 'add_csv_upload_unchanged', _add_csv_upload_unchanged),
+    (9, 'add_csv_fingerprints', _add_csv_fingerprints),
+    (10, 'add_csv_upload_progress', _add_csv_upload_progress),
+    (11, 'add_data_versions', _add_data_versions),
+    (12, 'add_order_stats', _add_order_stats),
+]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """
+    Get the highest applied migration version
+
+    The version lives in SQLite's user_version header field, which is updated
+    in the same transaction as the migration itself.
+
+    Args:
+        conn: Database connection
+
+    Returns:
+        int: Schema version, 0 if no migrations have run
+    """
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def run_migrations(conn: sqlite3.Connection) -> list:
+    """
+    Apply every migration newer than the database's schema version
+
+    Runs inside a single IMMEDIATE transaction so that gunicorn workers starting
+    together do not apply the same migration twice.
+
+    Args:
+        conn: Database connection (must not be inside a transaction)
+
+    Returns:
+        list: Names of the migrations that were applied
+    """
+    if conn.in_transaction:
+        conn.commit()
+
+    cursor = conn.cursor()
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        current_version = get_schema_version(conn)
+
+        applied = []
+        for version, name, migrate in MIGRATIONS:
+            if version <= current_version:
+                continue
+            logger.info(f"Applying migration {version}: {name}")
+            migrate(cursor)
+            cursor.execute(f'PRAGMA user_version = {int(version)}')
+            applied.append(name)
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    if applied:
+        logger.info(f"Schema migrated from version {current_version} to {MIGRATIONS[-1][0]}")
+    return applied
@@ -0,0 +1,200 @@
+"""
+Object Cache
+Local copies of R2 objects (receipts) with size-bounded LRU eviction and ETag revalidation
+"""
+
+import os
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Optional
+
+from database import get_connection_manager
+from storage_service import get_storage_service
+
+logger = logging.getLogger(__name__)
+
+# Where R2 objects are cached (default: r2_cache/ next to the database)
+R2_CACHE_DIR = os.environ.get('R2_CACHE_DIR')
+
+# Total size of cached objects kept before LRU eviction
+R2_CACHE_MAX_BYTES = int(os.environ.get('R2_CACHE_MAX_BYTES', 200 * 1024 * 1024))
+
+# Seconds a cached object is served before its ETag is checked against R2 again
+R2_CACHE_REVALIDATE_SECONDS = int(os.environ.get('R2_CACHE_REVALIDATE_SECONDS', 300))
+
+
+class ObjectCache:
+    """
+    Directory of downloaded R2 objects
+
+    Each object is stored as '<sha1 of key><extension>' next to a '.etag' file
+    holding the ETag it was downloaded with. The object file's modification
+    time is its LRU timestamp and the ETag file's is when the copy was last
+    confirmed current; after R2_CACHE_REVALIDATE_SECONDS the next read asks R2
+    for the object only if its ETag changed. A copy is dropped only when R2
+    says the object is gone; while R2 cannot be reached it is served as is.
+    """
+
+    def __init__(self, directory: Optional[str] = R2_CACHE_DIR, max_bytes: int = R2_CACHE_MAX_BYTES,
+                 revalidate_seconds: int = R2_CACHE_REVALIDATE_SECONDS):
+        """
+        Initialize the cache
+
+        Args:
+            directory: Cache directory (resolved next to the database if not provided)
+            max_bytes: Total object size to keep before evicting least recently used entries
+            revalidate_seconds: Seconds to serve a copy before checking its ETag
+        """
+        self._directory = directory
+        self.max_bytes = max_bytes
+        self.revalidate_seconds = revalidate_seconds
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.stale_hits = 0
+        self.evictions = 0
+
+    @property
+    def directory(self) -> str:
+        """Cache directory, created on first use"""
+        if self._directory is None:
+            db_dir = os.path.dirname(get_connection_manager().db_path)
+            self._directory = os.path.join(db_dir, 'r2_cache')
+        os.makedirs(self._directory, exist_ok=True)
+        return self._directory
+
+    def _paths(self, key: str) -> tuple:
+        """Object and ETag file paths for a key (the extension is kept for MIME type detection)"""
+        name = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        extension = os.path.splitext(key)[1].lower()
+        return (os.path.join(self.directory, f"{name}{extension}"),
+                os.path.join(self.directory, f"{name}.etag"))
+
+    def get_file(self, key: str) -> Optional[str]:
+        """
+        Get a local copy of an R2 object, downloading it only if needed
+
+        Args:
+            key: Object key (path) in the bucket
+
+        Returns:
+            str: Path of the cached copy (owned by the cache, do not delete),
+                None if the object no longer exists or could not be fetched
+        """
+        path, etag_path = self._paths(key)
+        try:
+            with open(etag_path) as f:
+                etag = f.read().strip()
+            validated_at = os.path.getmtime(etag_path)
+            # The modification time doubles as the LRU timestamp
+            os.utime(path)
+        except FileNotFoundError:
+            # Not cached, or evicted by another worker while being read
+            etag, validated_at = None, 0
+
+        if etag and time.time() - validated_at < self.revalidate_seconds:
+            with self._lock:
+                self.hits += 1
+            return path
+
+        result = get_storage_service().fetch_if_changed(key, etag)
+        if result is None:
+            if not etag:
+                return None
+            # R2 unreachable: serve the copy and leave it due, so the next read asks again
+            with self._lock:
+                self.hits += 1
+                self.stale_hits += 1
+            logger.warning(f"Serving cached copy of {key} without revalidation")
+            return path
+
+        if result.get('missing'):
+            # Deleted from R2: drop the copy rather than serve an object that no longer exists
+            self._remove(path, etag_path)
+            return None
+
+        if not result['modified']:
+            os.utime(etag_path)
+            with self._lock:
+                self.hits += 1
+                self.revalidations += 1
+            return path
+
+        self._write(path, etag_path, result['body'], result['etag'])
+        with self._lock:
+            self.misses += 1
+        logger.info(f"R2 object cached: {key}")
+        self._evict(path)
+        return path
+
+    def _write(self, path: str, etag_path: str, body, etag: str):
+        """Store a downloaded object under a temporary name, then move it into place"""
+        output = tempfile.NamedTemporaryFile(dir=self.directory, prefix='.', suffix='.tmp', delete=False)
+        try:
+            with output:
+                shutil.copyfileobj(body, output)
+            os.replace(output.name, path)
+        except BaseException:
+            os.unlink(output.name)
+            raise
+
+        with open(etag_path, 'w') as f:
+            f.write(etag)
+
+    def _evict(self, keep: str):
+        """Remove least recently used objects while the cache is over its size limit"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith('.') or entry.name.endswith('.etag') or not entry.is_file():
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            self._remove(path, f"{os.path.splitext(path)[0]}.etag")
+            with self._lock:
+                self.evictions += 1
+            total -= size
+
+    def _remove(self, path: str, etag_path: str):
+        """Delete an object and its ETag (another worker may have removed them already)"""
+        for file_path in (path, etag_path):
+            try:
+                os.unlink(file_path)
+            except FileNotFoundError:
+                pass
+
+    def get_stats(self) -> dict:
+        """Get cache statistics"""
+        files = [entry for entry in os.scandir(self.directory)
+                 if entry.is_file() and not entry.name.startswith('.') and not entry.name.endswith('.etag')]
+        with self._lock:
+            return {
+                'entries': len(files),
+                'size_bytes': sum(entry.stat().st_size for entry in files),
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'revalidations': self.revalidations,
+                'stale_hits': self.stale_hits,
+                'evictions': self.evictions
+            }
+
+
+# Global cache instance
+object_cache = ObjectCache()
+
+
+def get_object_cache() -> ObjectCache:
+    """Get the global object cache instance"""
+    return object_cache
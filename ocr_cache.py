@@ -0,0 +1,165 @@
+"""
+OCR Result Cache
+Content-addressed cache of OCR text and parsed receipt data, keyed by receipt hash
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from datetime import date
+from typing import Optional
+
+from database import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# Total size of cached OCR text kept in the database before LRU eviction
+OCR_CACHE_MAX_BYTES = int(os.environ.get('OCR_CACHE_MAX_BYTES', 20 * 1024 * 1024))
+
+
+def hash_receipt(data: bytes) -> str:
+    """
+    Hash the raw bytes of an uploaded receipt
+
+    Args:
+        data: Receipt file contents
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+class OCRCache:
+    """OCR results stored in the ocr_cache table with size-bounded LRU eviction"""
+
+    def __init__(self, max_bytes: int = OCR_CACHE_MAX_BYTES):
+        """
+        Initialize the cache
+
+        Args:
+            max_bytes: Total text size to keep before evicting least recently used entries
+        """
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, receipt_hash: str, engine_key: str) -> Optional[dict]:
+        """
+        Look up a cached OCR result
+
+        Args:
+            receipt_hash: SHA-256 of the receipt bytes
+            engine_key: OCR engine/version and parser version the result came from
+
+        Returns:
+            dict: {'text': str, 'parsed': dict} or None on a miss
+        """
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT text, parsed FROM ocr_cache
+            WHERE receipt_hash = ? AND engine_key = ?
+        ''', (receipt_hash, engine_key))
+        row = cursor.fetchone()
+
+        if not row:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        cursor.execute('''
+            UPDATE ocr_cache SET hits = hits + 1, last_used_at = CURRENT_TIMESTAMP
+            WHERE receipt_hash = ? AND engine_key = ?
+        ''', (receipt_hash, engine_key))
+        conn.commit()
+        with self._lock:
+            self.hits += 1
+
+        parsed = json.loads(row[1])
+        if parsed.get('date'):
+            parsed['date'] = date.fromisoformat(parsed['date'])
+        return {'text': row[0], 'parsed': parsed}
+
+    def put(self, receipt_hash: str, engine_key: str, text: str, parsed: dict):
+        """
+        Store an OCR result, evicting old entries if the cache is over budget
+
+        Args:
+            receipt_hash: SHA-256 of the receipt bytes
+            engine_key: OCR engine/version and parser version the result came from
+            text: Extracted OCR text
+            parsed: Parsed receipt fields (amount, date, name, ...)
+        """
+        parsed_json = json.dumps(parsed, default=lambda value: value.isoformat())
+        conn = get_db_connection()
+        conn.execute('''
+            INSERT INTO ocr_cache (receipt_hash, engine_key, text, parsed, size_bytes)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(receipt_hash, engine_key) DO UPDATE SET
+                text = excluded.text, parsed = excluded.parsed,
+                size_bytes = excluded.size_bytes, last_used_at = CURRENT_TIMESTAMP
+        ''', (receipt_hash, engine_key, text, parsed_json, len(text.encode('utf-8')) + len(parsed_json)))
+        conn.commit()
+        self.evict()
+
+    def evict(self) -> int:
+        """
+        Delete least recently used entries until the cache fits in max_bytes
+
+        Returns:
+            int: Number of entries evicted
+        """
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT COALESCE(SUM(size_bytes), 0) FROM ocr_cache')
+        excess = cursor.fetchone()[0] - self.max_bytes
+        if excess <= 0:
+            return 0
+
+        cursor.execute('SELECT rowid, size_bytes FROM ocr_cache ORDER BY last_used_at, rowid')
+        doomed = []
+        for rowid, size_bytes in cursor.fetchall():
+            if excess <= 0:
+                break
+            doomed.append((rowid,))
+            excess -= size_bytes
+
+        cursor.executemany('DELETE FROM ocr_cache WHERE rowid = ?', doomed)
+        conn.commit()
+        with self._lock:
+            self.evictions += len(doomed)
+        logger.info(f"Evicted {len(doomed)} OCR cache entries")
+        return len(doomed)
+
+    def get_stats(self) -> dict:
+        """
+        Get cache size and hit/miss counters
+
+        Returns:
+            dict: Entries and bytes stored, plus this process's hits/misses/evictions
+        """
+        cursor = get_db_connection().cursor()
+        cursor.execute('SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM ocr_cache')
+        entries, size_bytes = cursor.fetchone()
+        return {
+            'entries': entries,
+            'size_bytes': size_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+
+# Global OCR cache instance
+ocr_cache = OCRCache()
+
+
+def get_ocr_cache() -> OCRCache:
+    """Get the global OCR cache instance"""
+    return ocr_cache
@@ -0,0 +1,311 @@
+"""
+OCR Executor
+Process pool whose workers resolve the OCR engine once and keep it warm
+"""
+
+import os
+import io
+import time
+import logging
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Iterable, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Worker processes, each holding its own OCR engine (an EasyOCR model is large); 0 runs OCR in the calling thread
+OCR_WORKERS = int(os.environ.get('OCR_WORKERS', 1))
+
+# How pool workers are started; the default avoids forking a process that has job threads and open connections
+OCR_START_METHOD = os.environ.get('OCR_START_METHOD') or (
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+)
+
+# Where to look for the tesseract binary, in order
+TESSERACT_PATHS = [
+    os.environ.get('TESSERACT_CMD'),
+    '/usr/bin/tesseract',
+    '/usr/local/bin/tesseract',
+    'tesseract'
+]
+
+# Sentinel returned when no OCR engine is installed
+OCR_NOT_AVAILABLE = "OCR_NOT_AVAILABLE"
+
+# Engine state of the current process (a pool worker or the inline fallback)
+_engine = None
+_engine_version = None
+_easyocr_reader = None
+_engine_lock = threading.Lock()
+
+
+def _resolve_engine():
+    """Find an OCR engine once per process: Tesseract first, then EasyOCR"""
+    global _engine, _engine_version, _easyocr_reader
+
+    import pytesseract
+    for path in filter(None, TESSERACT_PATHS):
+        try:
+            pytesseract.pytesseract.tesseract_cmd = path
+            _engine_version = str(pytesseract.get_tesseract_version())
+            _engine = 'tesseract'
+            logger.info(f"Tesseract found at {path}, version: {_engine_version}")
+            return
+        except Exception as e:
+            logger.debug(f"Tesseract not found at {path}: {e}")
+
+    logger.info("Tesseract not found, trying EasyOCR as fallback...")
+    try:
+        import easyocr
+        # Loading the model is the slow part, so the reader stays resident
+        _easyocr_reader = easyocr.Reader(['en'])
+        _engine = 'easyocr'
+        _engine_version = getattr(easyocr, '__version__', 'unknown')
+        logger.info("EasyOCR reader loaded")
+    except ImportError:
+        logger.error("EasyOCR not available. Please install with: pip install easyocr")
+        _engine = 'none'
+    except Exception as e:
+        logger.error(f"EasyOCR failed to load: {e}")
+        _engine = 'none'
+
+
+def _ensure_engine():
+    """Resolve the engine if this process has not done so yet"""
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _resolve_engine()
+
+
+def _init_worker():
+    """Process pool initializer: warm the engine before the first job arrives"""
+    _ensure_engine()
+
+
+def _engine_signature() -> str:
+    """Name and version of the engine this process uses"""
+    _ensure_engine()
+    return f"{_engine}:{_engine_version}"
+
+
+def _ocr_image(image: Union[str, bytes]) -> tuple:
+    """
+    OCR one image inside the current process
+
+    Args:
+        image: Image file path or encoded image bytes
+
+    Returns:
+        tuple: (engine, text, seconds)
+    """
+    _ensure_engine()
+    started = time.time()
+
+    if _engine == 'tesseract':
+        import pytesseract
+        from PIL import Image
+        source = io.BytesIO(image) if isinstance(image, bytes) else image
+        with Image.open(source) as img:
+            text = pytesseract.image_to_string(img)
+    elif _engine == 'easyocr':
+        # EasyOCR accepts both paths and encoded bytes
+        results = _easyocr_reader.readtext(image)
+        text = '\n'.join([result[1] for result in results])
+    else:
+        text = OCR_NOT_AVAILABLE
+
+    return _engine, text, time.time() - started
+
+
+class OCRExecutor:
+    """Runs OCR on a pool of warm worker processes and keeps latency metrics"""
+
+    def __init__(self, workers: int = OCR_WORKERS):
+        """
+        Initialize the executor (the pool itself starts on first use)
+
+        Args:
+            workers: Number of worker processes, 0 to OCR inline
+        """
+        self.workers = workers
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._metrics = {}
+        self._signature = None
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        """Get this process's pool, creating it after a fork if needed"""
+        if self.workers <= 0:
+            return None
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context(OCR_START_METHOD),
+                                                 initializer=_init_worker)
+                self._pid = os.getpid()
+                logger.info(f"Started OCR pool with {self.workers} worker processes ({OCR_START_METHOD})")
+            return self._pool
+
+    def _reset_pool(self):
+        """Discard a broken pool so the next call starts a fresh one"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _record(self, engine: str, seconds: float):
+        """Add one OCR call to the per-engine latency metrics"""
+        with self._lock:
+            metric = self._metrics.setdefault(engine, {'calls': 0, 'total_seconds': 0.0, 'max_seconds': 0.0})
+            metric['calls'] += 1
+            metric['total_seconds'] += seconds
+            metric['max_seconds'] = max(metric['max_seconds'], seconds)
+
+    def ocr_pages(self, pages: Iterable, stop_when: Optional[Callable[[list], bool]] = None,
+                  max_in_flight: int = None) -> list:
+        """
+        OCR a stream of page images with a bounded number held in memory
+
+        Pages are pulled from the iterable only as pool slots free up, so a lazy
+        generator is never rasterized further ahead than max_in_flight pages.
+
+        Args:
+            pages: Iterable of image file paths or encoded image bytes
+            stop_when: Called with the page texts so far (in page order); returning
+                True stops the pipeline and discards pages still in flight
+            max_in_flight: Pages rasterized but not yet OCRed (default workers + 1)
+
+        Returns:
+            list: Text of each page processed, in page order
+        """
+        pool = self._get_pool()
+        if max_in_flight is None:
+            max_in_flight = self.workers + 1 if pool else 1
+
+        pages = iter(pages)
+        in_flight = deque()
+        texts = []
+        exhausted = False
+        try:
+            while True:
+                # Keep the pool busy without reading further ahead than allowed
+                while not exhausted and len(in_flight) < max_in_flight:
+                    try:
+                        page = next(pages)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    future = None
+                    if pool:
+                        try:
+                            future = pool.submit(_ocr_image, page)
+                        except BrokenProcessPool:
+                            logger.error("OCR pool is broken; restarting it and continuing inline")
+                            self._reset_pool()
+                            pool = None
+                    in_flight.append((page, future))
+                    with self._lock:
+                        self._pending += 1
+                if not in_flight:
+                    break
+
+                page, future = in_flight.popleft()
+                try:
+                    engine, text, seconds = future.result() if future else _ocr_image(page)
+                except BrokenProcessPool:
+                    logger.error("OCR worker process died; restarting pool and continuing inline")
+                    self._reset_pool()
+                    pool = None
+                    in_flight = deque((pending_page, None) for pending_page, _ in in_flight)
+                    engine, text, seconds = _ocr_image(page)
+                finally:
+                    with self._lock:
+                        self._pending -= 1
+
+                self._record(engine, seconds)
+                texts.append(text)
+                if stop_when and stop_when(texts):
+                    break
+        finally:
+            for _, future in in_flight:
+                if future:
+                    future.cancel()
+            with self._lock:
+                self._pending -= len(in_flight)
+
+        return texts
+
+    def ocr_images(self, images: list) -> list:
+        """
+        OCR several images in parallel across the pool
+
+        Args:
+            images: Image file paths or encoded image bytes
+
+        Returns:
+            list: Text per image, in input order (OCR_NOT_AVAILABLE if no engine)
+        """
+        return self.ocr_pages(images, max_in_flight=max(len(images), 1))
+
+    def ocr_image(self, image: Union[str, bytes]) -> str:
+        """
+        OCR a single image
+
+        Args:
+            image: Image file path or encoded image bytes
+
+        Returns:
+            str: Extracted text (OCR_NOT_AVAILABLE if no engine)
+        """
+        return self.ocr_images([image])[0]
+
+    def engine_signature(self) -> str:
+        """
+        Get the OCR engine name and version used by the workers
+
+        Returns:
+            str: e.g. 'tesseract:5.3.0' or 'none:None'
+        """
+        if self._signature is None or self._signature[0] != os.getpid():
+            pool = self._get_pool()
+            signature = pool.submit(_engine_signature).result() if pool else _engine_signature()
+            self._signature = (os.getpid(), signature)
+        return self._signature[1]
+
+    def get_metrics(self) -> dict:
+        """
+        Get queue depth and per-engine latency
+
+        Returns:
+            dict: Worker count, images waiting for OCR and latency per engine
+        """
+        with self._lock:
+            engines = {
+                engine: dict(metric, avg_seconds=metric['total_seconds'] / metric['calls'])
+                for engine, metric in self._metrics.items()
+            }
+            return {
+                'workers': self.workers,
+                'pool_running': self._pool is not None and self._pid == os.getpid(),
+                'queue_depth': self._pending,
+                'engines': engines
+            }
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        self._reset_pool()
+
+
+# Global OCR executor instance
+ocr_executor = OCRExecutor()
+
+
+def get_ocr_executor() -> OCRExecutor:
+    """Get the global OCR executor instance"""
+    return ocr_executor
@@ -0,0 +1,150 @@
+"""
+Order Board
+Paginated, searchable order queries behind the admin dashboard's status columns
+"""
+
+import os
+import json
+import base64
+import sqlite3
+from typing import Optional
+
+from order_stats import get_status_counts
+
+# Dashboard column -> order statuses shown in it ('customers' is the verified customers list)
+BOARD_COLUMNS = {
+    'pending': ('Pending', 'Processing'),
+    'verified': ('Verified',),
+    'flagged': ('Flagged',),
+    'completed': ('Completed',),
+    'customers': ('Verified', 'Completed'),
+}
+
+# Orders per column page
+DASHBOARD_PAGE_SIZE = int(os.environ.get('DASHBOARD_PAGE_SIZE', 25))
+
+# Largest page a client may ask for
+MAX_PAGE_SIZE = 200
+
+_ORDER_FIELDS = '''
+    o.id, o.uuid, o.name, o.email, o.referral, o.boys_count, o.girls_count,
+    o.wave_id, w.name AS wave_name, o.expected_amount, o.ocr_amount, o.status,
+    o.receipt_path, o.created_at
+'''
+
+
+def encode_cursor(created_at: str, order_id: int) -> str:
+    """Encode the sort key of a page's last order as an opaque 'after' token"""
+    return base64.urlsafe_b64encode(json.dumps([created_at, order_id]).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(token: str) -> tuple:
+    """
+    Decode an 'after' token from encode_cursor()
+
+    Raises:
+        ValueError: If the token is malformed
+    """
+    try:
+        created_at, order_id = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+        return str(created_at), int(order_id)
+    except (ValueError, TypeError, UnicodeError):
+        raise ValueError(f"Invalid page cursor: {token!r}")
+
+
+def _filter_clause(search: Optional[str], wave_id: Optional[int]) -> tuple:
+    """Build the search (name/email substring, UUID prefix) and wave conditions"""
+    clauses, params = [], []
+    if search:
+        escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        clauses.append("(o.name LIKE ? ESCAPE '\\' OR o.email LIKE ? ESCAPE '\\' OR o.uuid LIKE ? ESCAPE '\\')")
+        params.extend([f'%{escaped}%', f'%{escaped}%', f'{escaped}%'])
+    if wave_id is not None:
+        clauses.append('o.wave_id = ?')
+        params.append(wave_id)
+    return clauses, params
+
+
+def count_orders(conn: sqlite3.Connection, search: Optional[str] = None, wave_id: Optional[int] = None) -> dict:
+    """
+    Count orders per dashboard column
+
+    Args:
+        conn: Database connection
+        search: Optional name/email/UUID search
+        wave_id: Optional wave filter
+
+    Returns:
+        dict: column -> order count, plus 'total' (orders in the four board columns)
+    """
+    if search:
+        clauses, params = _filter_clause(search, wave_id)
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT o.status, COUNT(*) FROM order_table o WHERE {' AND '.join(clauses)} GROUP BY o.status",
+                       params)
+        by_status = dict(cursor.fetchall())
+    else:
+        # Unsearched counts come from the order_stats rollup instead of scanning orders
+        by_status = get_status_counts(conn, wave_id)
+
+    counts = {column: sum(by_status.get(status, 0) for status in statuses)
+              for column, statuses in BOARD_COLUMNS.items()}
+    counts['total'] = sum(counts[column] for column in ('pending', 'verified', 'flagged', 'completed'))
+    return counts
+
+
+def fetch_orders(conn: sqlite3.Connection, column: str, after: Optional[str] = None,
+                 limit: int = DASHBOARD_PAGE_SIZE, search: Optional[str] = None,
+                 wave_id: Optional[int] = None) -> dict:
+    """
+    Fetch one page of a dashboard column, newest orders first
+
+    Pages are keyset-paginated on (created_at, id): each page seeks past the
+    previous page's last order on the (status, created_at) index instead of
+    counting off an OFFSET, so deep pages cost the same as the first.
+
+    Args:
+        conn: Database connection
+        column: Key of BOARD_COLUMNS
+        after: next_cursor of the previous page
+        limit: Page size (capped at MAX_PAGE_SIZE)
+        search: Optional name/email/UUID search
+        wave_id: Optional wave filter
+
+    Returns:
+        dict: orders (list of dicts keyed by column name) and next_cursor
+            (None on the last page)
+
+    Raises:
+        ValueError: If the column or cursor is invalid
+    """
+    if column not in BOARD_COLUMNS:
+        raise ValueError(f"Unknown dashboard column: {column!r}")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    statuses = BOARD_COLUMNS[column]
+    clauses, params = _filter_clause(search, wave_id)
+    clauses.insert(0, f"o.status IN ({','.join('?' * len(statuses))})")
+    params[:0] = statuses
+    if after:
+        created_at, order_id = decode_cursor(after)
+        clauses.append('(o.created_at < ? OR (o.created_at = ? AND o.id < ?))')
+        params.extend([created_at, created_at, order_id])
+
+    cursor = conn.cursor()
+    cursor.row_factory = sqlite3.Row
+    cursor.execute(f'''
+        SELECT {_ORDER_FIELDS}
+        FROM order_table o
+        LEFT JOIN wave w ON o.wave_id = w.id
+        WHERE {' AND '.join(clauses)}
+        ORDER BY o.created_at DESC, o.id DESC
+        LIMIT ?
+    ''', (*params, limit + 1))
+    orders = [dict(row) for row in cursor.fetchall()]
+
+    next_cursor = None
+    if len(orders) > limit:
+        orders.pop()
+        next_cursor = encode_cursor(orders[-1]['created_at'], orders[-1]['id'])
+    return {'orders': orders, 'next_cursor': next_cursor}
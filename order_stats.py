@@ -0,0 +1,107 @@
+"""
+Order Stats
+Reads of the order_stats rollup, which triggers on order_table keep current (see migration 12)
+"""
+
+import sqlite3
+from typing import Iterable, Optional
+
+# Statuses whose expected amount counts as collected revenue
+REVENUE_STATUSES = ('Verified', 'Completed')
+
+# Longest daily volume range the analytics page will show
+MAX_VOLUME_DAYS = 366
+
+
+def get_status_counts(conn: sqlite3.Connection, wave_id: Optional[int] = None) -> dict:
+    """
+    Count orders per status
+
+    Args:
+        conn: Database connection
+        wave_id: Only count this wave's orders
+
+    Returns:
+        dict: status -> order count
+    """
+    cursor = conn.cursor()
+    if wave_id is None:
+        cursor.execute('SELECT status, SUM(orders) FROM order_stats GROUP BY status')
+    else:
+        cursor.execute('SELECT status, SUM(orders) FROM order_stats WHERE wave_id = ? GROUP BY status', (wave_id,))
+    return {status: count for status, count in cursor.fetchall() if count}
+
+
+def get_daily_volume(conn: sqlite3.Connection, days: int = 7) -> dict:
+    """
+    Count orders created per day
+
+    Args:
+        conn: Database connection
+        days: Number of days back from today to include
+
+    Returns:
+        dict: 'YYYY-MM-DD' -> order count, oldest day first
+    """
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT day, SUM(orders)
+        FROM order_stats
+        WHERE day >= DATE('now', ?)
+        GROUP BY day
+        ORDER BY day
+    ''', (f'-{days} days',))
+    return {day: count for day, count in cursor.fetchall() if count}
+
+
+def get_wave_revenue(conn: sqlite3.Connection, statuses: Iterable[str] = REVENUE_STATUSES) -> list:
+    """
+    Sum order counts and expected amounts per wave
+
+    Args:
+        conn: Database connection
+        statuses: Order statuses that count as revenue
+
+    Returns:
+        list: dicts with wave_id (None for orders without a wave), wave_name,
+            orders and revenue, in wave order
+    """
+    statuses = list(statuses)
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        SELECT s.wave_id, w.name, SUM(s.orders), SUM(s.amount)
+        FROM order_stats s
+        LEFT JOIN wave w ON s.wave_id = w.id
+        WHERE s.status IN ({','.join('?' * len(statuses))})
+        GROUP BY s.wave_id
+        HAVING SUM(s.orders) > 0
+        ORDER BY s.wave_id = 0, w.start_date, s.wave_id
+    ''', statuses)
+    return [
+        {'wave_id': wave_id or None, 'wave_name': name or 'No wave', 'orders': orders, 'revenue': round(amount, 2)}
+        for wave_id, name, orders, amount in cursor.fetchall()
+    ]
+
+
+def rebuild_order_stats(conn: sqlite3.Connection) -> int:
+    """
+    Recompute the rollup from order_table
+
+    The triggers keep the rollup current; this repairs it after writes that
+    bypassed them (e.g. a restored backup). The caller commits.
+
+    Args:
+        conn: Database connection
+
+    Returns:
+        int: Number of rollup rows written
+    """
+    cursor = conn.cursor()
+    cursor.execute('DELETE FROM order_stats')
+    cursor.execute('''
+        INSERT INTO order_stats (day, wave_id, status, orders, amount)
+        SELECT DATE(created_at), COALESCE(wave_id, 0), COALESCE(status, 'Pending'), COUNT(*), SUM(expected_amount)
+        FROM order_table
+        GROUP BY 1, 2, 3
+    ''')
+    return cursor.rowcount
@@ -0,0 +1,84 @@
+"""
+Page Cache
+Rendered HTML for public pages, kept per data version with content-based ETags
+"""
+
+import hashlib
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class PageCache:
+    """
+    One rendered copy of each cached page
+
+    A page is rendered again only when the version it was rendered for
+    changes; the ETag is a hash of the body, so a redeploy that changes the
+    template also changes the ETag even if the data did not.
+    """
+
+    def __init__(self):
+        """Initialize the cache"""
+        self._lock = threading.Lock()
+        self._pages = {}
+        self.hits = 0
+        self.renders = 0
+
+    def get_or_render(self, name: str, version, render: Callable[[], str]) -> dict:
+        """
+        Get a page, rendering it if the cached copy is missing or out of date
+
+        Args:
+            name: Page key (including any variant, e.g. 'index-public')
+            version: Version of the data the page shows
+            render: Called to render the page body
+
+        Returns:
+            dict: body, etag and rendered_at (UTC datetime, for Last-Modified)
+        """
+        with self._lock:
+            page = self._pages.get(name)
+            if page and page['version'] == version:
+                self.hits += 1
+                return page
+
+        # Render outside the lock; concurrent misses just render the same page twice
+        body = render()
+        page = {
+            'version': version,
+            'body': body,
+            'etag': hashlib.sha1(body.encode('utf-8')).hexdigest()[:20],
+            'rendered_at': datetime.now(timezone.utc).replace(microsecond=0)
+        }
+        with self._lock:
+            self._pages[name] = page
+            self.renders += 1
+        logger.info(f"Page rendered: {name} (version {version})")
+        return page
+
+    def clear(self):
+        """Drop every cached page"""
+        with self._lock:
+            self._pages.clear()
+
+    def get_stats(self) -> dict:
+        """Get cache statistics"""
+        with self._lock:
+            return {
+                'pages': len(self._pages),
+                'hits': self.hits,
+                'renders': self.renders
+            }
+
+
+# Global cache instance
+page_cache = PageCache()
+
+
+def get_page_cache() -> PageCache:
+    """Get the global page cache instance"""
+    return page_cache
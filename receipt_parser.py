@@ -0,0 +1,155 @@
+"""
+Receipt Parser
+Single-pass extraction of amount, date and payer name from receipt OCR text
+"""
+
+import re
+from datetime import date
+from typing import Optional
+
+# Bump whenever parse results can change so cached OCR results are re-parsed
+PARSER_VERSION = 2
+
+_MONTHS = {
+    'january': 1, 'february': 2, 'march': 3, 'april': 4, 'may': 5, 'june': 6,
+    'july': 7, 'august': 8, 'september': 9, 'october': 10, 'november': 11, 'december': 12,
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'jun': 6, 'jul': 7, 'aug': 8,
+    'sep': 9, 'sept': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+}
+
+# One alternation per line finds every amount and date token in a single scan
+_TOKEN_RE = re.compile(r'''
+    \$\s*(?P<amount>\d{1,3}(?:,\d{3})+(?:\.\d{1,2})?|\d+(?:\.\d{1,2})?)
+  | (?P<suffix_amount>\d+(?:\.\d{1,2})?)\s*\$
+  | \b(?P<month_name>[A-Za-z]{3,9})\.?\s+(?P<named_day>\d{1,2}),\s*(?P<named_year>\d{4})
+  | \b(?P<slash_month>\d{1,2})/(?P<slash_day>\d{1,2})/(?P<slash_year>\d{4})
+  | \b(?P<iso_year>\d{4})-(?P<iso_month>\d{2})-(?P<iso_day>\d{2})
+''', re.VERBOSE)
+
+_EMAIL_RE = re.compile(r'([\w.+-]+)@[\w-]+\.[\w.]+')
+_DIGIT_RE = re.compile(r'\d')
+_AMOUNT_KEYWORD_RE = re.compile(r'total|amount|paid|sent|payment', re.IGNORECASE)
+_AMOUNT_ONLY_RE = re.compile(r'[-+]?\s*\$\s*[\d,.]+|[\d.]+\s*\$')
+_NAME_PREFIX_RE = re.compile(r'^(?:from|to|paid by|sent by)\s+', re.IGNORECASE)
+_PROPER_NAME_RE = re.compile(r"[A-Z][a-zA-Z'.-]*(?: [A-Z][a-zA-Z'.-]*){1,3}")
+
+# Lines containing these words are receipt chrome, not the payer's name
+_SKIP_WORDS_RE = re.compile(r'complete|status|payment|transaction|details|depsi|utd|beta|chapter')
+_FALLBACK_SKIP_LINES = frozenset(['complete', 'status', 'payment', 'transaction', 'details', 'depsi', 'utd'])
+
+
+def _token_date(match: re.Match) -> tuple:
+    """Turn a date token into (date, confidence), or (None, 0) if it is not a real date"""
+    try:
+        if match.group('month_name'):
+            month = _MONTHS.get(match.group('month_name').lower())
+            if month is None:
+                return None, 0.0
+            return date(int(match.group('named_year')), month, int(match.group('named_day'))), 0.9
+        if match.group('slash_month'):
+            return date(int(match.group('slash_year')), int(match.group('slash_month')),
+                        int(match.group('slash_day'))), 0.8
+        return date(int(match.group('iso_year')), int(match.group('iso_month')),
+                    int(match.group('iso_day'))), 0.9
+    except ValueError:
+        return None, 0.0
+
+
+def _amount_confidence(line: str, value: float) -> float:
+    """How likely an amount token is the payment total"""
+    if value == 0:
+        return 0.1
+    if _AMOUNT_ONLY_RE.fullmatch(line):
+        # Venmo/Zelle show the payment as a line of its own, e.g. "- $45.00"
+        return 0.9
+    if _AMOUNT_KEYWORD_RE.search(line):
+        return 0.8
+    return 0.6
+
+
+def _email_name(local_part: str) -> str:
+    """Turn the local part of an email address into a display name"""
+    return ' '.join(part.capitalize() for part in local_part.split('.') if part)
+
+
+def parse_receipt(text: str) -> dict:
+    """
+    Extract the payment amount, date and payer name from receipt OCR text
+
+    Each line is scanned once for amount and date tokens. When several
+    candidates are found the most confident one wins; ties go to the later
+    line for amount and date (receipts list the payment after their headers)
+    and to the earlier line for the name.
+
+    Args:
+        text: Raw OCR text
+
+    Returns:
+        dict: amount (float), date (date) and name (str), each None if not
+            found, plus 'confidence' with a 0.0-1.0 score per field
+    """
+    amount, amount_confidence = None, 0.0
+    found_date, date_confidence = None, 0.0
+    dates_seen = set()
+    name, name_confidence = None, 0.0
+    fallback_name = None
+
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+
+        has_digits = _DIGIT_RE.search(line) is not None
+        for match in _TOKEN_RE.finditer(line) if has_digits else ():
+            value = match.group('amount') or match.group('suffix_amount')
+            if value:
+                value = float(value.replace(',', ''))
+                confidence = _amount_confidence(line, value)
+                if confidence >= amount_confidence:
+                    amount, amount_confidence = value, confidence
+                continue
+
+            token_date, confidence = _token_date(match)
+            if token_date:
+                dates_seen.add(token_date)
+                if confidence >= date_confidence:
+                    found_date, date_confidence = token_date, confidence
+
+        if name_confidence >= 0.8 or not 2 < len(line) < 100:
+            continue
+
+        email = _EMAIL_RE.search(line)
+        if email:
+            if name_confidence < 0.6:
+                name, name_confidence = _email_name(email.group(1)), 0.6
+        elif ' ' in line and not has_digits:
+            if not _SKIP_WORDS_RE.search(line.lower()):
+                candidate = _NAME_PREFIX_RE.sub('', line)
+                confidence = 0.8 if _PROPER_NAME_RE.fullmatch(candidate) else 0.5
+                if confidence > name_confidence:
+                    name, name_confidence = candidate, confidence
+            elif fallback_name is None and 3 < len(line) < 50 and line.lower() not in _FALLBACK_SKIP_LINES:
+                fallback_name = line
+
+    if not name and fallback_name:
+        name, name_confidence = fallback_name, 0.3
+
+    if len(dates_seen) > 1:
+        # Conflicting dates on one receipt (e.g. statement period) lower our trust
+        date_confidence *= 0.75
+
+    return {
+        'amount': amount,
+        'date': found_date,
+        'name': name,
+        'confidence': {
+            'amount': amount_confidence,
+            'date': round(date_confidence, 2),
+            'name': name_confidence
+        }
+    }
+
+
+def fields_found(parsed: Optional[dict]) -> bool:
+    """Whether a parse result has everything needed for matching"""
+    return bool(parsed and parsed['amount'] and parsed['date'])
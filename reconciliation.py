@@ -0,0 +1,246 @@
+"""
+Batch Reconciliation
+Assigns imported Venmo/Zelle transactions to orders, one transaction per order
+"""
+
+import os
+import re
+import time
+import logging
+import sqlite3
+from datetime import date, timedelta
+from difflib import SequenceMatcher
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# How many days a receipt date may differ from the bank's posting date
+MATCH_DATE_WINDOW_DAYS = int(os.environ.get('MATCH_DATE_WINDOW_DAYS', 1))
+
+# Share of the score given to payer-name similarity (the rest is date proximity)
+NAME_WEIGHT = 0.5
+
+# Order statuses that may still be assigned a transaction
+MATCHABLE_STATUSES = ('Pending', 'Flagged')
+
+
+def _amount_key(amount) -> Optional[float]:
+    """Normalize an amount to cents so float noise cannot break a hash lookup"""
+    if amount is None:
+        return None
+    return round(float(amount), 2)
+
+
+def _parse_date(value) -> Optional[date]:
+    """Normalize a date/datetime value (or YYYY-MM-DD... string) to a date"""
+    if value is None:
+        return None
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def _normalize_name(name) -> str:
+    """Lower-case a payer name and sort its words so 'DOE JOHN' equals 'John Doe'"""
+    if not name:
+        return ''
+    words = re.findall(r'[a-z]+', name.lower())
+    return ' '.join(sorted(words))
+
+
+def name_similarity(first, second) -> float:
+    """
+    Fuzzy similarity between two payer names
+
+    Args:
+        first: Name read from the receipt
+        second: Name from the bank/Venmo export
+
+    Returns:
+        float: 0.0 (unrelated or unknown) to 1.0 (same words)
+    """
+    first, second = _normalize_name(first), _normalize_name(second)
+    if not first or not second:
+        return 0.0
+    return SequenceMatcher(None, first, second).ratio()
+
+
+def _load_orders(cursor: sqlite3.Cursor, order_ids: Optional[Iterable[int]]) -> list:
+    """Load unassigned orders with OCR data (optionally limited to specific ids)"""
+    query = f'''
+        SELECT o.id, o.ocr_amount, o.ocr_date, o.ocr_name FROM order_table o
+        LEFT JOIN transaction_matches m ON m.order_id = o.id
+        WHERE m.id IS NULL AND o.duplicate_of IS NULL
+        AND o.status IN ({','.join('?' * len(MATCHABLE_STATUSES))})
+        AND o.ocr_amount IS NOT NULL AND o.ocr_date IS NOT NULL
+    '''
+    if order_ids is None:
+        cursor.execute(query, MATCHABLE_STATUSES)
+        return cursor.fetchall()
+
+    order_ids = list(order_ids)
+    orders = []
+    # Stay well under SQLite's bound-parameter limit
+    for start in range(0, len(order_ids), 500):
+        chunk = order_ids[start:start + 500]
+        cursor.execute(f"{query} AND o.id IN ({','.join('?' * len(chunk))})", (*MATCHABLE_STATUSES, *chunk))
+        orders.extend(cursor.fetchall())
+    return orders
+
+
+def _load_transactions(cursor: sqlite3.Cursor, min_date: date, max_date: date) -> dict:
+    """Build an amount -> [transaction] hash index of unassigned transactions in the date range"""
+    window = timedelta(days=MATCH_DATE_WINDOW_DAYS)
+    bounds = ((min_date - window).isoformat(), (max_date + window).isoformat())
+    index = {}
+
+    sources = (
+        ('venmo', 'SELECT t.id, t.amount, t.txn_date, t.from_user FROM venmo_transactions t', 't.txn_date'),
+        ('zelle', 'SELECT t.id, t.amount, t.date, t.payer_identifier FROM zelle_transactions t', 't.date'),
+    )
+    for source, select, date_column in sources:
+        cursor.execute(f'''
+            {select}
+            LEFT JOIN transaction_matches m ON m.source = ? AND m.transaction_id = t.id
+            WHERE m.id IS NULL AND {date_column} BETWEEN ? AND ?
+        ''', (source, *bounds))
+        for transaction_id, amount, txn_date, payer in cursor.fetchall():
+            index.setdefault(_amount_key(amount), []).append(
+                (source, transaction_id, _parse_date(txn_date), payer)
+            )
+
+    return index
+
+
+def find_candidate_orders(conn: sqlite3.Connection, transactions: Iterable[tuple]) -> list:
+    """
+    Find unassigned orders that could match any of the given transactions
+
+    Args:
+        conn: Database connection
+        transactions: (amount, date) of new or changed transactions
+
+    Returns:
+        list: Ids of orders with the same amount and a date within the match window
+    """
+    window = timedelta(days=MATCH_DATE_WINDOW_DAYS)
+    dates_by_amount = {}
+    for amount, txn_date in transactions:
+        txn_date = _parse_date(txn_date)
+        if txn_date is not None:
+            dates_by_amount.setdefault(_amount_key(amount), set()).add(txn_date)
+    if not dates_by_amount:
+        return []
+
+    cursor = conn.cursor()
+    candidates = []
+    for order_id, amount, order_date, _ in _load_orders(cursor, None):
+        order_date = _parse_date(order_date)
+        txn_dates = dates_by_amount.get(_amount_key(amount))
+        if order_date and txn_dates and any(abs(order_date - txn_date) <= window for txn_date in txn_dates):
+            candidates.append(order_id)
+    return candidates
+
+
+def _score(order_date: date, order_name, txn_date: date, payer) -> float:
+    """Score a candidate pair from date proximity and payer-name similarity"""
+    date_score = 1.0 - abs((order_date - txn_date).days) / (MATCH_DATE_WINDOW_DAYS + 1)
+    return (1 - NAME_WEIGHT) * date_score + NAME_WEIGHT * name_similarity(order_name, payer)
+
+
+def reconcile_orders(conn: sqlite3.Connection, order_ids: Optional[Iterable[int]] = None) -> dict:
+    """
+    Assign transactions to orders, each transaction satisfying at most one order
+
+    Candidate pairs need the same amount and dates within MATCH_DATE_WINDOW_DAYS;
+    they are ranked by date proximity and fuzzy payer-name similarity and assigned
+    greedily, best pair first. Assignments are recorded in transaction_matches,
+    matched orders become Verified and the other considered orders Flagged.
+
+    Every unassigned order is considered unless order_ids limits the run to
+    specific orders (e.g. those find_candidate_orders picked after an import);
+    either way they are matched against all unassigned transactions.
+
+    Args:
+        conn: Database connection
+        order_ids: Orders to reconcile (all unassigned orders if not provided)
+
+    Returns:
+        dict: Match counts and per-stage timings in seconds
+    """
+    started = time.time()
+    if conn.in_transaction:
+        conn.commit()
+    cursor = conn.cursor()
+    # Hold the write lock for the whole run so two workers cannot hand out the same transaction
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        orders = _load_orders(cursor, order_ids)
+
+        stats = {
+            'orders_considered': len(orders),
+            'candidate_pairs': 0,
+            'matched': 0,
+            'flagged': 0,
+            'matched_order_ids': []
+        }
+
+        orders = [(order_id, _amount_key(amount), _parse_date(order_date), name)
+                  for order_id, amount, order_date, name in orders]
+        dates = [order_date for _, _, order_date, _ in orders if order_date]
+        transaction_index = _load_transactions(cursor, min(dates), max(dates)) if dates else {}
+        loaded = time.time()
+        stats['transactions_indexed'] = sum(len(candidates) for candidates in transaction_index.values())
+        stats['load_seconds'] = loaded - started
+
+        # Score every eligible (order, transaction) pair
+        pairs = []
+        for order_id, amount, order_date, name in orders:
+            if order_date is None:
+                continue
+            for source, transaction_id, txn_date, payer in transaction_index.get(amount, ()):
+                if txn_date is None or abs((order_date - txn_date).days) > MATCH_DATE_WINDOW_DAYS:
+                    continue
+                pairs.append((_score(order_date, name, txn_date, payer), order_id, source, transaction_id))
+        stats['candidate_pairs'] = len(pairs)
+
+        # Greedy assignment: best-scoring pairs first, each side used once
+        pairs.sort(key=lambda pair: (-pair[0], pair[1]))
+        assigned_orders = set()
+        assigned_transactions = set()
+        assignments = []
+        for score, order_id, source, transaction_id in pairs:
+            if order_id in assigned_orders or (source, transaction_id) in assigned_transactions:
+                continue
+            assigned_orders.add(order_id)
+            assigned_transactions.add((source, transaction_id))
+            assignments.append((order_id, source, transaction_id, round(score, 4)))
+        matched = time.time()
+        stats['match_seconds'] = matched - loaded
+
+        cursor.executemany('''
+            INSERT INTO transaction_matches (order_id, source, transaction_id, score)
+            VALUES (?, ?, ?, ?)
+        ''', assignments)
+        updates = [('Verified' if order_id in assigned_orders else 'Flagged', order_id)
+                   for order_id, _, _, _ in orders]
+        cursor.executemany('UPDATE order_table SET status = ? WHERE id = ?', updates)
+        conn.commit()
+        stats['write_seconds'] = time.time() - matched
+    except Exception:
+        conn.rollback()
+        raise
+
+    stats['matched_order_ids'] = sorted(assigned_orders)
+    stats['matched'] = len(assigned_orders)
+    stats['flagged'] = len(orders) - stats['matched']
+    stats['total_seconds'] = time.time() - started
+
+    logger.info(
+        f"Reconciled {stats['orders_considered']} orders ({stats['candidate_pairs']} candidate pairs): "
+        f"{stats['matched']} matched, {stats['flagged']} flagged in {stats['total_seconds']:.3f}s"
+    )
+    return stats
@@ -4,14 +4,23 @@ Handles file uploads and downloads to/from Cloudflare R2 bucket
 """
 
 import os
+import time
 import boto3
 from botocore.exceptions import ClientError, NoCredentialsError
 import logging
 from typing import Optional, BinaryIO
 import tempfile
+import shutil
+import hashlib
 
 logger = logging.getLogger(__name__)
 
+# Local copies of receipts uploaded to R2, kept until their OCR job has read them
+RECEIPT_SPOOL_DIR = os.path.join(tempfile.gettempdir(), 'receipt_spool')
+
+# Seconds a presigned receipt upload URL stays valid
+RECEIPT_UPLOAD_URL_TTL = int(os.environ.get('RECEIPT_UPLOAD_URL_TTL', 900))
+
 class R2StorageService:
     """Service for handling Cloudflare R2 storage operations"""
     
@@ -217,6 +226,90 @@ class R2StorageService:
         except ClientError:
             return False
     
+    def fetch_if_changed(self, key: str, etag: str = None) -> Optional[dict]:
+        """
+        Get a file from R2 bucket unless the caller's copy is still current
+        
+        Args:
+            key: Object key (path) in the bucket
+            etag: ETag of the copy the caller already has (optional)
+            
+        Returns:
+            dict: {'modified': False} if the object still has that ETag,
+                {'missing': True} if it no longer exists, otherwise
+                {'modified': True, 'etag': str, 'body': stream}; None if R2
+                could not be asked (the object's state is unknown)
+        """
+        if not self.is_enabled():
+            return None
+        
+        try:
+            params = {'Bucket': self.bucket_name, 'Key': key}
+            if etag:
+                params['IfNoneMatch'] = etag
+            response = self.client.get_object(**params)
+            return {'modified': True, 'etag': response['ETag'], 'body': response['Body']}
+            
+        except ClientError as e:
+            status = e.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+            if status == 304:
+                return {'modified': False}
+            if status == 404 or e.response.get('Error', {}).get('Code') == 'NoSuchKey':
+                return {'missing': True}
+            logger.error(f"Failed to get file from R2: {e}")
+            return None
+        except Exception as e:
+            # Connection errors and timeouts are not ClientErrors
+            logger.error(f"Failed to reach R2 for {key}: {e}")
+            return None
+    
+    def get_file_size(self, key: str) -> Optional[int]:
+        """
+        Get the size of a file in R2 bucket without downloading it
+        
+        Args:
+            key: Object key (path) in the bucket
+            
+        Returns:
+            int: Size in bytes, None if the file does not exist
+        """
+        if not self.is_enabled():
+            return None
+        
+        try:
+            response = self.client.head_object(Bucket=self.bucket_name, Key=key)
+            return response['ContentLength']
+            
+        except ClientError:
+            return None
+    
+    def generate_upload_url(self, key: str, content_type: str = None,
+                            expires_in: int = RECEIPT_UPLOAD_URL_TTL) -> Optional[str]:
+        """
+        Create a presigned URL that lets a browser PUT one object directly
+        
+        Args:
+            key: Object key (path) the upload will be stored under
+            content_type: MIME type the upload must be sent with (signed into the URL)
+            expires_in: Seconds the URL stays valid
+            
+        Returns:
+            str: Presigned PUT URL, None if failed
+        """
+        if not self.is_enabled():
+            return None
+        
+        try:
+            params = {'Bucket': self.bucket_name, 'Key': key}
+            if content_type:
+                params['ContentType'] = content_type
+            
+            return self.client.generate_presigned_url('put_object', Params=params, ExpiresIn=expires_in)
+            
+        except ClientError as e:
+            logger.error(f"Failed to create upload URL for R2: {e}")
+            return None
+    
     def list_files(self, prefix: str = '') -> list:
         """
         List files in R2 bucket with optional prefix
@@ -284,13 +377,123 @@ def upload_receipt(file_obj: BinaryIO, filename: str) -> tuple[bool, str]:
         try:
             with open(local_path, 'wb') as f:
                 file_obj.seek(0)  # Reset file pointer
-                f.write(file_obj.read())
+                shutil.copyfileobj(file_obj, f)
             return True, filename
         except Exception as e:
             logger.error(f"Failed to save file locally: {e}")
             return False, filename
 
 
+def upload_receipt_with_copy(file_obj: BinaryIO, filename: str) -> tuple[bool, str, Optional[str], Optional[str]]:
+    """
+    Upload a receipt file to storage, keeping a local copy for OCR
+    
+    The upload is written to disk once while being hashed. With R2 that file is
+    a temporary copy in RECEIPT_SPOOL_DIR which is then uploaded, so OCR can
+    read it instead of downloading the object back; without R2 it is the
+    stored file itself.
+    
+    Args:
+        file_obj: File object to upload
+        filename: Name of the file
+        
+    Returns:
+        tuple: (success: bool, storage_path: str, local_path: str or None,
+            sha256: str or None). With R2 the caller removes local_path with
+            cleanup_temp_file() once it is no longer needed.
+    """
+    storage = get_storage_service()
+    local_dir = RECEIPT_SPOOL_DIR if storage.is_enabled() else 'uploads'
+    local_path = os.path.join(local_dir, filename)
+    os.makedirs(local_dir, exist_ok=True)
+    
+    sha256 = hashlib.sha256()
+    try:
+        with open(local_path, 'wb') as f:
+            file_obj.seek(0)  # Reset file pointer
+            for chunk in iter(lambda: file_obj.read(1024 * 1024), b''):
+                sha256.update(chunk)
+                f.write(chunk)
+    except Exception as e:
+        logger.error(f"Failed to save receipt locally: {e}")
+        if os.path.exists(local_path):
+            os.remove(local_path)
+        return False, filename, None, None
+    
+    if not storage.is_enabled():
+        logger.info("R2 not available, using local storage for receipt")
+        return True, filename, local_path, sha256.hexdigest()
+    
+    key = f"receipts/{filename}"
+    if not storage.upload_file_from_path(local_path, key):
+        cleanup_temp_file(local_path)
+        return False, filename, None, None
+    return True, key, local_path, sha256.hexdigest()
+
+
+def create_receipt_upload(filename: str, content_type: str = None) -> tuple[str, Optional[str]]:
+    """
+    Prepare a direct (browser to storage) receipt upload
+    
+    Args:
+        filename: Name of the file
+        content_type: MIME type the browser will send
+        
+    Returns:
+        tuple: (storage_path: str, upload_url: str or None). The URL is None when
+            R2 is not available; the caller then provides its own upload endpoint
+            that saves to local storage under the same storage path.
+    """
+    key = f"receipts/{filename}"
+    storage = get_storage_service()
+    upload_url = storage.generate_upload_url(key, content_type) if storage.is_enabled() else None
+    return key, upload_url
+
+
+def save_receipt_upload(stream: BinaryIO, storage_path: str) -> bool:
+    """
+    Save a directly uploaded receipt to local storage (stand-in for R2's presigned PUT)
+    
+    Args:
+        stream: Request body being uploaded
+        storage_path: Storage path from create_receipt_upload()
+        
+    Returns:
+        bool: True if the file was saved
+    """
+    os.makedirs('uploads', exist_ok=True)
+    local_path = os.path.join('uploads', os.path.basename(storage_path))
+    
+    try:
+        with open(local_path, 'wb') as f:
+            shutil.copyfileobj(stream, f)
+        return True
+    except Exception as e:
+        logger.error(f"Failed to save uploaded receipt locally: {e}")
+        if os.path.exists(local_path):
+            os.remove(local_path)
+        return False
+
+
+def get_stored_file_size(storage_path: str) -> Optional[int]:
+    """
+    Get the size of a stored file without downloading it from R2
+    
+    Args:
+        storage_path: Path where file is stored (R2 key or local filename)
+        
+    Returns:
+        int: Size in bytes, None if the file does not exist
+    """
+    storage = get_storage_service()
+    
+    if storage.is_enabled() and not os.path.exists(storage_path):
+        return storage.get_file_size(storage_path)
+    
+    local_path = get_file_path(storage_path)
+    return os.path.getsize(local_path) if local_path else None
+
+
 def upload_csv(file_obj: BinaryIO, filename: str) -> tuple[bool, str]:
     """
     Upload a CSV file to storage
@@ -320,7 +523,7 @@ def upload_csv(file_obj: BinaryIO, filename: str) -> tuple[bool, str]:
         try:
             with open(local_path, 'wb') as f:
                 file_obj.seek(0)  # Reset file pointer
-                f.write(file_obj.read())
+                shutil.copyfileobj(file_obj, f)
             return True, filename
         except Exception as e:
             logger.error(f"Failed to save CSV file locally: {e}")
@@ -368,15 +571,53 @@ def get_file_path(storage_path: str) -> Optional[str]:
             return storage_path if os.path.exists(storage_path) else None
 
 
+def is_temp_file(file_path: str) -> bool:
+    """Check whether a path is in the temp directory (a download or spool copy, not stored data)"""
+    # Stored local files use relative paths ('uploads/...'), downloads and spool copies absolute ones
+    return os.path.isabs(file_path) and file_path.startswith(os.path.join(tempfile.gettempdir(), ''))
+
+
+def sweep_receipt_spool(max_age: float) -> int:
+    """
+    Remove spool copies whose OCR job never cleaned them up
+    
+    A copy is left behind when its job is never run or is abandoned by a
+    worker that stopped; a job that still runs later downloads the receipt
+    from R2 instead.
+    
+    Args:
+        max_age: Seconds since a copy was written before it is removed
+        
+    Returns:
+        int: Number of copies removed
+    """
+    if not os.path.isdir(RECEIPT_SPOOL_DIR):
+        return 0
+    
+    cutoff = time.time() - max_age
+    removed = 0
+    for entry in os.scandir(RECEIPT_SPOOL_DIR):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            # Removed by its job (or another process) meanwhile
+            pass
+    if removed:
+        logger.info(f"Removed {removed} stale receipt spool copies")
+    return removed
+
+
 def cleanup_temp_file(file_path: str):
     """
-    Clean up temporary files downloaded from R2
+    Clean up temporary files downloaded from R2 (or spooled for upload)
     
     Args:
-        file_path: Path to temporary file
+        file_path: Path to temporary file; paths outside the temp directory are left alone
     """
     try:
-        if file_path and file_path.startswith('/tmp/') and os.path.exists(file_path):
+        if file_path and is_temp_file(file_path) and os.path.exists(file_path):
             os.remove(file_path)
             logger.debug(f"Cleaned up temporary file: {file_path}")
     except Exception as e:
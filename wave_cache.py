@@ -0,0 +1,145 @@
+"""
+Wave Cache
+In-process copy of the wave table, so the intake form and submissions skip the database
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Optional
+
+from database import get_db_connection
+from data_versions import get_data_versions
+
+logger = logging.getLogger(__name__)
+
+# Seconds the cached waves are used before checking the 'waves' data version
+WAVE_CACHE_TTL = float(os.environ.get('WAVE_CACHE_TTL', 30))
+
+
+class WaveCache:
+    """
+    All waves and the active wave, reloaded when the 'waves' data version changes
+
+    Within the TTL no database work is done at all. After it expires, one
+    single-row read of data_versions decides whether the waves must be
+    reloaded; the triggers from migration 11 bump that version on every write
+    to the wave table, so edits made through another worker are seen within
+    one TTL. Edits made through this process call invalidate() and are seen
+    immediately.
+    """
+
+    def __init__(self, ttl: float = WAVE_CACHE_TTL):
+        """
+        Initialize the cache
+
+        Args:
+            ttl: Seconds to trust the cached waves without checking the version
+        """
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._waves = None
+        self._version = None
+        self._checked_at = 0.0
+        self.hits = 0
+        self.checks = 0
+        self.reloads = 0
+
+    def _snapshot(self) -> list:
+        """Return the cached waves, checking the version or reloading as needed"""
+        with self._lock:
+            now = time.monotonic()
+            if self._waves is not None and now - self._checked_at < self.ttl:
+                self.hits += 1
+                return self._waves
+
+            conn = get_db_connection()
+            try:
+                version = get_data_versions(conn, ['waves'])['waves']
+                if self._waves is not None and version == self._version:
+                    self.checks += 1
+                    self._checked_at = now
+                    return self._waves
+
+                # Read after the version: a write in between only causes one extra reload later
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT id, name, start_date, end_date, price_boy, price_girl, is_active
+                    FROM wave
+                    ORDER BY start_date
+                ''')
+                waves = [{
+                    'id': wave[0],
+                    'name': wave[1],
+                    'start_date': wave[2],
+                    'end_date': wave[3],
+                    'price_boy': wave[4],
+                    'price_girl': wave[5],
+                    'is_active': wave[6]
+                } for wave in cursor.fetchall()]
+            finally:
+                conn.close()
+
+            self._waves, self._version, self._checked_at = waves, version, now
+            self.reloads += 1
+            logger.info(f"Wave cache reloaded: {len(waves)} waves (version {version})")
+            return waves
+
+    def get_all(self) -> list:
+        """
+        Get all waves
+
+        Returns:
+            list: Wave dicts ordered by start date (copies, safe to modify)
+        """
+        return [dict(wave) for wave in self._snapshot()]
+
+    def get_current(self) -> Optional[dict]:
+        """
+        Get the active wave
+
+        Returns:
+            dict: The active wave (a copy), or None if no wave is active
+        """
+        for wave in self._snapshot():
+            if wave['is_active']:
+                return dict(wave)
+        return None
+
+    def get_version(self) -> int:
+        """
+        Get the 'waves' data version of the cached waves
+
+        Returns:
+            int: Version, usable as a cache key for pages that show waves
+        """
+        self._snapshot()
+        with self._lock:
+            return self._version
+
+    def invalidate(self):
+        """Drop the cached waves after this process changed the wave table"""
+        with self._lock:
+            self._waves = None
+
+    def get_stats(self) -> dict:
+        """Get cache statistics"""
+        with self._lock:
+            return {
+                'waves': len(self._waves) if self._waves is not None else None,
+                'version': self._version,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'checks': self.checks,
+                'reloads': self.reloads
+            }
+
+
+# Global cache instance
+wave_cache = WaveCache()
+
+
+def get_wave_cache() -> WaveCache:
+    """Get the global wave cache instance"""
+    return wave_cache